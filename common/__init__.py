@@ -0,0 +1,5 @@
+"""Shared building blocks for the workshop agents.
+
+The runnable agent scripts import from this package, so run them as modules
+from the repository root, e.g. ``python -m weather_agent.agent``.
+"""
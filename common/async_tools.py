@@ -0,0 +1,129 @@
+"""Async-aware function tools: a shared thread pool, a timeout and latency stats.
+
+ADK runs the function calls of one model response concurrently, but a plain
+`def` tool runs on the event loop: two lookups in one response run one after
+the other, and every other session on the loop waits for both. `async_tool`
+turns a sync tool into an async one that runs the function in a shared
+thread pool, so the calls of one response overlap (the turn waits for the
+slowest tool, not the sum) and the loop keeps serving other sessions:
+
+    @cached_tool(ttl=60)
+    @async_tool(timeout=10)
+    def search_train(origin: str, dest: str, date: str, day_part: str, pax: int) -> dict:
+        ...
+
+The wrapper keeps the function's name, docstring and signature, so ADK
+builds the same declaration, and `tool_context` is passed through as usual.
+Put `cached_tool` above it, so cache hits are answered on the loop without a
+thread hop (and the stats count the calls that reach the function). Async
+tools can be decorated too; they stay on the loop and only get the timeout
+and the stats.
+
+A call that runs past `timeout` returns an error dict to the model instead
+of the result (which `cached_tool` does not store, so a retry runs the
+tool again). Its thread cannot be stopped and finishes in the background,
+so tools with side effects must be safe to retry (the booking tools key
+their bookings on the invocation). The functions run on pool threads, so
+they must be thread-safe, as they already are for ADK's own tool thread
+pool.
+
+Per-tool latency (count, p50, p95, max, timeouts, errors) is kept in
+`tool_stats` and printed by `format_tool_stats`; the load test shows it.
+The pool has TOOL_THREADS workers (default 32).
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+TOOL_THREADS = int(os.environ.get("TOOL_THREADS", "32"))
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def tool_pool() -> ThreadPoolExecutor:
+    """The thread pool shared by all `async_tool` tools, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+        return _pool
+
+
+class ToolLatency:
+    """Call count, outcome counts and the latencies of the last `window` calls of one tool."""
+
+    def __init__(self, window: int = 4096):
+        self.calls = self.timeouts = self.errors = 0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def reset(self):
+        self.calls = self.timeouts = self.errors = 0
+        self.recent.clear()
+
+    def record(self, seconds: float):
+        self.calls += 1
+        self.recent.append(seconds)
+
+    def summary(self) -> dict:
+        recent = sorted(self.recent)
+        at = lambda q: recent[min(len(recent) - 1, int(q * len(recent)))] if recent else 0.0
+        return {"calls": self.calls, "timeouts": self.timeouts, "errors": self.errors,
+                "p50": at(0.5), "p95": at(0.95), "max": recent[-1] if recent else 0.0}
+
+
+tool_stats: dict[str, ToolLatency] = {}
+
+
+def async_tool(timeout: float = 10.0):
+    """Decorator running a sync tool in the shared thread pool, with a timeout and latency stats."""
+    def decorator(func: Callable) -> Callable:
+        name = func.__name__
+        stats = tool_stats.setdefault(name, ToolLatency())
+        is_async = inspect.iscoroutinefunction(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            if is_async:
+                call = func(*args, **kwargs)
+            else:
+                # copy_context: the function sees the caller's context variables, as it would on the loop.
+                call = asyncio.get_running_loop().run_in_executor(
+                    tool_pool(), functools.partial(contextvars.copy_context().run, func, *args, **kwargs))
+            try:
+                return await asyncio.wait_for(call, timeout)
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                logger.warning("Tool %s timed out after %g s", name, timeout)
+                return {"status": "error", "error_message": f"{name} timed out after {timeout:g} s, please try again."}
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                stats.record(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def format_tool_stats(names: Optional[list[str]] = None) -> str:
+    """`tool_stats` of the tools called so far as aligned text lines."""
+    lines = [f"{'tool':<16} {'calls':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'timeouts':>9}"]
+    for name, latency in sorted(tool_stats.items()):
+        if latency.calls and (names is None or name in names):
+            row = latency.summary()
+            lines.append(f"{name:<16} {row['calls']:>7} {row['p50'] * 1000:>8.2f} {row['p95'] * 1000:>8.2f} "
+                         f"{row['max'] * 1000:>8.2f} {row['timeouts']:>9}")
+    return "\n".join(lines)
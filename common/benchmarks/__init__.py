@@ -0,0 +1 @@
+"""Micro-benchmarks, runnable as ``python -m common.benchmarks.<name>``."""
@@ -0,0 +1,91 @@
+"""Thousands of concurrent bookings racing for the seats of one train.
+
+Every booking runs as its own asyncio task (the ledger call in a worker
+thread, as ADK runs sync tools). A share of them are retries that reuse
+another booking's idempotency key. With --processes, that many processes
+race on the same SQLite file as well. At the end the benchmark checks that
+no seat was sold twice and that retries got their original booking back.
+
+    python -m common.benchmarks.booking_contention --bookings 5000 --seats 500 --processes 2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from common.booking_ledger import BookingLedger, SoldOutError
+
+RESOURCE = "train:Argo Semeru 6"
+DATE = "2025-12-10"
+
+
+async def race(db_path: str, worker: int, bookings: int, seats: int, retry_share: float) -> dict:
+    ledger = BookingLedger(db_path)
+    rng = random.Random(worker)
+    keys = [f"w{worker}-b{i}" for i in range(bookings)]
+    # Retries reuse an earlier key, like a model repeating a call in one invocation.
+    keys = [rng.choice(keys[:i]) if i and rng.random() < retry_share else key for i, key in enumerate(keys)]
+    latencies = []
+
+    async def book(key: str):
+        start = time.perf_counter()
+        try:
+            booking = await asyncio.to_thread(ledger.reserve, RESOURCE, [DATE], rng.randint(1, 2),
+                                              key, key, seats)
+            return key, booking.code
+        except SoldOutError:
+            return key, None
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    results = await asyncio.gather(*(book(key) for key in keys))
+    codes_by_key: dict[str, set] = {}
+    for key, code in results:
+        codes_by_key.setdefault(key, set()).add(code)
+    inconsistent = sum(1 for codes in codes_by_key.values() if len({c for c in codes if c}) > 1)
+    latencies.sort()
+    ledger.close()
+    return {"calls": len(keys), "retries": len(keys) - len(codes_by_key), "inconsistent": inconsistent,
+            "p50": latencies[len(latencies) // 2], "p99": latencies[int(len(latencies) * 0.99)]}
+
+
+def run_worker(args) -> dict:
+    return asyncio.run(race(*args))
+
+
+def main(bookings: int, seats: int, processes: int, retry_share: float):
+    db_path = os.path.join(tempfile.mkdtemp(), "bookings.db")
+    BookingLedger(db_path).close()
+    per_worker = bookings // processes
+    start = time.perf_counter()
+    if processes == 1:
+        reports = [run_worker((db_path, 0, per_worker, seats, retry_share))]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            reports = pool.map(run_worker, [(db_path, w, per_worker, seats, retry_share) for w in range(processes)])
+    wall = time.perf_counter() - start
+
+    ledger = BookingLedger(db_path)
+    sold = ledger.reserved(RESOURCE, DATE)
+    booked_units = ledger._db.execute("SELECT COALESCE(SUM(quantity), 0), COUNT(*) FROM bookings").fetchone()
+    calls = sum(r["calls"] for r in reports)
+    print(f"calls        {calls} ({sum(r['retries'] for r in reports)} retries) in {processes} process(es)")
+    print(f"wall time    {wall:.2f} s ({calls / wall:.0f} bookings/s)")
+    print(f"latency      p50 {max(r['p50'] for r in reports) * 1000:.1f} ms, "
+          f"p99 {max(r['p99'] for r in reports) * 1000:.1f} ms")
+    print(f"seats sold   {sold} of {seats} in {booked_units[1]} bookings")
+    ok = sold <= seats and sold == booked_units[0] and not any(r["inconsistent"] for r in reports)
+    print(f"consistent   {'yes' if ok else 'NO'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Booking ledger contention benchmark")
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--retry-share", type=float, default=0.1)
+    args = parser.parse_args()
+    main(args.bookings, args.seats, args.processes, args.retry_share)
@@ -0,0 +1,118 @@
+"""Cold start of the deployable agents, with and without prewarming.
+
+For travel_agent_docker it starts the server (one worker, the docker agent
+with `ScriptedLlm`) and times, from process start: the first response, the
+first /run turn and the one after it. For travel_agent_deploy it times the
+agent import and the first turn in a fresh interpreter. Each is measured
+with PREWARM=0 (plain ADK: the first turn does ADK's lazy imports) and with
+prewarming (snapshot + warm-up turn before serving, or warm-up at import).
+
+    python -m common.benchmarks.cold_start --repeat 3
+
+The docker snapshot is written first (as the image build does) if missing.
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common.benchmarks.server_workers import APP, QUERY, free_port, write_agent
+from travel_agent_docker.prewarm import SNAPSHOT_PATH
+
+DEPLOY_CHILD = '''
+import asyncio, json, time
+start = time.perf_counter()
+from travel_agent_deploy.agent import root_agent
+imported = time.perf_counter() - start
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from common.fake_llm import ScriptedLlm, with_models
+
+agent = with_models(root_agent, {name: ScriptedLlm() for name in ("travel_agent_team", "train_agent", "hotel_agent")})
+
+async def turn():
+    runner = InMemoryRunner(agent=agent, app_name="cold_start")
+    session = await runner.session_service.create_session(app_name="cold_start", user_id="u")
+    message = types.Content(role="user", parts=[types.Part(text="Hello")])
+    async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+        pass
+
+start = time.perf_counter()
+asyncio.run(turn())
+print(json.dumps({"import": imported, "first turn": time.perf_counter() - start}))
+'''
+
+
+def docker_once(prewarm: bool) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        write_agent(tmp)
+        env = dict(os.environ, BENCH_MODEL_LATENCY="0", PYTHONPATH=os.getcwd(), PREWARM="1" if prewarm else "0")
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "travel_agent_docker.server", "--agents-dir", tmp, "--port", str(port),
+             "--workers", "1", "--warm-apps", APP, "--session-db", os.path.join(tmp, "sessions.db"),
+             "--log-level", "WARNING"], env=env, stderr=subprocess.DEVNULL)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+                while True:
+                    try:
+                        client.get("/list-apps").raise_for_status()
+                        break
+                    except httpx.TransportError:
+                        time.sleep(0.02)
+                ready = time.perf_counter()
+                session_id = client.post(f"/apps/{APP}/users/u/sessions", json={}).json()["id"]
+                body = {"app_name": APP, "user_id": "u", "session_id": session_id,
+                        "new_message": {"role": "user", "parts": [{"text": QUERY}]}}
+                turns = []
+                for _ in range(2):
+                    turn_start = time.perf_counter()
+                    client.post("/run", json=body).raise_for_status()
+                    turns.append(time.perf_counter() - turn_start)
+            return {"ready": ready - start, "first turn": turns[0], "second turn": turns[1],
+                    "first answer": ready - start + turns[0]}
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+def deploy_once(prewarm: bool) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), PREWARM="1" if prewarm else "0")
+    result = subprocess.run([sys.executable, "-c", DEPLOY_CHILD], capture_output=True, text=True, env=env, check=True)
+    times = json.loads(result.stdout.strip().splitlines()[-1])
+    times["first answer"] = times["import"] + times["first turn"]
+    return times
+
+
+def median(runs: list[dict]) -> dict:
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if not os.path.exists(SNAPSHOT_PATH):
+        subprocess.run([sys.executable, "-m", "travel_agent_docker.prewarm"], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    print(f"median of {args.repeat} cold starts, seconds")
+    print(f"{'agent':<20} {'prewarm':<8} {'ready':>6} {'import':>7} {'1st turn':>9} {'2nd turn':>9} {'1st answer':>11}")
+    for name, once in (("travel_agent_docker", docker_once), ("travel_agent_deploy", deploy_once)):
+        for prewarm in (False, True):
+            times = median([once(prewarm) for _ in range(args.repeat)])
+            print(f"{name:<20} {'on' if prewarm else 'off':<8} {times.get('ready', 0):>6.2f} "
+                  f"{times.get('import', 0):>7.2f} {times['first turn']:>9.3f} {times.get('second turn', 0):>9.3f} "
+                  f"{times['first answer']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
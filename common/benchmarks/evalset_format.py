@@ -0,0 +1,103 @@
+"""Size and load time of .evalset.json versus .evalpack, on scaled-up evalsets.
+
+The cases of travel_agent/evalsetfc1936.evalset.json are copied N times with
+new ids and fresh random thought signatures (real ones do not compress), and
+written pretty-printed like ADK writes them.
+
+    python -m common.benchmarks.evalset_format --cases 300 3000
+"""
+import argparse
+import base64
+import copy
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from common import evalpack
+from common.eval_runner import iter_eval_cases
+
+SOURCE = os.path.join(os.path.dirname(__file__), "..", "..", "travel_agent", "evalsetfc1936.evalset.json")
+
+
+def scaled(evalset: dict, count: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+
+    def refresh(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key == "thought_signature":
+                    value[key] = base64.urlsafe_b64encode(rng.randbytes(len(item) * 3 // 4)).decode().rstrip("=")
+                elif key in ("invocation_id", "id") and isinstance(item, str):
+                    value[key] = f"{item.split('-')[0]}-{uuid.UUID(int=rng.getrandbits(128))}"
+                else:
+                    refresh(item)
+        elif isinstance(value, list):
+            for item in value:
+                refresh(item)
+
+    cases = []
+    for i in range(count):
+        case = copy.deepcopy(evalset["eval_cases"][i % len(evalset["eval_cases"])])
+        case["eval_id"] = f"case{i:06d}"
+        refresh(case)
+        cases.append(case)
+    return {**evalset, "eval_cases": cases}
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(counts: list[int]):
+    with open(SOURCE, encoding="utf-8") as f:
+        evalset = json.load(f)
+    tmp = tempfile.mkdtemp()
+    print(f"{'cases':>6} {'format':<22} {'MB':>7} {'ratio':>6} {'load all ms':>12} {'open ms':>8} {'one case ms':>12}")
+    for count in counts:
+        source = os.path.join(tmp, f"scaled{count}.evalset.json")
+        with open(source, "w", encoding="utf-8") as f:
+            json.dump(scaled(evalset, count), f, indent=2)
+        size = os.path.getsize(source)
+
+        def load_json():
+            with open(source, encoding="utf-8") as f:
+                return json.load(f)
+
+        middle = f"case{count // 2:06d}"
+        load = timed(load_json)
+        one = timed(lambda: next(case for case in iter_eval_cases(source) if case["eval_id"] == middle))
+        print(f"{count:>6} {'json (json.load)':<22} {size / 1e6:>7.2f} {1:>5.1f}x {load * 1000:>12.1f} "
+              f"{load * 1000:>8.1f} {one * 1000:>12.1f}")
+
+        for keep in (True, False):
+            target = os.path.join(tmp, f"scaled{count}{'-sig' if keep else ''}.evalpack")
+            evalpack.export(source, target, keep_thought_signatures=keep)
+            pack_size = os.path.getsize(target)
+
+            def load_all():
+                with evalpack.EvalPack(target) as pack:
+                    return list(pack)
+
+            def load_one():
+                with evalpack.EvalPack(target) as pack:
+                    return pack.case(middle)
+
+            opened = timed(lambda: evalpack.EvalPack(target).close())
+            name = "evalpack" + (" (signatures)" if keep else "")
+            print(f"{count:>6} {name:<22} {pack_size / 1e6:>7.2f} {size / pack_size:>5.1f}x "
+                  f"{timed(load_all) * 1000:>12.1f} {opened * 1000:>8.1f} {timed(load_one) * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evalset storage format benchmark")
+    parser.add_argument("--cases", type=int, nargs="+", default=[300, 3000])
+    args = parser.parse_args()
+    main(args.cases)
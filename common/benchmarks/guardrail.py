@@ -0,0 +1,52 @@
+"""Per-call scan cost of KeywordGuardrail versus one substring check per keyword.
+
+    python -m common.benchmarks.guardrail --terms 10 100 1000
+"""
+import argparse
+import random
+import string
+import time
+
+from common.guardrail import KeywordGuardrail
+
+MESSAGE = ("Halo, saya mau cari kereta dari Gambir ke Bandung untuk 1 jan 2026 pagi buat 2 orang, "
+           "terus tolong cek cuaca di London dan Tokyo juga ya. ") * 4
+
+
+def random_terms(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(count)]
+
+
+def naive_scan(terms: list[str], text: str) -> bool:
+    """The original approach: upper-case the message, then test each keyword in turn."""
+    upper = text.upper()
+    return any(term.upper() in upper for term in terms)
+
+
+def time_per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(term_counts: list[int], repeat: int):
+    print(f"message: {len(MESSAGE)} chars")
+    print(f"{'terms':>6} {'naive us':>10} {'compiled us':>12} {'compile ms':>11}")
+    for count in term_counts:
+        terms = random_terms(count)
+        start = time.perf_counter()
+        guardrail = KeywordGuardrail(terms=terms, patterns=[r"\b\d{16}\b"])
+        compile_ms = (time.perf_counter() - start) * 1000
+        naive = time_per_call(lambda: naive_scan(terms, MESSAGE), repeat)
+        compiled = time_per_call(lambda: guardrail.scan([MESSAGE]), repeat)
+        print(f"{count:>6} {naive * 1e6:>10.1f} {compiled * 1e6:>12.1f} {compile_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KeywordGuardrail scan benchmark")
+    parser.add_argument("--terms", type=int, nargs="+", default=[1, 10, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.terms, args.repeat)
@@ -0,0 +1,79 @@
+"""Prompt size and turn latency per turn, with and without HistoryWindow.
+
+Replays the user turns of travel_agent/evalsetfc1936.evalset.json over and
+over in one session against the scripted model:
+
+    python -m common.benchmarks.history_window --turns 80
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+from google.adk.agents.llm_agent import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from common.driver import run_turn
+from common.fake_llm import Rule, ScriptedLlm
+from common.history import HistoryWindow
+from travel_agent_team.agent import book_train, search_train
+
+EVALSET = os.path.join(os.path.dirname(__file__), "..", "..", "travel_agent", "evalsetfc1936.evalset.json")
+
+
+def load_user_turns(path: str) -> list[str]:
+    with open(path) as f:
+        evalset = json.load(f)
+    return [turn["user_content"]["parts"][0]["text"]
+            for case in evalset["eval_cases"] for turn in case["conversation"]]
+
+
+async def replay(queries: list[str], turns: int, window) -> list[tuple[int, float]]:
+    """Returns (prompt tokens of the last model call, turn latency) for each turn."""
+    model = ScriptedLlm(rules=[
+        Rule(r"sendirian|orang", call="search_train",
+             args={"origin": "Jakarta", "dest": "Jogja", "date": "2025-12-10", "day_part": "pagi", "pax": 1}),
+        Rule(r"^([A-Z][a-z]+ [A-Z][a-z]+)$", call="book_train", args={"code": "Argo Semeru 6", "name": "{0}", "date": "2025-12-10", "pax": 1}),
+    ], default_text="Baik, ada lagi yang bisa saya bantu untuk perjalanan kereta Anda?")
+    agent = Agent(name="root_agent", model=model, instruction="You are a helpful travel agent.",
+                  tools=[search_train, book_train], before_model_callback=window)
+    runner = Runner(agent=agent, app_name="history_bench", session_service=InMemorySessionService(),
+                    auto_create_session=True)
+
+    results = []
+    for i in range(turns):
+        prompt_tokens = []
+
+        def record(event):
+            if event.usage_metadata:
+                prompt_tokens.append(event.usage_metadata.prompt_token_count)
+
+        turn = await run_turn(runner, "user", "long_session", queries[i % len(queries)], on_event=record)
+        results.append((prompt_tokens[-1] if prompt_tokens else 0, turn.latency))
+    return results
+
+
+async def main(turns: int, keep_turns: int):
+    # Book into a throwaway ledger, not the agents' common/bookings.db.
+    os.environ["BOOKINGS_DB"] = os.path.join(tempfile.mkdtemp(), "bookings.db")
+    queries = load_user_turns(EVALSET)
+    full = await replay(queries, turns, None)
+    window = HistoryWindow(keep_turns=keep_turns)
+    compacted = await replay(queries, turns, window)
+
+    print(f"{'turn':>5} {'tokens full':>12} {'tokens window':>14} {'ms full':>9} {'ms window':>10}")
+    for i in sorted({1, 5, 10, 20, 40, 80, 160, turns} & set(range(1, turns + 1))):
+        (tok_full, lat_full), (tok_win, lat_win) = full[i - 1], compacted[i - 1]
+        print(f"{i:>5} {tok_full:>12} {tok_win:>14} {lat_full * 1000:>9.2f} {lat_win * 1000:>10.2f}")
+    print(f"window callback: {window.stats['calls']} calls, "
+          f"{window.stats['seconds'] / max(1, window.stats['calls']) * 1e6:.1f} us per call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HistoryWindow prompt size benchmark")
+    parser.add_argument("--turns", type=int, default=80)
+    parser.add_argument("--keep-turns", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.keep_turns))
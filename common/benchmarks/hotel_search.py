@@ -0,0 +1,85 @@
+"""Query cost of the hotel index versus a linear scan, at 1M+ room-nights.
+
+Each synthetic hotel has a two-year availability calendar with random
+sold-out nights, so 1,500 hotels carry ~1.1M room-nights.
+
+    python -m common.benchmarks.hotel_search --hotels 1500 15000 --locations 10
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common.hotel_inventory import EPOCH, HORIZON_DAYS, Hotel, HotelIndex, stay_mask
+from common.places import Place
+
+
+def synthetic(hotel_count: int, location_count: int, seed: int = 3) -> list[Hotel]:
+    rng = random.Random(seed)
+    hotels = []
+    for i in range(hotel_count):
+        available = (1 << HORIZON_DAYS) - 1
+        for _ in range(rng.randrange(0, 60)):
+            available &= ~(1 << rng.randrange(HORIZON_DAYS))
+        hotels.append(Hotel(f"H{i}", f"Hotel {i}", f"Area {i % location_count}", "Region",
+                            rng.randrange(200_000, 5_000_000, 10_000), round(rng.uniform(3.0, 5.0), 1),
+                            rng.randint(1, 4), {"standard": 10}, available))
+    return hotels
+
+
+def linear_search(hotels: list[Hotel], location: str, check_in: datetime.date, nights: int, guests: int,
+                  max_price: int, min_rating: float, limit: int) -> list[Hotel]:
+    mask = stay_mask(check_in, nights)
+    found = [hotel for hotel in hotels
+             if hotel.location == location and hotel.price <= max_price and hotel.rating >= min_rating
+             and hotel.max_guests >= guests and hotel.available & mask == mask]
+    return sorted(found, key=lambda hotel: -hotel.rating)[:limit]
+
+
+def main(hotel_counts: list[int], location_count: int, repeat: int):
+    print(f"{'hotels':>7} {'room-nights':>12} {'build ms':>9} {'indexed us':>11} {'linear us':>10}")
+    for count in hotel_counts:
+        hotels = synthetic(count, location_count)
+        start = time.perf_counter()
+        index = HotelIndex(hotels)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(1)
+        queries = [(f"Area {rng.randrange(location_count)}",
+                    EPOCH + datetime.timedelta(days=rng.randrange(HORIZON_DAYS - 14)), rng.randint(1, 7),
+                    rng.randint(1, 3), rng.choice([0, 1_000_000, 2_500_000]), rng.choice([0.0, 4.0, 4.5]))
+                   for _ in range(repeat)]
+        locations = {}
+        for location, *_ in queries:
+            locations.setdefault(location, index.location(Place(location, location)))
+
+        # The index part of search_hotel, without place resolution and result formatting.
+        start = time.perf_counter()
+        for location, check_in, nights, guests, max_price, min_rating in queries:
+            mask = stay_mask(check_in, nights)
+            high = max_price or float("inf")
+            found = 0
+            for hotel in locations[location].rated_at_least(min_rating):
+                if hotel.price <= high and hotel.max_guests >= guests and hotel.available & mask == mask:
+                    found += 1
+                    if found == 5:
+                        break
+        indexed = (time.perf_counter() - start) / repeat
+
+        linear_queries = queries[:max(10, repeat // 50)]
+        start = time.perf_counter()
+        for location, check_in, nights, guests, max_price, min_rating in linear_queries:
+            linear_search(hotels, location, check_in, nights, guests, max_price or 10**12, min_rating, 5)
+        linear = (time.perf_counter() - start) / len(linear_queries)
+
+        room_nights = sum(bin(hotel.available).count("1") for hotel in hotels)
+        print(f"{count:>7} {room_nights:>12,} {build_ms:>9.0f} {indexed * 1e6:>11.1f} {linear * 1e6:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hotel search benchmark")
+    parser.add_argument("--hotels", type=int, nargs="+", default=[1500, 15_000])
+    parser.add_argument("--locations", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.hotels, args.locations, args.repeat)
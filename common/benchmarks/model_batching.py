@@ -0,0 +1,199 @@
+"""Turn throughput with 500 concurrent sessions, with and without `BatchingLlm`.
+
+Starts a local HTTP stand-in for the model endpoint (Gemini REST shape,
+plus a batch route) in its own process. It behaves like a small model
+server: `--slots` forward passes at a time, each taking --base-latency plus
+--item-latency per request in it, and a 429 with Retry-After once more than
+--queue calls are waiting. Then it runs --sessions closed-loop users through
+an ADK Runner against it, for each client setup:
+
+- direct:  `GeminiRestLlm` alone, one HTTP call per turn, no retries;
+- pooled:  `BatchingLlm` without a window: connection limit, backpressure
+  and retries, still one call per turn;
+- batched: `BatchingLlm` with a --window ms window, sending up to
+  --max-batch requests per call over the batch route.
+
+    python -m common.benchmarks.model_batching --sessions 500 --duration 10
+
+Users start a new session every few turns. Questions come from 160
+variations, so a few first turns are identical and get coalesced.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common.benchmarks.server_workers import free_port
+
+CITIES = ("Bandung", "Cirebon", "Semarang", "Yogyakarta", "Solo", "Surabaya", "Malang", "Purwokerto")
+DAYS = ("besok", "lusa", "Jumat", "Sabtu", "Minggu")
+
+
+# --- The stand-in model server ---
+
+def serve(port: int, slots: int, base_latency: float, item_latency: float, queue: int):
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    forward_passes = asyncio.Semaphore(slots)
+    waiting = 0
+
+    def answer(body: dict) -> dict:
+        question = body["contents"][-1]["parts"][-1].get("text", "")
+        text = f"Ada 3 jadwal untuk pertanyaan: {question}"
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+                "usageMetadata": {"promptTokenCount": len(json.dumps(body)) // 4,
+                                  "candidatesTokenCount": len(text) // 4, "totalTokenCount": 0}}
+
+    async def model(request):
+        nonlocal waiting
+        name, _, method = request.path_params["name"].partition(":")
+        body = await request.json()
+        bodies = body["requests"] if method == "batchGenerate" else [body]
+        if waiting >= queue:
+            retry_after = waiting / slots * base_latency
+            return JSONResponse({"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}, status_code=429,
+                                headers={"Retry-After": f"{retry_after:.3f}"})
+        waiting += 1
+        try:
+            async with forward_passes:
+                await asyncio.sleep(base_latency + item_latency * len(bodies))
+        finally:
+            waiting -= 1
+        if method == "batchGenerate":
+            return JSONResponse({"responses": [answer(b) for b in bodies]})
+        return JSONResponse(answer(body))
+
+    app = Starlette(routes=[Route("/v1beta/models/{name}", model, methods=["POST"])])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+# --- The sessions ---
+
+def make_model(setup: str, base_url: str, args):
+    from common.model_batching import BatchingLlm, GeminiRestLlm
+
+    if setup == "direct":
+        return GeminiRestLlm(model="stand-in", base_url=base_url, max_connections=args.sessions)
+    if setup == "pooled":
+        return BatchingLlm(inner=GeminiRestLlm(model="stand-in", base_url=base_url,
+                                               max_connections=args.connections),
+                           window=0, max_batch=1, max_connections=args.connections)
+    return BatchingLlm(inner=GeminiRestLlm(model="stand-in", base_url=base_url, max_connections=args.connections,
+                                           batch_route=":batchGenerate"),
+                       window=args.window / 1000, max_batch=args.max_batch, max_connections=args.connections)
+
+
+async def drive(setup: str, base_url: str, args) -> dict:
+    from google.adk.agents.llm_agent import Agent
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from common.driver import run_turn
+
+    model = make_model(setup, base_url, args)
+    agent = Agent(name="bench_agent", model=model, instruction="Jawab pertanyaan jadwal kereta dengan singkat.")
+    runner = Runner(agent=agent, app_name="model_batching", session_service=InMemorySessionService(),
+                    auto_create_session=True)
+    stats = {"turns": 0, "errors": 0, "latencies": [], "first_error": None}
+    stop_at = 0.0
+
+    async def user(i: int):
+        rng = random.Random(i)
+        turn = 0
+        while time.monotonic() < stop_at:
+            query = f"Kereta dari Gambir ke {rng.choice(CITIES)} {rng.choice(DAYS)} pagi untuk {rng.randint(1, 4)} orang?"
+            result = await run_turn(runner, f"u{i}", f"s{i}-{turn // 4}", query)
+            turn += 1
+            if result.error:
+                stats["errors"] += 1
+                stats["first_error"] = stats["first_error"] or repr(result.error)
+                await asyncio.sleep(0.05)
+            else:
+                stats["turns"] += 1
+                stats["latencies"].append(result.latency)
+
+    for seconds in (2, args.duration):  # A short warm-up run, then the measured one.
+        stats.update(turns=0, errors=0, latencies=[])
+        if hasattr(model, "stats"):
+            model.stats.update(dict.fromkeys(model.stats, 0))
+        stop_at = time.monotonic() + seconds
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(args.sessions)))
+        stats["seconds"] = time.perf_counter() - start
+    stats.update(getattr(model, "stats", {}))
+    await (model.inner if hasattr(model, "inner") else model).aclose()
+    return stats
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--setups", nargs="+", default=["direct", "pooled", "batched"])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--connections", type=int, default=16, help="Connection limit of BatchingLlm.")
+    parser.add_argument("--window", type=float, default=5, help="Batching window, in ms.")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--slots", type=int, default=8, help="Forward passes the stand-in runs at once.")
+    parser.add_argument("--base-latency", type=float, default=0.05)
+    parser.add_argument("--item-latency", type=float, default=0.002)
+    parser.add_argument("--queue", type=int, default=64, help="Waiting calls before the stand-in answers 429.")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.slots, args.base_latency, args.item_latency, args.queue)
+        return
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-m", "common.benchmarks.model_batching", "--serve", str(port),
+                               "--slots", str(args.slots), "--base-latency", str(args.base_latency),
+                               "--item-latency", str(args.item_latency), "--queue", str(args.queue)],
+                              env=dict(os.environ, PYTHONPATH=os.getcwd()))
+    try:
+        base_url = f"http://127.0.0.1:{port}/v1beta"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/")
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("stand-in server did not start")
+                time.sleep(0.1)
+
+        print(f"{args.sessions} sessions; stand-in: {args.slots} slots, "
+              f"{args.base_latency * 1000:.0f} ms + {args.item_latency * 1000:.0f} ms/request, 429 past {args.queue} waiting")
+        print(f"{'setup':<8} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'calls':>7} "
+              f"{'retries':>8} {'coalesced':>10}")
+        first_errors = {}
+        for setup in args.setups:
+            stats = asyncio.run(drive(setup, base_url, args))
+            print(f"{setup:<8} {stats['turns'] / stats['seconds']:>8.1f} "
+                  f"{percentile(stats['latencies'], 0.5) * 1000:>8.1f} "
+                  f"{percentile(stats['latencies'], 0.95) * 1000:>8.1f} {stats['errors']:>7} "
+                  f"{stats.get('upstream_calls', '-'):>7} {stats.get('retries', '-'):>8} "
+                  f"{stats.get('coalesced', '-'):>10}")
+            if stats["first_error"]:
+                first_errors[setup] = stats["first_error"]
+        for setup, error in first_errors.items():
+            print(f"first error ({setup}): {error[:200]}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
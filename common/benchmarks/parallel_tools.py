@@ -0,0 +1,106 @@
+"""Turn time of a train + hotel request with sync tools vs `async_tool`.
+
+travel_agent_team answers "a train and a hotel" with one model response
+calling search_train and search_hotel. This runs that turn with the scripted
+model and the two lookups slowed down by a blocking sleep, as a remote
+backend would be (--train-latency, --hotel-latency), in two versions:
+
+- sync:  the plain functions, run on the event loop one after the other;
+- async: the same functions under `async_tool`, run in the thread pool.
+
+For each, --sessions users send the request back to back for --duration
+seconds, every turn on a fresh session (so the tool cache stays out of it).
+
+    python -m common.benchmarks.parallel_tools --sessions 1 20
+
+With one session the async turn takes the slower lookup instead of both;
+with more, sync tools also hold up every other session on the loop.
+"""
+import argparse
+import asyncio
+import functools
+import inspect
+import time
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from common.async_tools import async_tool, format_tool_stats, tool_stats
+from common.driver import run_turn
+from common.fake_llm import Rule, ScriptedLlm, with_models
+from travel_agent_team.agent import root_agent, search_hotel, search_train
+
+QUERY = "Cari kereta dari Gambir ke Bandung besok pagi dan hotel di Bandung 2 malam buat 2 orang"
+RULE = Rule(r"kereta dari (\w+) ke (\w+).*hotel di (\w+)", calls=[
+    ("search_train", {"origin": "{0}", "dest": "{1}", "date": "2026-01-01", "day_part": "pagi", "pax": 2}),
+    ("search_hotel", {"location": "{2}", "date": "2026-01-01", "nights": 2, "guests": 2})])
+
+
+def slowed(tool, seconds: float):
+    """The undecorated tool function, sleeping `seconds` first like a remote call."""
+    func = inspect.unwrap(tool)
+
+    @functools.wraps(func)
+    def slow(*args, **kwargs):
+        time.sleep(seconds)
+        return func(*args, **kwargs)
+
+    return slow
+
+
+async def drive(tools: list, sessions: int, duration: float, latency: float) -> dict:
+    agent = with_models(root_agent, {"travel_agent_team": ScriptedLlm(rules=[RULE], latency=latency)})
+    agent = agent.clone(update={"tools": tools, "sub_agents": []})
+    runner = Runner(agent=agent, app_name="parallel_tools", session_service=InMemorySessionService(),
+                    auto_create_session=True)
+    await run_turn(runner, "warm-up", "warm-up", QUERY)  # ADK's first-turn imports.
+    latencies, errors = [], 0
+    stop_at = time.monotonic() + duration
+
+    async def user(i: int):
+        nonlocal errors
+        turn = 0
+        while time.monotonic() < stop_at:
+            result = await run_turn(runner, f"u{i}", f"s{i}-{turn}", QUERY)
+            turn += 1
+            if result.error:
+                errors += 1
+            else:
+                latencies.append(result.latency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(sessions)))
+    return {"seconds": time.perf_counter() - start, "latencies": sorted(latencies), "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--train-latency", type=float, default=0.12)
+    parser.add_argument("--hotel-latency", type=float, default=0.2)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    train = slowed(search_train, args.train_latency)
+    hotel = slowed(search_hotel, args.hotel_latency)
+    versions = {"sync": [train, hotel], "async": [async_tool(timeout=10)(train), async_tool(timeout=10)(hotel)]}
+    print(f"tools {args.train_latency * 1000:.0f} + {args.hotel_latency * 1000:.0f} ms, "
+          f"2 model calls of {args.model_latency * 1000:.0f} ms per turn")
+    print(f"{'tools':<6} {'sessions':>8} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for sessions in args.sessions:
+        for name, tools in versions.items():
+            for latency in tool_stats.values():
+                latency.reset()
+            stats = asyncio.run(drive(tools, sessions, args.duration, args.model_latency))
+            values = stats["latencies"]
+            p50 = values[len(values) // 2] if values else 0.0
+            p95 = values[min(len(values) - 1, int(0.95 * len(values)))] if values else 0.0
+            print(f"{name:<6} {sessions:>8} {len(values) / stats['seconds']:>8.1f} {p50 * 1000:>8.1f} "
+                  f"{p95 * 1000:>8.1f} {stats['errors']:>7}")
+    print("\nper-tool latency of the last async run:")
+    print(format_tool_stats(["search_train", "search_hotel"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Throughput of the travel_agent_docker server by worker count.
+
+Starts `travel_agent_docker.server` with 1, 2, 4... workers on a local port,
+with the docker agent's model swapped for `ScriptedLlm`, and drives it over
+HTTP with --users closed-loop users (create a session, then /run turns back
+to back). Every turn is a search_train call plus the answer, so it measures
+the server's own per-turn work: HTTP, ADK runner, SQLite session writes.
+
+    python -m common.benchmarks.server_workers --workers 1 2 4 --users 64 --duration 10
+
+Extra workers only help up to the number of cores, and the load generator
+runs on the same box. --reload-after sends the server a SIGHUP mid-run to
+check that a graceful reload drops no requests.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+APP = "bench_travel_agent"
+
+AGENT_SOURCE = '''import os
+from common.fake_llm import Rule, ScriptedLlm, with_models
+from travel_agent_docker.agent import root_agent as docker_agent
+
+model = ScriptedLlm(rules=[Rule(r"dari (\\\\w+) ke (\\\\w+)", call="search_train",
+                                args={"origin": "{0}", "dest": "{1}", "date": "2026-01-01",
+                                      "day_part": "pagi", "pax": 2})],
+                    latency=float(os.environ["BENCH_MODEL_LATENCY"]))
+root_agent = with_models(docker_agent, {"root_agent": model})
+'''
+
+QUERY = "Saya mau cari kereta dari Gambir ke Bandung untuk 1 jan 2026 pagi buat 2 orang"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def write_agent(agents_dir: str):
+    package = os.path.join(agents_dir, APP)
+    os.makedirs(package)
+    with open(os.path.join(package, "__init__.py"), "w") as f:
+        f.write("from . import agent\n")
+    with open(os.path.join(package, "agent.py"), "w") as f:
+        f.write(AGENT_SOURCE)
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/list-apps")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def drive(client: httpx.AsyncClient, users: int, duration: float, server: subprocess.Popen,
+                reload_after: float) -> dict:
+    stats = {"turns": 0, "rejected": 0, "errors": 0, "latencies": []}
+    stop_at = time.monotonic() + duration
+
+    async def user(i: int):
+        session_id = None
+        while time.monotonic() < stop_at:
+            try:
+                if session_id is None:
+                    response = await client.post(f"/apps/{APP}/users/u{i}/sessions", json={})
+                    if response.status_code != 503:
+                        response.raise_for_status()
+                        session_id = response.json()["id"]
+                        continue
+                else:
+                    start = time.perf_counter()
+                    response = await client.post("/run", json={
+                        "app_name": APP, "user_id": f"u{i}", "session_id": session_id,
+                        "new_message": {"role": "user", "parts": [{"text": QUERY}]}})
+                    if response.status_code != 503:
+                        response.raise_for_status()
+                        stats["turns"] += 1
+                        stats["latencies"].append(time.perf_counter() - start)
+                        if stats["turns"] % 8 == i % 8:
+                            session_id = None  # New conversations now and then keep sessions short.
+                        continue
+                stats["rejected"] += 1
+            except httpx.HTTPError:
+                stats["errors"] += 1
+            await asyncio.sleep(0.05)
+
+    async def reload():
+        await asyncio.sleep(reload_after)
+        server.send_signal(signal.SIGHUP)
+
+    tasks = [user(i) for i in range(users)] + ([reload()] if reload_after else [])
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def run(workers: int, args) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        write_agent(tmp)
+        env = dict(os.environ, BENCH_MODEL_LATENCY=str(args.latency), PYTHONPATH=os.getcwd())
+        server = subprocess.Popen(
+            [sys.executable, "-m", "travel_agent_docker.server", "--agents-dir", tmp, "--port", str(port),
+             "--workers", str(workers), "--max-in-flight", str(args.max_in_flight),
+             "--session-db", os.path.join(tmp, "sessions.db"), "--log-level", "WARNING"],
+            env=env, stderr=subprocess.DEVNULL)
+        try:
+            async def main():
+                limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits,
+                                             timeout=60) as client:
+                    await wait_ready(client)
+                    await asyncio.sleep(workers * 0.5)  # Let every worker finish starting.
+                    await drive(client, args.users, 2, server, 0)  # Warm up imports and caches.
+                    return await drive(client, args.users, args.duration, server, args.reload_after)
+            return asyncio.run(main())
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="Scripted model latency per call.")
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--reload-after", type=float, default=0, help="Send SIGHUP this many seconds in.")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores, {args.users} users, model latency {args.latency * 1000:.0f} ms")
+    print(f"{'workers':>7} {'turns/s':>8} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'503s':>6} {'errors':>7}")
+    base = None
+    for workers in args.workers:
+        stats = run(workers, args)
+        rate = stats["turns"] / stats["seconds"]
+        base = base or rate
+        print(f"{workers:>7} {rate:>8.1f} {rate / base:>7.2f}x {percentile(stats['latencies'], 0.5) * 1000:>8.1f} "
+              f"{percentile(stats['latencies'], 0.95) * 1000:>8.1f} {stats['rejected']:>6} {stats['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measures LocalSessionService get_session latency with many stored sessions.
+
+    python -m common.benchmarks.session_store --sessions 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from google.adk.events.event import Event
+from google.genai import types
+
+from common.session_store import LocalSessionService
+
+
+async def populate(service: LocalSessionService, sessions: int, events_per_session: int):
+    for i in range(sessions):
+        session = await service.create_session(app_name="bench", user_id=f"user_{i % 500}",
+                                               session_id=f"session_{i}", state={"turn": 0})
+        for turn in range(events_per_session):
+            author = "user" if turn % 2 == 0 else "agent"
+            event = Event(invocation_id=f"inv_{i}_{turn // 2}", author=author,
+                          content=types.Content(role="user" if author == "user" else "model",
+                                                parts=[types.Part(text=f"message {turn}")]))
+            await service.append_event(session, event)
+
+
+async def time_gets(service: LocalSessionService, keys: list[int]) -> float:
+    start = time.perf_counter()
+    for i in keys:
+        await service.get_session(app_name="bench", user_id=f"user_{i % 500}", session_id=f"session_{i}")
+    return (time.perf_counter() - start) / len(keys)
+
+
+async def main(sessions: int, events_per_session: int, lookups: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        service = LocalSessionService(path, cache_size=lookups)
+        start = time.perf_counter()
+        await populate(service, sessions, events_per_session)
+        service.close()
+        print(f"populated {sessions} sessions x {events_per_session} events in {time.perf_counter() - start:.1f} s")
+
+        keys = [(i * 7919) % sessions for i in range(lookups)]
+        service = LocalSessionService(path, cache_size=lookups)
+        cold = await time_gets(service, keys)
+        warm = await time_gets(service, keys)
+        print(f"get_session cold (decode from disk): {cold * 1e6:8.1f} us")
+        print(f"get_session warm (cached):           {warm * 1e6:8.1f} us")
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LocalSessionService get_session benchmark")
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--events", type=int, default=6, help="Events stored per session.")
+    parser.add_argument("--lookups", type=int, default=5_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.events, args.lookups))
@@ -0,0 +1,74 @@
+"""End-to-end wall time of the socmed pipeline: sequential chain versus parallel drafts.
+
+Both pipelines produce three drafts. The sequential chain writes them in one
+creation_agent call; the fan-out pipeline runs three draft agents at once.
+The scripted models charge a fixed latency per call plus a per-token
+generation time, so the one long creation answer costs what three short
+ones cost back to back.
+
+    python -m common.benchmarks.socmed_pipeline --runs 5 --latency 0.3 --token-latency 0.01
+"""
+import argparse
+import asyncio
+import statistics
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from common.driver import run_turn
+from common.fake_llm import Rule, ScriptedLlm, with_models
+from socmed_agent.agent import DRAFT_ANGLES, fanout_agent, sequential_agent
+
+SUMMARY = "Food posts trend towards quick recipes, street food and colourful drinks. " * 3
+DRAFT = "Craving something new? 🍜 Try a 10-minute street-food bowl tonight and tag us! #FoodieFriday 🔥 " * 2
+VERDICT = "Draft 1 fits teens best: short, bold and shareable.\n\n" + DRAFT
+
+
+def models(agent_names: list[str], latency: float, token_latency: float) -> dict[str, ScriptedLlm]:
+    def model(default_text, rules=()):
+        return ScriptedLlm(rules=list(rules), default_text=default_text, tool_reply=SUMMARY,
+                           latency=latency, token_latency=token_latency)
+
+    texts = {"creation_agent": "\n\n".join(f"{i}. {DRAFT}" for i in range(1, len(DRAFT_ANGLES) + 1)),
+             "publisher_agent": VERDICT}
+    result = {name: model(texts.get(name, DRAFT)) for name in agent_names}
+    result["summarization_agent"] = model(SUMMARY, [Rule(r".", call="post_stats")])
+    return result
+
+
+def llm_agent_names(agent) -> list[str]:
+    names = [agent.name] if hasattr(agent, "model") else []
+    for sub_agent in agent.sub_agents:
+        names += llm_agent_names(sub_agent)
+    return names
+
+
+async def time_pipeline(agent, runs: int, latency: float, token_latency: float) -> tuple[list[float], int]:
+    scripted = models(llm_agent_names(agent), latency, token_latency)
+    runner = Runner(agent=with_models(agent, scripted), app_name="bench",
+                    session_service=InMemorySessionService(), auto_create_session=True)
+    times = []
+    for i in range(runs):
+        result = await run_turn(runner, "bench", f"session_{i}", "Please start the social media content workflow.",
+                                author="publisher_agent")
+        if result.error:
+            raise result.error
+        times.append(result.latency)
+    return times, sum(model.calls for model in scripted.values())
+
+
+async def main(runs: int, latency: float, token_latency: float):
+    print(f"{'pipeline':>10} {'p50 s':>8} {'min s':>8} {'llm calls/run':>14}")
+    for label, agent in [("sequential", sequential_agent), ("fanout", fanout_agent)]:
+        await time_pipeline(agent, 1, 0, 0)  # Warm up imports and tool declarations.
+        times, calls = await time_pipeline(agent, runs, latency, token_latency)
+        print(f"{label:>10} {statistics.median(times):>8.2f} {min(times):>8.2f} {calls / runs:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="socmed pipeline benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fixed seconds per model call.")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Seconds per generated token.")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.latency, args.token_latency))
@@ -0,0 +1,77 @@
+"""Query cost of the indexed train timetable versus a linear scan of all trips.
+
+    python -m common.benchmarks.train_schedule --trips 10000 100000 300000 --stations 400
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common.train_schedule import DAY_PARTS, Station, TrainSchedule, Trip, day_part_of
+
+START = datetime.date(2025, 1, 1).toordinal()
+END = datetime.date(2026, 12, 31).toordinal()
+
+
+def synthetic(trip_count: int, station_count: int, seed: int = 7):
+    """Stations S0..Sn in cities C0..C(n/2), and random trips between them."""
+    rng = random.Random(seed)
+    stations = [Station(f"S{i}", f"Station {i}", f"City {i // 2}") for i in range(station_count)]
+    trips = []
+    for i in range(trip_count):
+        origin, dest = rng.sample(range(station_count), 2)
+        departure = rng.randrange(0, 1440, 5)
+        days = "".join(rng.choice("1110") for _ in range(7))
+        trips.append((Trip(f"Train {i}", f"S{origin}", f"S{dest}", departure,
+                           departure + rng.randrange(60, 900, 5), rng.randrange(50_000, 900_000, 5000),
+                           rng.randrange(0, 120), START, END), days))
+    return stations, trips
+
+
+def linear_search(trips, origins, dests, date: str, day_part: str, pax: int):
+    """What a search costs without an index: check every trip."""
+    day = datetime.date.fromisoformat(date)
+    ordinal, weekday = day.toordinal(), day.weekday()
+    found = [trip for trip, days in trips
+             if trip.origin in origins and trip.dest in dests and days[weekday] == "1"
+             and trip.start <= ordinal <= trip.end and trip.seats >= pax
+             and (not day_part or day_part_of(trip.departure) == day_part)]
+    found.sort(key=lambda trip: trip.departure)
+    return found
+
+
+def main(trip_counts: list[int], station_count: int, repeat: int):
+    print(f"stations: {station_count}")
+    print(f"{'trips':>8} {'build ms':>9} {'indexed us':>11} {'linear us':>10} {'avg hits':>9}")
+    for count in trip_counts:
+        stations, trips = synthetic(count, station_count)
+        start = time.perf_counter()
+        schedule = TrainSchedule(stations, [], trips)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(1)
+        cities = sorted({station.city for station in stations})
+        queries = [(*rng.sample(cities, 2),
+                    (datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randrange(700))).isoformat(),
+                    rng.choice([""] + list(DAY_PARTS)), rng.randint(1, 4))
+                   for _ in range(repeat)]
+
+        start = time.perf_counter()
+        hits = sum(schedule.search(*query)["total_matches"] for query in queries)
+        indexed = (time.perf_counter() - start) / repeat
+
+        linear_queries = queries[:max(5, repeat // 100)]
+        start = time.perf_counter()
+        for origin, dest, date, day_part, pax in linear_queries:
+            linear_search(trips, set(schedule.resolve(origin)), set(schedule.resolve(dest)), date, day_part, pax)
+        linear = (time.perf_counter() - start) / len(linear_queries)
+        print(f"{count:>8} {build_ms:>9.0f} {indexed * 1e6:>11.1f} {linear * 1e6:>10.0f} {hits / repeat:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train timetable search benchmark")
+    parser.add_argument("--trips", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--stations", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.trips, args.stations, args.repeat)
@@ -0,0 +1,84 @@
+"""Per-call cost of the indexed weather dataset versus rebuilding a dict literal per call.
+
+    python -m common.benchmarks.weather_lookup --cities 3 1000 10000 50000
+"""
+import argparse
+import csv
+import os
+import random
+import string
+import tempfile
+import time
+
+from common.weather_data import WeatherData
+
+CONDITIONS = ["sunny", "cloudy", "light rain", "thunderstorms", "foggy", "windy"]
+
+
+def random_cities(count: int, seed: int = 7) -> list[tuple[str, str, float, str]]:
+    """(name, aliases, temp_c, condition) rows with unique two-word names."""
+    rng = random.Random(seed)
+    rows, seen = [], set()
+    while len(rows) < count:
+        name = " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 8))).title()
+                        for _ in range(2))
+        if name in seen:
+            continue
+        seen.add(name)
+        alias = "".join(word[0] for word in name.split()) + str(len(rows))
+        rows.append((name, alias, rng.randint(-10, 40), rng.choice(CONDITIONS)))
+    return rows
+
+
+def rebuild_lookup(rows, city: str):
+    """The original approach: build the whole dict on every call, then look up."""
+    db = {name.lower().replace(" ", ""): {"temp_c": temp_c, "condition": condition}
+          for name, _, temp_c, condition in rows}
+    return db.get(city.lower().replace(" ", ""))
+
+
+def time_per_call(fn, queries: list[str]) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main(city_counts: list[int], repeat: int):
+    print(f"{'cities':>7} {'load ms':>8} {'rebuild us':>11} {'exact us':>9} {'alias us':>9} "
+          f"{'fuzzy us':>9} {'fuzzy hit':>10}")
+    for count in city_counts:
+        rows = random_cities(count)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cities.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["name", "aliases", "temp_c", "condition"])
+                writer.writerows(rows)
+            start = time.perf_counter()
+            data = WeatherData.from_csv(path)
+            load_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(1)
+        sample = [rng.choice(rows) for _ in range(repeat)]
+        exact = [name for name, *_ in sample]
+        aliases = [alias for _, alias, *_ in sample]
+        # One dropped letter per query; the fuzzy cache only helps repeated typos.
+        typos = [name[:i] + name[i + 1:] for name in exact for i in [rng.randint(1, len(name) - 1)]]
+
+        rebuild_repeat = max(10, min(repeat, 200_000 // count))
+        rebuild = time_per_call(lambda q: rebuild_lookup(rows, q), exact[:rebuild_repeat])
+        exact_us = time_per_call(data.lookup, exact)
+        alias_us = time_per_call(data.lookup, aliases)
+        fuzzy_us = time_per_call(data.lookup, typos)
+        fuzzy_hits = sum(data.lookup(q) is not None for q in typos) / len(typos)
+        print(f"{count:>7} {load_ms:>8.1f} {rebuild * 1e6:>11.1f} {exact_us * 1e6:>9.2f} "
+              f"{alias_us * 1e6:>9.2f} {fuzzy_us * 1e6:>9.1f} {fuzzy_hits:>10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weather lookup benchmark")
+    parser.add_argument("--cities", type=int, nargs="+", default=[3, 1000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.cities, args.repeat)
@@ -0,0 +1,247 @@
+"""Seat and room inventory with atomic reserve / confirm / release.
+
+`BookingLedger` keeps one inventory row per (resource, date), e.g.
+("train:Argo Semeru 6", "2025-12-10") or ("hotel:Bali Resort & Spa:deluxe",
+"2026-01-01"), in a local SQLite file. A reservation takes seats or rooms
+with a conditional update inside one ``BEGIN IMMEDIATE`` transaction:
+
+    UPDATE inventory SET reserved = reserved + :qty
+    WHERE resource = :resource AND date = :date AND reserved + :qty <= capacity
+
+If any row does not have room, the whole reservation rolls back. So two
+sessions can never both get the last seat, even when they run in different
+processes on the same file.
+
+Every reservation carries an idempotency key, e.g. the invocation id plus the
+tool arguments. A retry with the same key returns the first booking instead
+of taking more seats. Reservations start as holds that expire after
+`hold_seconds` unless confirmed (e.g. by the payment callback), or are
+confirmed at once with ``confirmed=True`` when there is no payment step, as
+in the agents' booking tools. Reads expire stale holds first, so the units
+of an abandoned hold show up as free again:
+
+    ledger = BookingLedger("bookings.db")
+    booking = ledger.reserve("train:Argo Semeru 6", ["2025-12-10"], quantity=2, holder="Zulkifli",
+                             key="inv-123:book_train:Argo Semeru 6", capacity=50)
+    ledger.confirm(booking.code)
+"""
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory (
+    resource TEXT NOT NULL,
+    date TEXT NOT NULL,
+    capacity INTEGER NOT NULL,
+    reserved INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (resource, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bookings (
+    code TEXT PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    resource TEXT NOT NULL,
+    dates TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    holder TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookings_holds ON bookings (resource, status, expires_at);
+"""
+
+DEFAULT_DB = os.path.join(os.path.dirname(__file__), "bookings.db")
+
+HELD, CONFIRMED, RELEASED, EXPIRED = "held", "confirmed", "released", "expired"
+
+
+class BookingError(Exception):
+    """A reservation or state change that cannot be done."""
+
+
+class SoldOutError(BookingError):
+    """Not enough seats or rooms left on one of the requested dates."""
+
+
+@dataclass(frozen=True)
+class Booking:
+    code: str
+    resource: str
+    dates: tuple[str, ...]
+    quantity: int
+    holder: str
+    status: str
+    expires_at: float
+
+    def as_dict(self) -> dict:
+        result = {"booking_code": self.code, "status": self.status, "dates": list(self.dates),
+                  "quantity": self.quantity, "name": self.holder}
+        if self.status == HELD:
+            result["hold_expires_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.expires_at))
+        return result
+
+
+class BookingLedger:
+    """Inventory and bookings in one SQLite file, safe across threads and processes."""
+
+    def __init__(self, db_path: str, hold_seconds: float = 900):
+        self.db_path = db_path
+        self.hold_seconds = hold_seconds
+        self._db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _transaction(self, work):
+        """Runs `work(db)` in one write transaction and returns its result."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def reserve(self, resource: str, dates: list[str], quantity: int, holder: str, key: str,
+                capacity: int, confirmed: bool = False) -> Booking:
+        """Holds `quantity` units of `resource` on every date, all or nothing.
+
+        `capacity` seeds the inventory row the first time a (resource, date)
+        is booked. With `confirmed` the booking is confirmed right away
+        instead of held. Raises SoldOutError if any date lacks room.
+        """
+        if quantity < 1:
+            raise BookingError("Quantity must be at least 1.")
+
+        def work(db):
+            existing = db.execute("SELECT * FROM bookings WHERE idempotency_key = ?", (key,)).fetchone()
+            if existing:
+                return _booking(existing)
+            now = time.time()
+            self._expire_holds(db, resource, now)
+            for date in dates:
+                db.execute("INSERT OR IGNORE INTO inventory (resource, date, capacity) VALUES (?, ?, ?)",
+                           (resource, date, capacity))
+                taken = db.execute(
+                    "UPDATE inventory SET reserved = reserved + ? "
+                    "WHERE resource = ? AND date = ? AND reserved + ? <= capacity",
+                    (quantity, resource, date, quantity)).rowcount
+                if not taken:
+                    left = db.execute("SELECT capacity - reserved FROM inventory WHERE resource = ? AND date = ?",
+                                      (resource, date)).fetchone()[0]
+                    raise SoldOutError(f"Only {left} left for {resource.split(':', 1)[-1]} on {date}.")
+            code = _new_code(db)
+            status = CONFIRMED if confirmed else HELD
+            db.execute("INSERT INTO bookings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (code, key, resource, ",".join(dates), quantity, holder, status, now,
+                        now + self.hold_seconds))
+            return Booking(code, resource, tuple(dates), quantity, holder, status, now + self.hold_seconds)
+
+        return self._transaction(work)
+
+    def confirm(self, code: str) -> Booking:
+        """Turns a hold into a confirmed booking (e.g. once it is paid)."""
+        def work(db):
+            booking = self._get(db, code)
+            if booking.status == CONFIRMED:
+                return booking
+            if booking.status != HELD or booking.expires_at < time.time():
+                raise BookingError(f"Booking {code} is {booking.status if booking.status != HELD else EXPIRED}.")
+            db.execute("UPDATE bookings SET status = ? WHERE code = ?", (CONFIRMED, code))
+            return self._get(db, code)
+
+        return self._transaction(work)
+
+    def release(self, code: str) -> Booking:
+        """Cancels a held or confirmed booking and returns its units to the inventory."""
+        def work(db):
+            booking = self._get(db, code)
+            if booking.status in (HELD, CONFIRMED):
+                self._give_back(db, booking, RELEASED)
+            return self._get(db, code)
+
+        return self._transaction(work)
+
+    def available(self, resource: str, date: str) -> Optional[int]:
+        """Units left on `date`, or None if nothing was ever booked there."""
+        self._expire_stale(resource)
+        with self._lock:
+            row = self._db.execute("SELECT capacity - reserved FROM inventory WHERE resource = ? AND date = ?",
+                                   (resource, date)).fetchone()
+        return row[0] if row else None
+
+    def reserved(self, resource: str, date: str) -> int:
+        """Units held or confirmed on `date`, not counting expired holds."""
+        self._expire_stale(resource)
+        with self._lock:
+            row = self._db.execute("SELECT reserved FROM inventory WHERE resource = ? AND date = ?",
+                                   (resource, date)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, code: str) -> Booking:
+        with self._lock:
+            return self._get(self._db, code)
+
+    def close(self):
+        self._db.close()
+
+    def _get(self, db, code: str) -> Booking:
+        row = db.execute("SELECT * FROM bookings WHERE code = ?", (code,)).fetchone()
+        if row is None:
+            raise BookingError(f"Unknown booking {code}.")
+        return _booking(row)
+
+    def _give_back(self, db, booking: Booking, status: str):
+        for date in booking.dates:
+            db.execute("UPDATE inventory SET reserved = reserved - ? WHERE resource = ? AND date = ?",
+                       (booking.quantity, booking.resource, date))
+        db.execute("UPDATE bookings SET status = ? WHERE code = ?", (status, booking.code))
+
+    def _expire_stale(self, resource: str):
+        # A cheap indexed check first, so reads only write when a hold has run out.
+        now = time.time()
+        with self._lock:
+            stale = self._db.execute("SELECT 1 FROM bookings WHERE resource = ? AND status = ? AND expires_at < ? "
+                                     "LIMIT 1", (resource, HELD, now)).fetchone()
+        if stale:
+            self._transaction(lambda db: self._expire_holds(db, resource, now))
+
+    def _expire_holds(self, db, resource: str, now: float):
+        rows = db.execute("SELECT * FROM bookings WHERE resource = ? AND status = ? AND expires_at < ?",
+                          (resource, HELD, now)).fetchall()
+        for row in rows:
+            self._give_back(db, _booking(row), EXPIRED)
+
+
+def _new_code(db) -> str:
+    """A booking code no booking has yet; the write lock keeps it free until the insert."""
+    while True:
+        code = secrets.token_hex(4).upper()
+        if db.execute("SELECT 1 FROM bookings WHERE code = ?", (code,)).fetchone() is None:
+            return code
+
+
+def _booking(row) -> Booking:
+    code, _, resource, dates, quantity, holder, status, _, expires_at = row
+    return Booking(code, resource, tuple(dates.split(",")), quantity, holder, status, expires_at)
+
+
+_default: Optional[BookingLedger] = None
+_default_lock = threading.Lock()
+
+
+def default() -> BookingLedger:
+    """The shared ledger at BOOKINGS_DB (common/bookings.db by default)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = BookingLedger(os.environ.get("BOOKINGS_DB", DEFAULT_DB))
+        return _default
@@ -0,0 +1,205 @@
+"""Drives user turns through an ADK Runner, one at a time or many concurrently.
+
+`run_turn` and `call_agent_async` wait for the final response. `stream_turn`
+runs the turn with SSE streaming and yields the text as it arrives, so users
+see the answer being written instead of waiting for the whole of it.
+"""
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable, Iterable, Optional
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.genai import types
+
+
+@dataclass
+class TurnResult:
+    """Outcome and timing of one user turn."""
+    user_id: str
+    session_id: str
+    query: str
+    response: str = ""
+    events: int = 0
+    started_at: float = 0.0
+    latency: float = 0.0
+    first_token: Optional[float] = None
+    """Seconds until the first response text arrived (streamed turns only)."""
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class StreamEvent:
+    """One update of a streamed turn.
+
+    `kind` is "text" (a chunk of model text), "tool_start" (`data` holds the
+    call arguments), "tool_end" (`data` holds the tool result), "final" (`text`
+    holds the full answer) or "error".
+    """
+    kind: str
+    author: str
+    text: str = ""
+    tool: str = ""
+    data: Optional[dict] = None
+    elapsed: float = 0.0
+
+
+def final_response_text(event) -> str:
+    """Extracts the text of a final response event."""
+    if event.content and event.content.parts:
+        return event.content.parts[0].text
+    return f"No response. {event.error_message if event.error_message else ''}"
+
+
+async def run_turn(runner, user_id: str, session_id: str, query: str,
+                   author: Optional[str] = None,
+                   on_event: Optional[Callable] = None) -> TurnResult:
+    """Runs one query and records the final response, event count and latency.
+
+    Errors are stored on the result instead of raised. If `author` is given,
+    only a final response from that agent ends the turn (useful for workflow
+    agents where every sub-agent emits its own final response).
+    """
+    result = TurnResult(user_id=user_id, session_id=session_id, query=query)
+    content = types.Content(role='user', parts=[types.Part(text=query)])
+    result.started_at = time.perf_counter()
+    events = runner.run_async(user_id=user_id, session_id=session_id, new_message=content)
+    try:
+        # RUNNER MAIN LOGIC: loop through events
+        async for event in events:
+            result.events += 1
+            if on_event:
+                on_event(event)
+            # Key Concept: is_final_response() marks the concluding message for the turn.
+            if event.is_final_response() and (author is None or event.author == author):
+                result.response = final_response_text(event)
+                break # Stop processing events once the final response is found
+    except Exception as e:
+        result.error = e
+    finally:
+        # Close the generator in this task, so the runner's tracing context is
+        # unwound here rather than by the garbage collector in another task.
+        await events.aclose()
+    result.latency = time.perf_counter() - result.started_at
+    return result
+
+
+async def call_agent_async(query: str, runner, user_id, session_id,
+                           author: Optional[str] = None,
+                           on_event: Optional[Callable] = None) -> str:
+    """Sends a query to the agent and returns the final response text."""
+    result = await run_turn(runner, user_id, session_id, query, author=author, on_event=on_event)
+    if result.error:
+        raise result.error
+    return result.response
+
+
+async def stream_turn(runner, user_id: str, session_id: str, query: str,
+                      author: Optional[str] = None,
+                      result: Optional[TurnResult] = None) -> AsyncGenerator[StreamEvent, None]:
+    """Runs one query with SSE streaming and yields text, tool and final events.
+
+    Every piece of text is yielded once as a "text" event: as partial chunks
+    when the model streams, or in one piece when it does not. Timings, the
+    event count and the final response are recorded on `result` if given.
+    Errors end the stream with an "error" event and are stored on `result`.
+    """
+    if result is None:
+        result = TurnResult(user_id=user_id, session_id=session_id, query=query)
+    content = types.Content(role='user', parts=[types.Part(text=query)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+    result.started_at = time.perf_counter()
+    events = runner.run_async(user_id=user_id, session_id=session_id, new_message=content,
+                              run_config=run_config)
+    streamed = False  # Whether the current message already went out in partial chunks.
+    try:
+        async for event in events:
+            result.events += 1
+            elapsed = time.perf_counter() - result.started_at
+            texts = [part.text for part in (event.content.parts if event.content else None) or []
+                     if part.text and not part.thought]
+            if texts and (event.partial or not streamed):
+                if result.first_token is None:
+                    result.first_token = elapsed
+                yield StreamEvent("text", event.author, text="".join(texts), elapsed=elapsed)
+            if event.partial:
+                streamed = streamed or bool(texts)
+                continue
+            streamed = False
+
+            for call in event.get_function_calls():
+                yield StreamEvent("tool_start", event.author, tool=call.name, data=call.args,
+                                  elapsed=elapsed)
+            for response in event.get_function_responses():
+                yield StreamEvent("tool_end", event.author, tool=response.name,
+                                  data=response.response, elapsed=elapsed)
+            if event.is_final_response() and (author is None or event.author == author):
+                result.response = final_response_text(event)
+                result.latency = time.perf_counter() - result.started_at
+                yield StreamEvent("final", event.author, text=result.response, elapsed=result.latency)
+                break
+    except Exception as e:
+        result.error = e
+        yield StreamEvent("error", "", text=str(e), elapsed=time.perf_counter() - result.started_at)
+    finally:
+        await events.aclose()
+        result.latency = time.perf_counter() - result.started_at
+
+
+async def run_turns(runner, turns: Iterable[tuple[str, str, str]], concurrency: int = 10,
+                    author: Optional[str] = None) -> list[TurnResult]:
+    """Runs (user_id, session_id, query) triples with at most `concurrency` in flight.
+
+    Turns that share a session are run in their given order, one after another,
+    because each turn builds on the session history of the previous one.
+    Different sessions run concurrently. Results come back in input order.
+    """
+    turns = list(turns)
+    results: list[Optional[TurnResult]] = [None] * len(turns)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    by_session: dict[tuple[str, str], list[int]] = {}
+    for i, (user_id, session_id, _) in enumerate(turns):
+        by_session.setdefault((user_id, session_id), []).append(i)
+
+    async def drive_session(indexes: list[int]):
+        for i in indexes:
+            user_id, session_id, query = turns[i]
+            async with semaphore:
+                results[i] = await run_turn(runner, user_id, session_id, query, author=author)
+
+    await asyncio.gather(*(drive_session(indexes) for indexes in by_session.values()))
+    return results
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(results: list[TurnResult]) -> dict:
+    """Aggregates per-turn timings into latency percentiles and throughput."""
+    latencies = [r.latency for r in results if r.error is None]
+    first_tokens = [r.first_token for r in results if r.first_token is not None]
+    events = sum(r.events for r in results)
+    if results:
+        wall = max(r.started_at + r.latency for r in results) - min(r.started_at for r in results)
+    else:
+        wall = 0.0
+    return {
+        "turns": len(results),
+        "errors": sum(1 for r in results if r.error is not None),
+        "wall_time_s": wall,
+        "turns_per_s": len(results) / wall if wall else 0.0,
+        "events_per_s": events / wall if wall else 0.0,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "p99_s": percentile(latencies, 99),
+        "first_token_p50_s": percentile(first_tokens, 50),
+        "first_token_p95_s": percentile(first_tokens, 95),
+    }
@@ -0,0 +1,446 @@
+"""Replays .evalset.json files against an agent, many cases at once.
+
+    python -m common.eval_runner travel_agent/evalsetfc1936.evalset.json --workers 32
+    python -m common.eval_runner travel_agent/*.evalset.json --repeat 1000 --latency 0.01
+
+Compact .evalpack files (see `common.evalpack`) are read the same way.
+
+Evalset files are parsed as a stream: cases are decoded one at a time from
+the ``eval_cases`` array and handed to a bounded pool of workers, so memory
+stays flat however big the files are. Each case gets a fresh session
+(seeded from its ``session_input``). Its turns are replayed in order and
+compared with the recording:
+
+- tool trajectory: the tool calls of the turn, names and arguments, must be
+  exactly the recorded ones;
+- final response: ROUGE-1 F1 between the answer and the recorded answer must
+  reach --threshold (0.8, like ADK's response_match_score).
+
+By default the model is `ReplayLlm`, which plays back the recorded model
+turns (tool calls, then the final answer). So a run needs no network, and it
+checks the tools, callbacks and plumbing around the model. Use --model agent
+to call the agent's own model instead.
+
+Cases share one agent, runner and in-memory session store, so a replayed
+turn costs about what ADK itself costs (a few ms of CPU); --processes
+spreads the cases over several cores.
+
+The agent is ``<package>.agent:root_agent`` of the evalset's directory, or
+--agent module:attr. Bookings go to a temporary ledger and response caches
+are off, so replays never touch real inventory or each other.
+"""
+import argparse
+import asyncio
+import contextvars
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Iterable, Iterator, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from common.session_store import LocalSessionService
+from google.genai import types
+
+from common.fake_llm import OTHER_AGENT_PREFIX, latest_user_text, usage, with_models
+
+CASES_KEY = "eval_cases"
+_WHITESPACE = re.compile(r"\s*")
+_TOKEN = re.compile(r"\w+")
+
+
+class _StreamDecoder:
+    """Decodes JSON values one by one from a file read in chunks."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, or "" at the end of the file."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in evalset at offset {self.pos}, found {self.peek()!r}.")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_eval_cases(path: str, chunk_size: int = 1 << 16, meta: Optional[dict] = None) -> Iterator[dict]:
+    """Yields the eval cases of an evalset file one at a time.
+
+    The other top-level fields (eval_set_id, name, ...) go into `meta` if given.
+    """
+    if path.endswith(".evalpack"):
+        from common import evalpack
+        with evalpack.EvalPack(path) as pack:
+            if meta is not None:
+                meta.update(pack.meta)
+            yield from pack
+        return
+    with open(path, encoding="utf-8") as f:
+        stream = _StreamDecoder(f, chunk_size)
+        stream.expect("{")
+        while stream.peek() not in ("}", ""):
+            key = stream.value()
+            stream.expect(":")
+            if key == CASES_KEY:
+                stream.expect("[")
+                while stream.peek() != "]":
+                    yield stream.value()
+                    if stream.peek() == ",":
+                        stream.expect(",")
+                stream.expect("]")
+            else:
+                value = stream.value()
+                if meta is not None:
+                    meta[key] = value
+            if stream.peek() == ",":
+                stream.expect(",")
+
+
+def _content(data: dict) -> types.Content:
+    parts = [{key: value for key, value in part.items() if key != "thought_signature"}
+             for part in data.get("parts", [])]
+    return types.Content.model_validate({**data, "parts": parts})
+
+
+def _text(content: Optional[types.Content]) -> str:
+    if content is None:
+        return ""
+    return "".join(part.text for part in content.parts or () if part.text and not part.thought)
+
+
+def _call_key(name: str, args: Optional[dict]) -> tuple[str, str]:
+    return name, json.dumps(args or {}, sort_keys=True, default=str)
+
+
+@dataclass
+class ExpectedTurn:
+    """One recorded user turn: the message, the model's steps and the tool calls it made."""
+    user: types.Content
+    final: types.Content
+    steps: list[types.Content]
+    """Model contents in order (tool calls, then the final answer)."""
+    tool_calls: list[tuple[str, str]]
+
+    @classmethod
+    def from_invocation(cls, invocation: dict) -> "ExpectedTurn":
+        final = _content(invocation.get("final_response") or {"role": "model", "parts": []})
+        steps, calls = [], []
+        intermediate = invocation.get("intermediate_data") or {}
+        for event in intermediate.get("invocation_events", []):
+            content = _content(event.get("content") or {})
+            if content.role == "model":
+                steps.append(content)
+                calls += [_call_key(part.function_call.name, part.function_call.args)
+                          for part in content.parts or () if part.function_call]
+        if not intermediate.get("invocation_events"):
+            # Older evalsets only list the tool uses.
+            calls = [_call_key(use["name"], use.get("args")) for use in intermediate.get("tool_uses", [])]
+            steps = [types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+                name=name, args=json.loads(args)))]) for name, args in calls]
+        return cls(_content(invocation["user_content"]), final, steps + [final], calls)
+
+
+def recording(turns: Iterable[ExpectedTurn]) -> dict[str, list[list[types.Content]]]:
+    """Model steps per user message, in the order the message was sent."""
+    steps: dict[str, list[list[types.Content]]] = {}
+    for turn in turns:
+        steps.setdefault(_text(turn.user), []).append(turn.steps)
+    return steps
+
+
+# The recording of the case being replayed. Workers set it before each case
+# and the tasks ADK starts inherit it, so one agent and model serve them all.
+current_recording: contextvars.ContextVar[dict] = contextvars.ContextVar("current_recording")
+
+
+class ReplayLlm(BaseLlm):
+    """Plays back the recorded model steps of the case in `current_recording`."""
+
+    model: str = "replay"
+    latency: float = 0.0
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"replay.*"]
+
+    def _respond(self, llm_request: LlmRequest) -> types.Content:
+        query = latest_user_text(llm_request)
+        recorded = current_recording.get({}).get(query)
+        if not recorded:
+            return types.Content(role="model", parts=[types.Part(text="")])
+        # The same message may come back later in the case: count its repeats,
+        # then the model steps already taken since it.
+        seen, taken = 0, 0
+        for content in llm_request.contents:
+            texts = [part.text for part in content.parts or () if part.text]
+            if content.role == "user" and texts and not texts[0].startswith(OTHER_AGENT_PREFIX):
+                if " ".join(texts) == query:
+                    seen, taken = seen + 1, 0
+            elif content.role == "model":
+                taken += 1
+        steps = recorded[min(max(seen, 1), len(recorded)) - 1]
+        return steps[min(taken, len(steps) - 1)]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        content = self._respond(llm_request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        yield LlmResponse(content=content, partial=False, turn_complete=True,
+                          usage_metadata=usage(llm_request, content))
+
+
+def rouge1(candidate: str, reference: str) -> float:
+    """ROUGE-1 F1 of two texts, on lower-cased word tokens."""
+    got, want = Counter(_TOKEN.findall(candidate.lower())), Counter(_TOKEN.findall(reference.lower()))
+    if not got or not want:
+        return float(got == want)
+    overlap = sum((got & want).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(got.values()), overlap / sum(want.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+@dataclass
+class CaseResult:
+    eval_set: str
+    eval_id: str
+    turns: int = 0
+    tool_matches: int = 0
+    response_scores: list[float] = field(default_factory=list)
+    turn_latencies: list[float] = field(default_factory=list)
+    latency: float = 0.0
+    error: Optional[str] = None
+    passed: bool = False
+
+    def as_dict(self) -> dict:
+        return {"eval_set": self.eval_set, "eval_id": self.eval_id, "passed": self.passed,
+                "turns": self.turns, "tool_trajectory_score": self.tool_matches / self.turns if self.turns else 0.0,
+                "response_scores": [round(score, 3) for score in self.response_scores],
+                "latency_s": round(self.latency, 4),
+                "turn_latencies_s": [round(latency, 4) for latency in self.turn_latencies],
+                "error": self.error}
+
+
+def _llm_agent_names(agent) -> list[str]:
+    names, pending = [], [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if hasattr(current, "model"):
+            names.append(current.name)
+    return names
+
+
+@dataclass
+class EvalCase:
+    eval_set: str
+    eval_id: str
+    turns: list[ExpectedTurn]
+    user_id: str = "user"
+    state: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, eval_set: str, case: dict) -> "EvalCase":
+        session_input = case.get("session_input") or {}
+        return cls(eval_set, case.get("eval_id", "?"),
+                   [ExpectedTurn.from_invocation(invocation) for invocation in case.get("conversation", [])],
+                   session_input.get("user_id", "user"), session_input.get("state") or {})
+
+
+def build_runner(agent, model: str = "replay", latency: float = 0.0) -> Runner:
+    """A runner for `agent`, with every LLM agent on `ReplayLlm` unless `model` is "agent"."""
+    if model == "replay":
+        llm = ReplayLlm(latency=latency)
+        agent = with_models(agent, {name: llm for name in _llm_agent_names(agent)})
+    return Runner(agent=agent, app_name="eval", session_service=LocalSessionService(":memory:"))
+
+
+async def replay_case(runner: Runner, case: EvalCase, threshold: float = 0.8) -> CaseResult:
+    """Replays one case on a fresh session and scores every turn."""
+    result = CaseResult(case.eval_set, case.eval_id)
+    turns = case.turns
+    current_recording.set(recording(turns))
+    user_id = case.user_id
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id,
+                                                          state=dict(case.state))
+
+    start = time.perf_counter()
+    try:
+        for turn in turns:
+            turn_start = time.perf_counter()
+            calls, final = [], None
+            async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=turn.user):
+                calls += [_call_key(call.name, call.args) for call in event.get_function_calls()]
+                if event.is_final_response() and _text(event.content):
+                    final = event.content
+            result.turn_latencies.append(time.perf_counter() - turn_start)
+            result.turns += 1
+            result.tool_matches += calls == turn.tool_calls
+            result.response_scores.append(rouge1(_text(final), _text(turn.final)))
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.latency = time.perf_counter() - start
+    result.passed = (result.error is None and result.turns == len(turns) and result.tool_matches == result.turns
+                     and all(score >= threshold for score in result.response_scores))
+    return result
+
+
+def default_agent_spec(path: str) -> str:
+    return f"{os.path.basename(os.path.dirname(os.path.abspath(path)))}.agent:root_agent"
+
+
+def load_agent(spec: str):
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr or "root_agent")
+
+
+async def run_eval(paths: list[str], agent_spec: Optional[str] = None, workers: int = 16,
+                   model: str = "replay", latency: float = 0.0, threshold: float = 0.8,
+                   repeat: int = 1, shard: int = 0, shards: int = 1) -> tuple[list[CaseResult], float]:
+    """Replays every case of `paths` (each `repeat` times) with `workers` concurrent workers.
+
+    With `shards` > 1 only every `shards`-th case from `shard` on is replayed.
+    """
+    runners: dict[str, Runner] = {}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    results: list[CaseResult] = []
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            spec, case = item
+            if spec not in runners:
+                runners[spec] = build_runner(load_agent(spec), model, latency)
+            results.append(await replay_case(runners[spec], case, threshold))
+
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    index = 0
+    for path in paths:
+        spec = agent_spec or default_agent_spec(path)
+        for data in iter_eval_cases(path):
+            case = EvalCase.from_dict(path, data)
+            for _ in range(repeat):
+                if index % shards == shard:
+                    await queue.put((spec, case))
+                index += 1
+    for _ in tasks:
+        await queue.put(None)
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+def _run_shard(args: tuple) -> list[CaseResult]:
+    results, _ = asyncio.run(run_eval(*args))
+    return results
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("evalsets", nargs="+", help=".evalset.json files to replay.")
+    parser.add_argument("--agent", help="module:attr of the agent (default: <evalset dir>.agent:root_agent).")
+    parser.add_argument("--workers", type=int, default=16, help="Cases replayed concurrently per process.")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Worker processes, each replaying a shard of the cases (for multi-core machines).")
+    parser.add_argument("--model", choices=["replay", "agent"], default="replay",
+                        help="Play back the recorded model turns, or call the agent's own model.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Replay model latency per call, in seconds.")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Minimum ROUGE-1 F1 per final response.")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay each case this many times.")
+    parser.add_argument("--output", help="Write the per-case report to this JSON file.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("BOOKINGS_DB", os.path.join(tempfile.mkdtemp(), "bookings.db"))
+    os.environ.setdefault("RESPONSE_CACHE", "off")
+    start = time.perf_counter()
+    shards = [(args.evalsets, args.agent, args.workers, args.model, args.latency, args.threshold,
+               args.repeat, shard, args.processes) for shard in range(args.processes)]
+    if args.processes > 1:
+        with multiprocessing.Pool(args.processes) as pool:
+            reports = pool.map(_run_shard, shards)
+    else:
+        reports = [_run_shard(shards[0])]
+    wall = time.perf_counter() - start
+    results = [result for report in reports for result in report]
+
+    failed = [result for result in results if not result.passed]
+    shown = results if len(results) <= 20 else failed[:20]
+    for result in shown:
+        scores = " ".join(f"{score:.2f}" for score in result.response_scores)
+        print(f"{'PASS' if result.passed else 'FAIL'} {result.eval_id:<14} turns {result.turns:>2} "
+              f"tools {result.tool_matches}/{result.turns} rouge [{scores}] {result.latency * 1000:7.1f} ms"
+              + (f"  {result.error}" if result.error else ""))
+
+    case_latencies = [result.latency for result in results]
+    turn_latencies = [latency for result in results for latency in result.turn_latencies]
+    print(f"Eval: {len(results)} cases, {len(turn_latencies)} turns, {len(results) - len(failed)} passed, "
+          f"{len(failed)} failed")
+    print(f"  wall time     {wall:.2f} s ({len(results) / wall:.0f} cases/s, "
+          f"{args.processes} x {args.workers} workers)")
+    print(f"  case latency  p50 {percentile(case_latencies, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(case_latencies, 0.95) * 1000:.1f} ms")
+    print(f"  turn latency  p50 {percentile(turn_latencies, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(turn_latencies, 0.95) * 1000:.1f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"wall_time_s": wall, "cases": [result.as_dict() for result in results]}, f, indent=1)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
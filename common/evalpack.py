@@ -0,0 +1,215 @@
+"""Compact, lazily loadable storage for evalsets (.evalpack files).
+
+An .evalset.json is pretty-printed and repeats a lot. Each model turn can
+carry a base64 ``thought_signature`` of a few hundred bytes that replays and
+scoring never use. An .evalpack keeps the same cases in a much smaller file:
+
+- every case is one zstd frame of compact JSON, so one case can be read
+  without touching the others;
+- all frames are compressed with one shared zstd dictionary: the JSON of a
+  sample case (field names, roles, structure) plus the long texts used more
+  than once in the file, e.g. the agent's opening answer or a system prompt.
+  A case repeating them costs a few bytes per reference, and decoding is
+  still a single json.loads;
+- thought signatures are dropped unless --keep-thought-signatures is given;
+- an index of (eval_id, offset, length) at the end of the file lets
+  `EvalPack` open the file by reading only its header and index.
+
+Layout (integers little-endian):
+
+    MAGIC | u32 header size | header | dictionary | case frames ... | index | u64 index offset | u32 index size | MAGIC
+
+The header holds the evalset fields (eval_set_id, name, ...) and the
+dictionary size. The header and the index are zstd-compressed JSON.
+
+    python -m common.evalpack export travel_agent/evalsetfc1936.evalset.json travel_agent/evalsetfc1936.evalpack
+    python -m common.evalpack import travel_agent/evalsetfc1936.evalpack /tmp/evalsetfc1936.evalset.json
+
+    pack = EvalPack("travel_agent/evalsetfc1936.evalpack")
+    pack.case("case56d2fb")
+
+`eval_runner` accepts .evalpack files wherever it takes an .evalset.json.
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+from collections import Counter
+from typing import Any, Iterator, Optional
+
+import zstandard
+
+from common.eval_runner import CASES_KEY, iter_eval_cases
+
+MAGIC = b"EVALPAK1"
+TAIL = struct.Struct("<QI")
+MIN_SHARED_TEXT = 64
+"""Texts at least this long, seen at least twice, go into the dictionary."""
+MAX_DICTIONARY = 1 << 20
+
+
+def strip_thought_signatures(value: Any) -> Any:
+    """A copy of `value` without any ``thought_signature`` fields."""
+    if isinstance(value, dict):
+        return {key: strip_thought_signatures(item) for key, item in value.items() if key != "thought_signature"}
+    if isinstance(value, list):
+        return [strip_thought_signatures(item) for item in value]
+    return value
+
+
+def iter_texts(value: Any) -> Iterator[str]:
+    """Every ``text`` string in a nested JSON value."""
+    if isinstance(value, dict):
+        text = value.get("text")
+        if isinstance(text, str):
+            yield text
+        for item in value.values():
+            if isinstance(item, (dict, list)):
+                yield from iter_texts(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_texts(item)
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def export(source: str, target: str, keep_thought_signatures: bool = False, level: int = 10) -> dict:
+    """Writes the evalset at `source` as an .evalpack at `target`; returns a small report.
+
+    The source is read twice as a stream (once to find shared texts, once
+    to write the cases), so it never has to fit in memory as a whole.
+    """
+    meta: dict = {}
+    counts: Counter = Counter()
+    sample = b""
+    for case in iter_eval_cases(source, meta=meta):
+        if not sample:
+            sample = _dumps(strip_thought_signatures(case))
+        counts.update(text for text in iter_texts(case) if len(text) >= MIN_SHARED_TEXT)
+    # zstd matches best against the end of a dictionary, so the most used texts go last.
+    shared = [_dumps(text) for text, count in reversed(counts.most_common()) if count > 1]
+    content = sample + b"".join(shared)
+    dictionary = zstandard.ZstdCompressionDict(content[-MAX_DICTIONARY:] or b" ",
+                                               dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+    header_compressor = zstandard.ZstdCompressor(level=level)
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+    index = []
+    with open(target + ".tmp", "wb") as f:
+        header = header_compressor.compress(_dumps({"meta": meta, "dictionary_size": len(dictionary.as_bytes())}))
+        f.write(MAGIC + struct.pack("<I", len(header)) + header + dictionary.as_bytes())
+        for case in iter_eval_cases(source):
+            index.append(_write_case(f, case, compressor, keep_thought_signatures))
+        index_offset = f.tell()
+        data = header_compressor.compress(_dumps(index))
+        f.write(data + TAIL.pack(index_offset, len(data)) + MAGIC)
+    os.replace(target + ".tmp", target)
+    return {"cases": len(index), "shared_texts": len(shared),
+            "source_bytes": os.path.getsize(source), "pack_bytes": os.path.getsize(target)}
+
+
+def _write_case(f, case: dict, compressor, keep_thought_signatures: bool) -> list:
+    if not keep_thought_signatures:
+        case = strip_thought_signatures(case)
+    data = compressor.compress(_dumps(case))
+    offset = f.tell()
+    f.write(data)
+    return [case.get("eval_id"), offset, len(data)]
+
+
+class EvalPack:
+    """Read access to an .evalpack file. Opening it reads only the header and index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._lock = threading.Lock()
+        plain = zstandard.ZstdDecompressor()
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an evalpack file.")
+        (size,) = struct.unpack("<I", self._file.read(4))
+        header = json.loads(plain.decompress(self._file.read(size)))
+        self.meta: dict = header["meta"]
+        dictionary = zstandard.ZstdCompressionDict(self._file.read(header["dictionary_size"]),
+                                                   dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        self._decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+        self._file.seek(-(TAIL.size + len(MAGIC)), os.SEEK_END)
+        index_offset, index_size = TAIL.unpack(self._file.read(TAIL.size))
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is truncated.")
+        self._file.seek(index_offset)
+        self._index = [tuple(entry) for entry in json.loads(plain.decompress(self._file.read(index_size)))]
+        self._offsets = {eval_id: (offset, size) for eval_id, offset, size in self._index}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def ids(self) -> list[str]:
+        return [eval_id for eval_id, _, _ in self._index]
+
+    def case(self, eval_id: str) -> dict:
+        """Decodes one case; raises KeyError for an unknown id."""
+        offset, size = self._offsets[eval_id]
+        return self._read(offset, size)
+
+    def _read(self, offset: int, size: int) -> dict:
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(size)
+        return json.loads(self._decompressor.decompress(data))
+
+    def __iter__(self) -> Iterator[dict]:
+        for _, offset, size in self._index:
+            yield self._read(offset, size)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "EvalPack":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def import_pack(source: str, target: str, indent: Optional[int] = 2) -> int:
+    """Writes the .evalpack at `source` back out as an .evalset.json; returns the number of cases."""
+    with EvalPack(source) as pack, open(target, "w", encoding="utf-8") as f:
+        pad = " " * (indent or 0)
+        fields = [f"{pad}{json.dumps(key)}: {json.dumps(value)}" for key, value in pack.meta.items()]
+        f.write("{\n" + "".join(field + ",\n" for field in fields) + f"{pad}{json.dumps(CASES_KEY)}: [")
+        for i, case in enumerate(pack):
+            text = json.dumps(case, indent=indent, ensure_ascii=False)
+            f.write(("," if i else "") + "\n" + "\n".join(pad * 2 + line for line in text.splitlines()))
+        f.write(f"\n{pad}]\n}}\n")
+        return len(pack)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Convert an .evalset.json to an .evalpack.")
+    export_parser.add_argument("source")
+    export_parser.add_argument("target")
+    export_parser.add_argument("--keep-thought-signatures", action="store_true")
+    export_parser.add_argument("--level", type=int, default=10, help="zstd compression level.")
+    import_parser = commands.add_parser("import", help="Convert an .evalpack back to an .evalset.json.")
+    import_parser.add_argument("source")
+    import_parser.add_argument("target")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        report = export(args.source, args.target, args.keep_thought_signatures, args.level)
+        print(f"{report['cases']} cases, {report['shared_texts']} shared texts: "
+              f"{report['source_bytes']:,} -> {report['pack_bytes']:,} bytes "
+              f"({report['source_bytes'] / report['pack_bytes']:.1f}x smaller)")
+    else:
+        print(f"{import_pack(args.source, args.target)} cases written to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
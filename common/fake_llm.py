@@ -0,0 +1,177 @@
+"""A deterministic, offline stand-in for the Gemini model.
+
+`ScriptedLlm` answers from a list of rules instead of calling a real model, so
+the agents can run without network access and with a known, configurable
+latency. That makes it possible to measure our own overhead (tool dispatch,
+session writes, callbacks) on its own.
+
+Each rule is matched against the latest real user message:
+
+    weather_llm = ScriptedLlm(rules=[
+        Rule(r"weather .*in ([A-Za-z ]+)", call="get_weather", args={"city": "{0}"}),
+        Rule(r"bye", text="Goodbye!"),
+    ], latency=0.05)
+    agent = Agent(name="weather_agent_v1", model=weather_llm, tools=[get_weather])
+
+When the last message in the request is a tool result, the model replies with
+`tool_reply` (formatted with the tool name and result), so a rule that calls a
+tool gives a two-step call/answer turn just like the real model. A rule with
+`calls` makes several function calls in one response, as the model does for
+independent lookups:
+
+    Rule(r"kereta .* hotel", calls=[("search_train", {...}), ("search_hotel", {...})])
+"""
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+OTHER_AGENT_PREFIX = "For context:"
+
+
+@dataclass
+class Rule:
+    """Replies with `text`, a call to tool `call`, several `calls`, or a transfer to another agent.
+
+    String values in `args` (and in the args of `calls`) are formatted with the
+    regex groups of the match, e.g. {"city": "{0}"} passes the first captured group.
+    """
+    pattern: str
+    text: Optional[str] = None
+    call: Optional[str] = None
+    args: dict = field(default_factory=dict)
+    transfer_to: Optional[str] = None
+    calls: list[tuple[str, dict]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._regex = re.compile(self.pattern, re.IGNORECASE)
+
+    def respond(self, match: re.Match) -> types.Part:
+        if self.transfer_to:
+            return types.Part(function_call=types.FunctionCall(
+                name="transfer_to_agent", args={"agent_name": self.transfer_to}))
+        if self.call:
+            return types.Part(function_call=types.FunctionCall(name=self.call, args=_format_args(self.args, match)))
+        return types.Part(text=self.text.format(*match.groups()) if self.text else "")
+
+    def parts(self, match: re.Match) -> list[types.Part]:
+        if self.calls:
+            return [types.Part(function_call=types.FunctionCall(name=name, args=_format_args(args, match)))
+                    for name, args in self.calls]
+        return [self.respond(match)]
+
+
+def _format_args(args: dict, match: re.Match) -> dict:
+    groups = [g.strip() if g else "" for g in match.groups()]
+    return {k: v.format(*groups, **match.groupdict()) if isinstance(v, str) else v for k, v in args.items()}
+
+
+def latest_user_text(llm_request: LlmRequest) -> str:
+    """Returns the newest user-typed text, skipping tool results and other agents' context."""
+    for content in reversed(llm_request.contents):
+        if content.role != "user" or not content.parts:
+            continue
+        texts = [p.text for p in content.parts if p.text]
+        if texts and not texts[0].startswith(OTHER_AGENT_PREFIX):
+            return " ".join(texts)
+    return ""
+
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    """Rough token count (4 characters per token) of text, calls and results."""
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                chars += len(json.dumps(part.function_response.response or {}, default=str))
+    return chars // 4
+
+
+def usage(llm_request: LlmRequest, content: types.Content) -> types.GenerateContentResponseUsageMetadata:
+    """Usage metadata built from the estimated prompt and reply sizes."""
+    prompt = estimate_tokens(llm_request.contents)
+    candidates = estimate_tokens([content])
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt, candidates_token_count=candidates,
+        total_token_count=prompt + candidates)
+
+
+class ScriptedLlm(BaseLlm):
+    """Replays scripted responses and function calls with a fixed latency."""
+
+    model: str = "scripted"
+    rules: list[Rule] = []
+    default_text: str = "OK."
+    tool_reply: str = "Here is what I found from {name}: {result}"
+    latency: float = 0.0
+    """Seconds to wait before answering, standing in for network + generation time."""
+    token_latency: float = 0.0
+    """Extra seconds per generated token, so longer answers take longer, as with a real model."""
+    chunk_delay: float = 0.0
+    """Seconds between partial chunks when streaming."""
+
+    _calls: int = PrivateAttr(default=0)
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"scripted.*"]
+
+    @property
+    def calls(self) -> int:
+        """Number of generate calls served so far."""
+        return self._calls
+
+    def _respond(self, llm_request: LlmRequest) -> types.Content:
+        last = llm_request.contents[-1] if llm_request.contents else None
+        if last and last.parts and last.parts[-1].function_response:
+            text = "\n".join(self.tool_reply.format(name=part.function_response.name,
+                                                    result=json.dumps(part.function_response.response, default=str))
+                             for part in last.parts if part.function_response)
+            return types.Content(role="model", parts=[types.Part(text=text)])
+
+        query = latest_user_text(llm_request)
+        for rule in self.rules:
+            match = rule._regex.search(query)
+            if match:
+                return types.Content(role="model", parts=rule.parts(match))
+        return types.Content(role="model", parts=[types.Part(text=self.default_text)])
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self._calls += 1
+        content = self._respond(llm_request)
+        delay = self.latency + self.token_latency * estimate_tokens([content])
+        if delay:
+            await asyncio.sleep(delay)
+
+        text = content.parts[0].text
+        if stream and text:
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                chunk = word if i == len(words) - 1 else word + " "
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]),
+                                  partial=True)
+                if self.chunk_delay:
+                    await asyncio.sleep(self.chunk_delay)
+        yield LlmResponse(content=content, partial=False, turn_complete=True,
+                          usage_metadata=usage(llm_request, content))
+
+
+def with_models(agent, models: dict[str, BaseLlm]):
+    """Clones an agent tree, swapping in `models[agent.name]` wherever given."""
+    update = {"sub_agents": [with_models(sub_agent, models) for sub_agent in agent.sub_agents]}
+    if agent.name in models:
+        update["model"] = models[agent.name]
+    return agent.clone(update=update)
@@ -0,0 +1,216 @@
+"""A precompiled multi-pattern guardrail for before_model_callback.
+
+`KeywordGuardrail` compiles its blocklist once:
+
+- literal terms go into a single trie-shaped regex, so the scan cost grows
+  very slowly with the number of terms (shared prefixes are matched once);
+- regex rules are joined into one alternation with a named group per rule.
+  Rules that cannot share it are compiled and run on their own: numbered
+  backreferences (``(a)\\1``) would point at the wrong group, inline global
+  flags (``(?i)``) are only allowed at the very start, and a group name
+  (``(?P<x>...)``) may appear only once in a regex.
+
+On each model call only the newest message the user typed is scanned, all of
+its text parts, case-insensitively (the "For context:" messages ADK adds for
+other agents' turns are skipped). The verdict is cached per invocation, because a
+turn with tool calls reaches the model (and this callback) several times with
+the same user message.
+
+    guardrail = KeywordGuardrail(terms=["FAFA", "password"], patterns=[r"\\b\\d{16}\\b"])
+    agent = Agent(..., before_model_callback=guardrail)
+
+A blocklist file has one term per line; lines starting with ``re:`` are regex
+rules and ``#`` starts a comment (see `KeywordGuardrail.from_file`).
+"""
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from common.history import OTHER_AGENT_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Not itself escaped: a numbered backreference, a named group or backreference,
+# or inline global flags. Rules with any of these get a regex of their own.
+_OWN_REGEX = re.compile(r"(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?P[<=]|\(\?[aiLmsux]+\))")
+
+
+@dataclass
+class Match:
+    """One blocklist hit: the rule, the matched text and where it is."""
+    rule: str
+    text: str
+    part: int
+    start: int
+    end: int
+
+
+@dataclass
+class Verdict:
+    matches: list[Match] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def blocked(self) -> bool:
+        return bool(self.matches)
+
+
+def trie_regex(terms: Iterable[str]) -> str:
+    """Builds a regex matching any of `terms`, with common prefixes factored out."""
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        optional = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+
+def newest_user_parts(llm_request: LlmRequest) -> list[str]:
+    """Text parts of the newest message typed by the user (tool results and other agents' context are skipped)."""
+    for content in reversed(llm_request.contents):
+        if content.role == "user" and content.parts:
+            texts = [part.text for part in content.parts if part.text]
+            if texts and not texts[0].startswith(OTHER_AGENT_PREFIX):
+                return texts
+    return []
+
+
+class KeywordGuardrail:
+    """Blocks the model call when the newest user message hits the blocklist."""
+
+    def __init__(self, terms: Iterable[str] = (), patterns: Iterable[str] = (),
+                 whole_words: bool = False,
+                 message: str = "I cannot process this request because it contains the blocked keyword '{rule}'.",
+                 state_key: str = "guardrail_block_keyword_triggered",
+                 cache_size: int = 1024):
+        self.message = message
+        self.state_key = state_key
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, Verdict] = OrderedDict()
+        self.stats = {"calls": 0, "scans": 0, "blocked": 0, "scan_seconds": 0.0}
+
+        # Terms keep their original spelling for reporting, keyed by lower-cased
+        # text. Matching runs on lower-cased messages, which is several times
+        # faster than re.IGNORECASE; the flagged regex is only a fallback for
+        # the rare text whose length changes when lower-cased.
+        self._terms = {term.lower(): term for term in terms if term}
+        boundary = r"\b" if whole_words else ""
+        self._term_regex = self._term_regex_ci = None
+        if self._terms:
+            pattern = boundary + trie_regex(self._terms) + boundary
+            self._term_regex = re.compile(pattern)
+            self._term_regex_ci = re.compile(pattern, re.IGNORECASE)
+
+        self._patterns = list(patterns)
+        self._pattern_regex = None
+        self._separate_regexes: list[tuple[str, re.Pattern]] = []
+        combined = []
+        for i, pattern in enumerate(self._patterns):
+            try:
+                compiled = re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid guardrail rule {pattern!r}: {e}") from None
+            if _OWN_REGEX.search(pattern):
+                self._separate_regexes.append((pattern, compiled))
+            else:
+                combined.append(f"(?P<r{i}>{pattern})")
+        if combined:
+            try:
+                self._pattern_regex = re.compile("|".join(combined), re.IGNORECASE)
+            except re.error:
+                # Some construct the check above missed; each rule still compiles alone.
+                logger.warning("Guardrail rules cannot be combined; running them one by one.")
+                self._separate_regexes += [(pattern, re.compile(pattern, re.IGNORECASE))
+                                           for pattern in self._patterns if not _OWN_REGEX.search(pattern)]
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "KeywordGuardrail":
+        """Loads terms and ``re:`` rules from a blocklist file."""
+        terms, patterns = [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("re:"):
+                    patterns.append(line[3:])
+                else:
+                    terms.append(line)
+        return cls(terms=terms, patterns=patterns, **kwargs)
+
+    def scan(self, parts: list[str]) -> Verdict:
+        """Finds every blocklist hit in the given text parts."""
+        start = time.perf_counter()
+        verdict = Verdict()
+        for index, text in enumerate(parts):
+            if self._term_regex:
+                lowered = text.lower()
+                if len(lowered) == len(text):
+                    found = self._term_regex.finditer(lowered)
+                else:
+                    found = self._term_regex_ci.finditer(text)
+                for m in found:
+                    matched = text[m.start():m.end()]
+                    rule = self._terms.get(matched.lower(), matched)
+                    verdict.matches.append(Match(rule, matched, index, m.start(), m.end()))
+            if self._pattern_regex:
+                for m in self._pattern_regex.finditer(text):
+                    rule = self._patterns[int(m.lastgroup[1:])]
+                    verdict.matches.append(Match(rule, m.group(), index, m.start(), m.end()))
+            for rule, regex in self._separate_regexes:
+                for m in regex.finditer(text):
+                    verdict.matches.append(Match(rule, m.group(), index, m.start(), m.end()))
+        verdict.seconds = time.perf_counter() - start
+        self.stats["scans"] += 1
+        self.stats["scan_seconds"] += verdict.seconds
+        return verdict
+
+    def check(self, invocation_id: str, llm_request: LlmRequest) -> Verdict:
+        """Scans the newest user message once per invocation and caches the verdict."""
+        verdict = self._cache.get(invocation_id)
+        if verdict is None:
+            verdict = self.scan(newest_user_parts(llm_request))
+            self._cache[invocation_id] = verdict
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return verdict
+
+    def __call__(self, callback_context: CallbackContext,
+                 llm_request: LlmRequest) -> Optional[LlmResponse]:
+        self.stats["calls"] += 1
+        verdict = self.check(callback_context.invocation_id, llm_request)
+        if not verdict.blocked:
+            return None
+
+        self.stats["blocked"] += 1
+        first = verdict.matches[0]
+        logger.info("Guardrail blocked %s for agent %s: %s (scan %.1f us)",
+                    callback_context.invocation_id, callback_context.agent_name,
+                    [(m.rule, m.part, m.start, m.end) for m in verdict.matches], verdict.seconds * 1e6)
+        callback_context.state[self.state_key] = True
+        return LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[types.Part(text=self.message.format(rule=first.rule))],
+            )
+        )
@@ -0,0 +1,118 @@
+"""Keeps the history sent to the model at a bounded size for long sessions.
+
+`HistoryWindow` is a before_model_callback. The last `keep_turns` turns of the
+request are sent verbatim. Older turns are folded into a short rolling
+summary. The summary is kept in session state and sent at the start of the
+first kept user message:
+
+    compact_history = HistoryWindow(keep_turns=4)
+    agent = Agent(..., before_model_callback=[compact_history, block_keyword_guardrail])
+
+Put it first in the callback list, so later callbacks (like guardrails) only
+scan the trimmed request.
+
+Folding is incremental: turns are summarised once, when they fall out of
+the window, and the summary keeps at most `max_summary_lines` lines. So the
+prompt stays roughly the same size however long the session gets. The summary
+is extractive (the user message and the agent's answer, clipped), so folding
+costs no extra model call.
+"""
+import time
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+OTHER_AGENT_PREFIX = "For context:"
+
+
+def _user_text(content: types.Content) -> Optional[str]:
+    """Text typed by the user in this content, or None for tool results and agent context."""
+    if content.role != "user" or not content.parts:
+        return None
+    texts = [p.text for p in content.parts if p.text]
+    if not texts or texts[0].startswith(OTHER_AGENT_PREFIX):
+        return None
+    return " ".join(texts)
+
+
+def split_turns(contents: list[types.Content]) -> list[list[types.Content]]:
+    """Groups contents into turns, each starting at a user message.
+
+    Contents before the first user message (if any) form their own group.
+    Tool calls and their results always stay within one turn.
+    """
+    turns: list[list[types.Content]] = []
+    for content in contents:
+        if not turns or _user_text(content) is not None:
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def summarize_turn(turn: list[types.Content], clip: int = 160) -> str:
+    """One summary line: what the user asked, which tools ran, what the agent answered."""
+    asked = _user_text(turn[0]) or ""
+    tools = []
+    answer = ""
+    for content in turn[1:]:
+        for part in content.parts or []:
+            if part.function_call:
+                tools.append(part.function_call.name)
+            elif part.text and content.role == "model" and not part.thought:
+                answer = part.text
+    line = f"- User: {_clip(asked, clip)}"
+    if tools:
+        line += f" | Tools: {', '.join(tools)}"
+    if answer:
+        line += f" | Agent: {_clip(answer, clip)}"
+    return line
+
+
+class HistoryWindow:
+    """before_model_callback that keeps the last N turns and a rolling summary of the rest."""
+
+    def __init__(self, keep_turns: int = 4, max_summary_lines: int = 20,
+                 state_key: str = "history_summary"):
+        self.keep_turns = keep_turns
+        self.max_summary_lines = max_summary_lines
+        self.state_key = state_key
+        self.stats = {"calls": 0, "compacted": 0, "contents_before": 0,
+                      "contents_after": 0, "seconds": 0.0}
+
+    def __call__(self, callback_context: CallbackContext,
+                 llm_request: LlmRequest) -> Optional[LlmResponse]:
+        start = time.perf_counter()
+        self.stats["calls"] += 1
+        self.stats["contents_before"] += len(llm_request.contents)
+
+        turns = split_turns(llm_request.contents)
+        if len(turns) > self.keep_turns:
+            old, recent = turns[:-self.keep_turns], turns[-self.keep_turns:]
+            state = callback_context.state
+            folded = state.get(f"{self.state_key}_turns", 0)
+            lines = state.get(self.state_key, [])
+            if len(old) > folded:
+                # Only the turns that just left the window are summarised.
+                lines = (lines + [summarize_turn(turn) for turn in old[folded:]])[-self.max_summary_lines:]
+                state[self.state_key] = lines
+                state[f"{self.state_key}_turns"] = len(old)
+
+            # The summary rides along in the first kept user message, so the
+            # request still alternates user/model roles.
+            summary = types.Part(text="Summary of the earlier conversation:\n" + "\n".join(lines))
+            first = recent[0][0]
+            recent[0][0] = types.Content(role=first.role, parts=[summary] + list(first.parts))
+            llm_request.contents = [content for turn in recent for content in turn]
+            self.stats["compacted"] += 1
+
+        self.stats["contents_after"] += len(llm_request.contents)
+        self.stats["seconds"] += time.perf_counter() - start
+        return None
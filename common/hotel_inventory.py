@@ -0,0 +1,222 @@
+"""Hotels loaded once and indexed by location for search_hotel.
+
+The data is a CSV (common/data/hotels.csv, or HOTELS_PATH) with the columns
+id, name, location, region, price_per_night, rating, max_guests,
+room_types ("deluxe:30|suite:6", rooms per type) and unavailable (dates or
+"start..end" ranges separated by "|").
+
+Every location (and region, so "Bali" covers Kuta and Ubud) keeps its hotels
+in two sorted arrays, by price and by rating. A price range is two bisects,
+and top-K by rating walks the rating array from the top and stops after K
+hits, so a query never looks at the whole location. Availability is one
+integer bitset per hotel (bit i = night EPOCH + i). Checking a stay of N
+nights is a shift and a mask, whatever the length of the calendar.
+
+    hotels = hotel_inventory.load()
+    hotels.search("Bali", "2026-01-01", nights=3, guests=2, max_price=1_000_000)
+
+The room counts in room_types are capacities. The module-level `search`
+takes the rooms already booked in the `booking_ledger` into account, as
+`stays` (every match, which only changes with the file) followed by
+`rooms_left` (the ledger, read on every call), so a tool can cache the
+first half like search_train does.
+"""
+import bisect
+import csv
+import datetime
+import functools
+import os
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from common import booking_ledger, places
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "data", "hotels.csv")
+EPOCH = datetime.date(2025, 1, 1)
+HORIZON_DAYS = 730
+SORT_KEYS = ("rating", "price")
+
+
+@dataclass(frozen=True)
+class Hotel:
+    id: str
+    name: str
+    location: str
+    region: str
+    price: int
+    rating: float
+    max_guests: int
+    rooms: dict
+    """Rooms per room type."""
+    available: int
+    """Bit i is set when the hotel has rooms on night EPOCH + i."""
+
+    def as_dict(self) -> dict:
+        return {"name": self.name, "location": self.location, "price_per_night": self.price,
+                "rating": self.rating, "room_types": list(self.rooms)}
+
+
+def stay_mask(check_in: datetime.date, nights: int) -> Optional[int]:
+    """Bits for the nights of a stay, or None when it falls outside the calendar."""
+    offset = (check_in - EPOCH).days
+    if offset < 0 or offset + nights > HORIZON_DAYS:
+        return None
+    return ((1 << nights) - 1) << offset
+
+
+def calendar(unavailable: str) -> int:
+    """All nights in the horizon, minus the listed dates and "start..end" ranges."""
+    bits = (1 << HORIZON_DAYS) - 1
+    for item in filter(None, unavailable.split("|")):
+        start, _, end = item.partition("..")
+        first = datetime.date.fromisoformat(start)
+        last = datetime.date.fromisoformat(end) if end else first
+        mask = stay_mask(first, (last - first).days + 1)
+        if mask is not None:
+            bits &= ~mask
+    return bits
+
+
+class _LocationIndex:
+    """The hotels of one location, sorted by price and by rating."""
+
+    def __init__(self, hotels: list[Hotel]):
+        by_price = sorted(hotels, key=lambda hotel: hotel.price)
+        self.prices = [hotel.price for hotel in by_price]
+        self.by_price = by_price
+        # Best first, cheapest first among equals; ratings are negated so bisect works on them.
+        by_rating = sorted(hotels, key=lambda hotel: (-hotel.rating, hotel.price))
+        self.ratings = [-hotel.rating for hotel in by_rating]
+        self.by_rating = by_rating
+        self.rank = {hotel.name: i for i, hotel in enumerate(by_rating)}
+
+    def price_range(self, min_price: int, max_price: int) -> list[Hotel]:
+        """Hotels within the price range, cheapest first."""
+        lo = bisect.bisect_left(self.prices, min_price)
+        hi = bisect.bisect_right(self.prices, max_price)
+        return self.by_price[lo:hi]
+
+    def rated_at_least(self, min_rating: float) -> list[Hotel]:
+        """Hotels rated `min_rating` or better, best first."""
+        return self.by_rating[:bisect.bisect_right(self.ratings, -min_rating)]
+
+
+class HotelIndex:
+    """Per-location sorted arrays and availability bitsets."""
+
+    def __init__(self, hotels: Iterable[Hotel]):
+        self.hotels = {hotel.name: hotel for hotel in hotels}
+        grouped: dict[str, list[Hotel]] = {}
+        for hotel in self.hotels.values():
+            for key in {places.normalize_place(hotel.location), places.normalize_place(hotel.region)}:
+                grouped.setdefault(key, []).append(hotel)
+        self._locations = {key: _LocationIndex(found) for key, found in grouped.items()}
+
+    @classmethod
+    def from_csv(cls, path: str) -> "HotelIndex":
+        hotels = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                rooms = {}
+                for item in filter(None, row["room_types"].split("|")):
+                    room_type, _, count = item.partition(":")
+                    rooms[room_type] = int(count)
+                hotels.append(Hotel(row["id"], row["name"], row["location"], row["region"],
+                                    int(row["price_per_night"]), float(row["rating"]), int(row["max_guests"]),
+                                    rooms, calendar(row.get("unavailable") or "")))
+        return cls(hotels)
+
+    def location(self, place: places.Place) -> Optional[_LocationIndex]:
+        for name in (place.name, place.city):
+            index = self._locations.get(places.normalize_place(name))
+            if index is not None:
+                return index
+        return None
+
+    def search(self, location: str, date: str, nights: int = 1, guests: int = 1,
+               min_price: int = 0, max_price: int = 0, min_rating: float = 0.0,
+               sort_by: str = "rating", limit: Optional[int] = 5) -> dict:
+        """Available hotels for the stay, as a tool result.
+
+        A `max_price` of 0 means no upper limit. Results are sorted by rating
+        (best first) or price (cheapest first).
+        """
+        if sort_by not in SORT_KEYS:
+            return {"status": "error", "error_message": f"sort_by must be one of {', '.join(SORT_KEYS)}."}
+        match = places.resolve(location)
+        if match is None or match.confidence < places.MIN_CONFIDENCE:
+            suggestions = places.load().suggestions(location)
+            hint = f" Did you mean {' or '.join(suggestions)}?" if suggestions else ""
+            return {"status": "error", "error_message": f"Unknown location '{location}'.{hint}"}
+        try:
+            check_in = datetime.date.fromisoformat(date)
+        except (TypeError, ValueError):
+            return {"status": "error", "error_message": f"Invalid date '{date}', expected YYYY-MM-DD."}
+        mask = stay_mask(check_in, max(nights, 1))
+        if mask is None:
+            return {"status": "error", "error_message": f"{date} is outside the bookable dates."}
+
+        result = {"status": "success", "location": match.place.name, "date": date, "nights": nights,
+                  "hotels": []}
+        if match.method != "exact":
+            result["resolved_places"] = [match.as_dict()]
+        index = self.location(match.place)
+        if index is None:
+            return result
+
+        # Start from the narrower of the two sorted ranges, then walk it in the
+        # requested order and stop after `limit` hits.
+        by_price = index.price_range(min_price, max_price or float("inf"))
+        by_rating = index.rated_at_least(min_rating)
+        if sort_by == "price" or len(by_price) < len(by_rating):
+            candidates = by_price if sort_by == "price" else sorted(by_price, key=lambda h: index.rank[h.name])
+        else:
+            candidates = by_rating
+        low, high = min_price, max_price or float("inf")
+        for hotel in candidates:
+            if (hotel.rating >= min_rating and low <= hotel.price <= high
+                    and hotel.max_guests >= guests and hotel.available & mask == mask):
+                result["hotels"].append(hotel.as_dict())
+                if len(result["hotels"]) == limit:
+                    break
+        return result
+
+
+@functools.lru_cache(maxsize=1)
+def load() -> HotelIndex:
+    """Returns the shared hotel index, reading the file on first use only."""
+    return HotelIndex.from_csv(os.environ.get("HOTELS_PATH", DEFAULT_PATH))
+
+
+def rooms_booked(hotel: str, room_type: str, date: str) -> int:
+    return booking_ledger.default().reserved(f"hotel:{hotel}:{room_type}", date)
+
+
+def search(location: str, date: str, nights: int = 1, guests: int = 1, min_price: int = 0,
+           max_price: int = 0, min_rating: float = 0.0, sort_by: str = "rating", limit: int = 5) -> dict:
+    return rooms_left(stays(location, date, nights, guests, min_price, max_price, min_rating, sort_by), limit)
+
+
+def stays(location: str, date: str, nights: int = 1, guests: int = 1, min_price: int = 0,
+          max_price: int = 0, min_rating: float = 0.0, sort_by: str = "rating") -> dict:
+    """Every hotel of a search with all its rooms, ignoring bookings, so the result can be cached."""
+    return load().search(location, date, nights, guests, min_price, max_price, min_rating, sort_by, limit=None)
+
+
+def rooms_left(result: dict, limit: int = 5) -> dict:
+    """A `stays` result without the room types booked out on any night, and the first `limit` hotels."""
+    if result.get("status") != "success":
+        return result
+    check_in = datetime.date.fromisoformat(result["date"])
+    nights = [(check_in + datetime.timedelta(days=i)).isoformat() for i in range(max(result["nights"], 1))]
+    hotels = load().hotels
+    found = []
+    for entry in result["hotels"]:
+        rooms = hotels[entry["name"]].rooms
+        free = [room_type for room_type in entry["room_types"]
+                if all(rooms_booked(entry["name"], room_type, night) < rooms[room_type] for night in nights)]
+        if free:
+            found.append({**entry, "room_types": free})
+            if len(found) == limit:
+                break
+    return {**result, "hotels": found}
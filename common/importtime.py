@@ -0,0 +1,139 @@
+"""Import-time digest for agent modules: `python -X importtime`, summarized.
+
+Runs each module's import in a fresh interpreter with ``-X importtime`` and
+condenses the few thousand lines it prints into what matters for a cold
+start: the total, the packages that cost the most (self time, grouped by
+top-level package, with google.* split one level further) and the heaviest
+imports of the agent module itself.
+
+With --first-turn it then runs one turn of the module's ``root_agent`` with
+`ScriptedLlm` (and PREWARM=0), and reports the imports ADK only does on the
+first turn separately: that is the part a first user pays for on top of the
+import.
+
+    python -m common.importtime travel_agent_docker.agent travel_agent_deploy.agent --first-turn
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+MARKER = "importtime-phase:"
+
+CHILD = '''
+import asyncio, importlib, json, sys, time
+start = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+sys.stderr.write("%(marker)s " + json.dumps({"phase": "import", "seconds": time.perf_counter() - start}) + "\\n")
+if sys.argv[2] == "1":
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+    from common.fake_llm import ScriptedLlm, with_models
+
+    def names(agent):
+        if hasattr(agent, "model"):
+            yield agent.name
+        for sub_agent in agent.sub_agents:
+            yield from names(sub_agent)
+
+    agent = with_models(module.root_agent, {name: ScriptedLlm() for name in names(module.root_agent)})
+
+    async def turn():
+        runner = InMemoryRunner(agent=agent, app_name="importtime")
+        session = await runner.session_service.create_session(app_name="importtime", user_id="u")
+        message = types.Content(role="user", parts=[types.Part(text="Hello")])
+        async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+            pass
+
+    start = time.perf_counter()
+    asyncio.run(turn())
+    sys.stderr.write("%(marker)s " + json.dumps({"phase": "first turn", "seconds": time.perf_counter() - start}) + "\\n")
+''' % {"marker": MARKER}
+
+
+@dataclass
+class Phase:
+    name: str
+    seconds: float = 0.0
+    rows: list[tuple[int, int, int, str]] = field(default_factory=list)
+    """(self us, cumulative us, depth, module) in importtime order: children before parents."""
+
+    def by_package(self) -> Counter:
+        totals: Counter = Counter()
+        for self_us, _, _, module in self.rows:
+            parts = module.split(".")
+            totals[".".join(parts[:2] if parts[0] == "google" else parts[:1])] += self_us
+        return totals
+
+    def children(self, index: int) -> list[tuple[int, int, int, str]]:
+        """The direct imports of the row at `index` (they are listed right before it)."""
+        depth = self.rows[index][2]
+        found = []
+        for row in reversed(self.rows[:index]):
+            if row[2] <= depth:
+                break
+            if row[2] == depth + 1:
+                found.append(row)
+        return found
+
+    def heaviest_imports(self, module: str) -> list[tuple[int, str]]:
+        """Cumulative time of what `module` imports, or of the outermost imports if it is not here."""
+        index = next((i for i, row in enumerate(self.rows) if row[3] == module), None)
+        if index is not None:
+            rows = self.children(index)
+        else:
+            top = min((depth for _, _, depth, _ in self.rows), default=0)
+            rows = [row for row in self.rows if row[2] == top]
+        return sorted(((cumulative, name) for _, cumulative, _, name in rows), reverse=True)
+
+
+def profile(module: str, first_turn: bool = False) -> list[Phase]:
+    """Imports `module` in a fresh interpreter; returns the import (and first turn) phases."""
+    env = dict(os.environ, PREWARM="0", PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(),
+                                                                                 os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, module, "1" if first_turn else "0"],
+                            capture_output=True, text=True, env=env)
+    phases, rows = [], []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            rows.append((int(match[1]), int(match[2]), len(match[3]) // 2, match[4]))
+        elif line.startswith(MARKER):
+            info = json.loads(line[len(MARKER):])
+            phases.append(Phase(info["phase"], info["seconds"], rows))
+            rows = []
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    return phases
+
+
+def report(module: str, phases: list[Phase], top: int = 10):
+    print(f"{module}: " + ", ".join(f"{phase.name} {phase.seconds:.2f} s ({len(phase.rows)} modules)"
+                                    for phase in phases))
+    for phase in phases:
+        print(f"  {phase.name}, by package (self time):")
+        for package, us in phase.by_package().most_common(top):
+            print(f"    {package:<50} {us / 1000:8.1f} ms")
+        print(f"  {phase.name}, heaviest imports (cumulative):")
+        for us, name in phase.heaviest_imports(module)[:top]:
+            print(f"    {name:<50} {us / 1000:8.1f} ms")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="+", help="Modules to import, e.g. travel_agent_docker.agent.")
+    parser.add_argument("--first-turn", action="store_true", help="Also profile the imports of a first turn.")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    for module in args.modules:
+        report(module, profile(module, args.first_turn), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Load-tests the workshop agents offline against the scripted model.
+
+Every agent in the graph gets its own `ScriptedLlm`, so the numbers measure
+ADK overhead (tool dispatch, session writes, callbacks) plus the configured
+fake model latency, and nothing else.
+
+    python -m common.loadtest weather_agent --qps 200 --duration 10 --latency 0.05
+
+With --stream the turns run in SSE mode, the model streams its answer word
+by word (--chunk-delay apart) and time to first token is reported too.
+Agents with a response cache answer repeated queries from it; pass
+--no-response-cache to send every turn to the model.
+
+--trace records spans (model, tool, callback and session calls) for every
+turn and prints their count and latency by kind; --trace-dir also writes
+them there as OTLP/JSON.
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from common.async_tools import format_tool_stats, tool_stats
+from common.driver import TurnResult, run_turn, stream_turn, summarize
+from common.fake_llm import Rule, ScriptedLlm, with_models
+from common.response_cache import ResponseCache
+from common.tracing import OtlpJsonExporter, SpanBuffer, Tracer, format_summary
+
+
+@dataclass
+class Scenario:
+    """An agent to load, the scripted rules for each of its LLM agents and the queries to send."""
+    module: str
+    attr: str
+    rules: dict[str, list[Rule]]
+    queries: list[str]
+    author: Optional[str] = None
+    default_text: dict[str, str] = field(default_factory=dict)
+
+
+SCENARIOS = {
+    "weather_agent": Scenario(
+        module="weather_agent.agent",
+        attr="weather_agent",
+        rules={"weather_agent_v1": [Rule(r"(?:in|about) ([A-Za-z ]+)\??$", call="get_weather", args={"city": "{0}"})]},
+        queries=["What is the weather like in London?", "How about Tokyo?", "What is the weather in New York?"],
+    ),
+    "travel_agent_team": Scenario(
+        module="travel_agent_team.agent",
+        attr="root_agent",
+        rules={
+            "travel_agent_team": [Rule(r"kereta dari (\w+) ke (\w+).*hotel di (\w+)", calls=[
+                                      ("search_train", {"origin": "{0}", "dest": "{1}", "date": "2026-01-01",
+                                                        "day_part": "pagi", "pax": 2}),
+                                      ("search_hotel", {"location": "{2}", "date": "2026-01-01", "nights": 2,
+                                                        "guests": 2})]),
+                                  Rule(r"kereta|train", transfer_to="train_agent"),
+                                  Rule(r"hotel", transfer_to="hotel_agent")],
+            "train_agent": [Rule(r"dari (\w+) ke (\w+)", call="search_train",
+                                 args={"origin": "{0}", "dest": "{1}", "date": "2026-01-01", "day_part": "pagi", "pax": 2})],
+            "hotel_agent": [Rule(r"di (\w+)", call="search_hotel",
+                                 args={"location": "{0}", "date": "2026-01-01", "nights": 3, "guests": 2})],
+        },
+        queries=["Saya mau cari kereta dari Gambir ke Bandung untuk 1 jan 2026 pagi buat 2 orang",
+                 "Tolong cari hotel di Bali untuk 3 malam buat 2 orang",
+                 "Cari kereta dari Gambir ke Bandung besok pagi dan hotel di Bandung 2 malam buat 2 orang"],
+    ),
+    "socmed_agent": Scenario(
+        module="socmed_agent.agent",
+        attr="root_agent",
+        rules={"summarization_agent": [Rule(r".", call="post_stats")]},
+        default_text={"creation_agent": "1. Taco Tuesday 🌮 2. Matcha magic 🍵 3. Pasta night 🍝",
+                      "publisher_agent": "Best post for teens: Matcha magic 🍵"},
+        queries=["Please start the social media content workflow."],
+        author="publisher_agent",
+    ),
+}
+
+
+def build_models(scenario: Scenario, agent, latency: float,
+                 chunk_delay: float = 0.0) -> dict[str, ScriptedLlm]:
+    """Creates one scripted model per LLM agent in the tree."""
+    models = {}
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if hasattr(current, "model"):
+            models[current.name] = ScriptedLlm(
+                rules=scenario.rules.get(current.name, []),
+                default_text=scenario.default_text.get(current.name, "OK."),
+                latency=latency,
+                chunk_delay=chunk_delay,
+            )
+    return models
+
+
+def response_caches(agent) -> list[ResponseCache]:
+    """The distinct response caches used as callbacks in the agent tree."""
+    caches, pending = [], [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        callbacks = getattr(current, "before_model_callback", None) or []
+        for callback in callbacks if isinstance(callbacks, list) else [callbacks]:
+            callback = getattr(callback, "__wrapped__", callback)  # Unwraps traced callbacks.
+            if isinstance(callback, ResponseCache) and callback not in caches:
+                caches.append(callback)
+    return caches
+
+
+async def streamed_turn(runner, user_id: str, session_id: str, query: str,
+                        author: Optional[str] = None) -> TurnResult:
+    """Runs one turn through `stream_turn`, keeping only its timings."""
+    result = TurnResult(user_id=user_id, session_id=session_id, query=query)
+    async for _ in stream_turn(runner, user_id, session_id, query, author=author, result=result):
+        pass
+    return result
+
+
+async def run_load(scenario: Scenario, qps: float, duration: float, latency: float,
+                   max_in_flight: int, stream: bool = False, chunk_delay: float = 0.0,
+                   tracer: Optional[Tracer] = None) -> dict:
+    """Starts turns at a fixed rate (open loop), each on a fresh session."""
+    agent = getattr(importlib.import_module(scenario.module), scenario.attr)
+    models = build_models(scenario, agent, latency, chunk_delay)
+    turn = streamed_turn if stream else run_turn
+    runner = Runner(agent=with_models(agent, models), app_name="loadtest",
+                    session_service=InMemorySessionService(), auto_create_session=True)
+    if tracer is not None:
+        tracer.instrument(runner)
+
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def one(i: int):
+        async with semaphore:
+            query = scenario.queries[i % len(scenario.queries)]
+            return await turn(runner, f"user_{i}", f"session_{i}", query, author=scenario.author)
+
+    total = max(1, int(qps * duration))
+    start = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        delay = start + i / qps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    results = await asyncio.gather(*tasks)
+
+    report = summarize(results)
+    report["target_qps"] = qps
+    report["llm_calls"] = sum(model.calls for model in models.values())
+    caches = response_caches(agent)
+    if caches:
+        report["cache_lookups"] = sum(cache.stats["lookups"] for cache in caches)
+        report["cache_hits"] = sum(cache.hits for cache in caches)
+    errors = [r.error for r in results if r.error]
+    if errors:
+        report["first_error"] = repr(errors[0])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("agent", choices=sorted(SCENARIOS))
+    parser.add_argument("--qps", type=float, default=50, help="Turns started per second.")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds to keep starting turns.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake model latency per call, in seconds.")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Cap on concurrent turns.")
+    parser.add_argument("--stream", action="store_true", help="Run turns with SSE streaming.")
+    parser.add_argument("--chunk-delay", type=float, default=0.0,
+                        help="Seconds between streamed chunks, with --stream.")
+    parser.add_argument("--no-response-cache", action="store_true",
+                        help="Disable the agents' response caches (RESPONSE_CACHE=off).")
+    parser.add_argument("--trace", action="store_true", help="Record spans and print their latencies.")
+    parser.add_argument("--trace-dir", help="With --trace, also write the spans here as OTLP/JSON.")
+    args = parser.parse_args()
+    if args.no_response_cache:
+        os.environ["RESPONSE_CACHE"] = "off"
+
+    tracer = None
+    if args.trace:
+        buffer = SpanBuffer(capacity=1_000_000)
+        tracer = Tracer(buffer, OtlpJsonExporter(args.trace_dir, f"loadtest-{args.agent}") if args.trace_dir else None)
+    report = asyncio.run(run_load(SCENARIOS[args.agent], args.qps, args.duration,
+                                  args.latency, args.max_in_flight, args.stream, args.chunk_delay, tracer))
+    print(f"Load test: {args.agent}")
+    print(f"  turns        {report['turns']} ({report['errors']} errors)")
+    print(f"  wall time    {report['wall_time_s']:.2f} s")
+    print(f"  throughput   {report['turns_per_s']:.1f} turns/s (target {args.qps:g})")
+    print(f"  events/s     {report['events_per_s']:.1f}")
+    print(f"  latency      p50 {report['p50_s'] * 1000:.1f} ms, "
+          f"p95 {report['p95_s'] * 1000:.1f} ms, p99 {report['p99_s'] * 1000:.1f} ms")
+    if args.stream:
+        print(f"  first token  p50 {report['first_token_p50_s'] * 1000:.1f} ms, "
+              f"p95 {report['first_token_p95_s'] * 1000:.1f} ms")
+    print(f"  llm calls    {report['llm_calls']}")
+    if report.get("cache_lookups"):
+        print(f"  cache hits   {report['cache_hits']} of {report['cache_lookups']} lookups "
+              f"({100 * report['cache_hits'] / report['cache_lookups']:.0f}%)")
+    if "first_error" in report:
+        print(f"  first error  {report['first_error']}")
+    if any(latency.calls for latency in tool_stats.values()):
+        print("\n" + format_tool_stats())
+    if tracer is not None:
+        print("\n" + format_summary(tracer.buffer.summary()))
+        if tracer.buffer.dropped:
+            print(f"({tracer.buffer.dropped} older spans dropped from the buffer)")
+        if tracer.exporter is not None:
+            print(f"{tracer.flush()} spans written to {tracer.exporter.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""Micro-batching and coalescing of model calls across concurrent sessions.
+
+Every `runner.run_async` turn sends its own model request. With hundreds of
+sessions at once that means hundreds of separate HTTP calls, most of them
+waiting on the same endpoint and some of them identical (the same first
+question to the same agent). `BatchingLlm` sits between the agents and the
+model client and:
+
+- collects the requests for the same model and configuration (system
+  instruction, tools, generation settings) that arrive within `window`
+  seconds, up to `max_batch` of them, into one batch;
+- coalesces identical requests in a batch, so they share one call and one
+  answer (each caller gets its own copy);
+- sends the batch as one call when the client supports it (`can_batch` and
+  `generate_batch`, e.g. `GeminiRestLlm` with a `batch_route`), or
+  otherwise as concurrent single calls;
+- keeps at most `max_connections` calls in flight and at most `max_pending`
+  requests waiting, so under overload callers wait for their turn instead of
+  flooding the endpoint (backpressure);
+- retries rate-limited and transient failures (429, 5xx, dropped
+  connections) with exponential backoff and full jitter, honouring the
+  server's Retry-After.
+
+    client = GeminiRestLlm(model="gemini-2.5-flash", max_connections=32)
+    model = BatchingLlm(inner=client, window=0.005, max_batch=32, max_connections=32)
+    agent = Agent(name="weather_agent_v1", model=model, ...)
+
+Streaming requests are passed straight through (within the connection
+limit), as partial answers cannot be shared or retried. The window adds up
+to `window` seconds to a call made when the endpoint is idle; under load the
+batches fill up before the window ends.
+
+`python -m common.benchmarks.model_batching` drives 500 concurrent sessions
+against a local HTTP stand-in for the model endpoint.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Optional
+
+import httpx
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors as genai_errors
+from google.genai import types
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+# Config fields that are top-level in a generateContent body rather than generation settings.
+TOP_LEVEL_FIELDS = ("systemInstruction", "tools", "toolConfig", "safetySettings", "cachedContent")
+CLIENT_ONLY_FIELDS = ("httpOptions", "automaticFunctionCalling", "labels")
+
+
+def _status(error: BaseException) -> Optional[int]:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    if isinstance(error, genai_errors.APIError):
+        return error.code
+    return None
+
+
+def _retry_after(error: BaseException) -> float:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0)) if response is not None else 0.0
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def retry_delay(error: BaseException, attempt: int, base_delay: float, max_delay: float) -> Optional[float]:
+    """Seconds to wait before retry number `attempt` (0-based), or None if `error` is not worth retrying."""
+    if not (_status(error) in RETRYABLE_STATUS or isinstance(error, httpx.TransportError)):
+        return None
+    backoff = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))  # Full jitter.
+    return _retry_after(error) + backoff
+
+
+@dataclass
+class _Pending:
+    """One distinct request in a batch, and the future its callers wait on."""
+    request: LlmRequest
+    future: asyncio.Future
+    callers: int = 1
+
+
+@dataclass
+class _Batch:
+    items: dict[str, _Pending] = field(default_factory=dict)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class BatchingLlm(BaseLlm):
+    """Wraps a model client to batch, coalesce, limit and retry concurrent calls."""
+
+    inner: BaseLlm
+    window: float = 0.005
+    """Seconds to wait for more requests after the first one of a batch."""
+    max_batch: int = 32
+    max_connections: int = 32
+    """Calls (single or batched) in flight to the endpoint at once."""
+    max_pending: int = 10_000
+    """Requests waiting or in flight before new callers have to wait."""
+    max_retries: int = 5
+    base_delay: float = 0.05
+    max_delay: float = 2.0
+
+    _loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
+    _batches: dict[str, _Batch] = PrivateAttr(default_factory=dict)
+    _connections: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _pending: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _tasks: set = PrivateAttr(default_factory=set)
+    _stats: dict = PrivateAttr(default_factory=lambda: dict.fromkeys(
+        ("requests", "coalesced", "batches", "upstream_calls", "retries", "errors"), 0))
+
+    def __init__(self, **data):
+        data.setdefault("model", data["inner"].model)
+        super().__init__(**data)
+
+    @property
+    def stats(self) -> dict:
+        """Counters: requests, coalesced (served by another caller's call), batches, upstream_calls,
+        retries, errors."""
+        return self._stats
+
+    def _bind_loop(self):
+        # Semaphores and futures belong to one event loop; start afresh when called from another.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._batches = {}
+            self._connections = asyncio.Semaphore(self.max_connections)
+            self._pending = asyncio.Semaphore(self.max_pending)
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self._bind_loop()
+        self._stats["requests"] += 1
+        if stream:
+            async with self._connections:
+                self._stats["upstream_calls"] += 1
+                async for response in self.inner.generate_content_async(llm_request, stream=True):
+                    yield response
+            return
+
+        async with self._pending:
+            pending = self._submit(llm_request)
+            # Shielded: a caller giving up must not cancel a call other callers share.
+            response = await asyncio.shield(pending.future)
+        yield response.model_copy(deep=True) if pending.callers > 1 else response
+
+    def _submit(self, llm_request: LlmRequest) -> _Pending:
+        config = llm_request.config.model_dump_json(exclude_none=True) if llm_request.config else ""
+        batch_key = f"{llm_request.model or self.model}\0{config}"
+        request_key = json.dumps([content.model_dump(mode="json", exclude_none=True)
+                                  for content in llm_request.contents], sort_keys=True)
+        batch = self._batches.get(batch_key)
+        if batch is None:
+            batch = self._batches[batch_key] = _Batch()
+            if self.window > 0 and self.max_batch > 1:
+                batch.timer = self._loop.call_later(self.window, self._flush, batch_key)
+        pending = batch.items.get(request_key)
+        if pending is not None:
+            pending.callers += 1
+            self._stats["coalesced"] += 1
+            return pending
+        pending = batch.items[request_key] = _Pending(llm_request, self._loop.create_future())
+        if len(batch.items) >= self.max_batch or batch.timer is None:
+            self._flush(batch_key)
+        return pending
+
+    def _flush(self, batch_key: str):
+        batch = self._batches.pop(batch_key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self._stats["batches"] += 1
+        task = self._loop.create_task(self._dispatch(list(batch.items.values())))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, items: list[_Pending]):
+        try:
+            if len(items) > 1 and getattr(self.inner, "can_batch", False):
+                responses = await self._call(lambda: self.inner.generate_batch([item.request for item in items]))
+                for item, response in zip(items, responses):
+                    _resolve(item.future, response)
+            else:
+                await asyncio.gather(*(self._dispatch_one(item) for item in items))
+        except Exception as e:
+            for item in items:
+                _resolve(item.future, error=e)
+
+    async def _dispatch_one(self, item: _Pending):
+        try:
+            _resolve(item.future, await self._call(lambda: _one_response(self.inner, item.request)))
+        except Exception as e:
+            _resolve(item.future, error=e)
+
+    async def _call(self, make_call):
+        """Runs `make_call()` within the connection limit, retrying what is worth retrying."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._connections:
+                    self._stats["upstream_calls"] += 1
+                    return await make_call()
+            except Exception as e:
+                delay = retry_delay(e, attempt, self.base_delay, self.max_delay)
+                if delay is None or attempt == self.max_retries:
+                    self._stats["errors"] += 1
+                    raise
+                self._stats["retries"] += 1
+                logger.debug("Model call failed (%r); retry %d in %.2f s", e, attempt + 1, delay)
+                await asyncio.sleep(delay)
+
+
+def _resolve(future: asyncio.Future, response: Optional[LlmResponse] = None,
+             error: Optional[BaseException] = None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(response)
+
+
+async def _one_response(llm: BaseLlm, llm_request: LlmRequest) -> LlmResponse:
+    response = None
+    async for response in llm.generate_content_async(llm_request, stream=False):
+        pass
+    if response is None:
+        raise RuntimeError(f"{llm.model} returned no response")
+    return response
+
+
+class GeminiRestLlm(BaseLlm):
+    """A small client for the Gemini REST API (or a compatible endpoint) with a bounded connection pool.
+
+    `batch_route` names a route on the same endpoint that takes
+    {"requests": [body, ...]} and returns {"responses": [body, ...]}, as
+    self-hosted model servers may offer; with it, `generate_batch` sends a
+    whole batch in one call. Streaming requests get the answer in one piece.
+    """
+
+    model: str
+    base_url: str = "https://generativelanguage.googleapis.com/v1beta"
+    api_key: Optional[str] = None
+    max_connections: int = 32
+    timeout: float = 60.0
+    batch_route: Optional[str] = None
+
+    _client: Optional[httpx.AsyncClient] = PrivateAttr(default=None)
+    _client_loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
+
+    @property
+    def can_batch(self) -> bool:
+        return bool(self.batch_route)
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            api_key = self.api_key or os.environ.get("GOOGLE_API_KEY")
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout,
+                headers={"x-goog-api-key": api_key} if api_key else {},
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections))
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def request_body(llm_request: LlmRequest) -> dict:
+        body = {"contents": [content.model_dump(mode="json", exclude_none=True, by_alias=True)
+                             for content in llm_request.contents]}
+        config = llm_request.config.model_dump(mode="json", exclude_none=True, by_alias=True) \
+            if llm_request.config else {}
+        for name in CLIENT_ONLY_FIELDS:
+            config.pop(name, None)
+        for name in TOP_LEVEL_FIELDS:
+            if name in config:
+                body[name] = config.pop(name)
+        if isinstance(body.get("systemInstruction"), str):
+            body["systemInstruction"] = {"parts": [{"text": body["systemInstruction"]}]}
+        if config:
+            body["generationConfig"] = config
+        return body
+
+    async def _post(self, path: str, body: dict) -> dict:
+        response = await self._http().post(path, json=body)
+        response.raise_for_status()
+        return response.json()
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        data = await self._post(f"/models/{llm_request.model or self.model}:generateContent",
+                                self.request_body(llm_request))
+        yield LlmResponse.create(types.GenerateContentResponse.model_validate(data))
+
+    async def generate_batch(self, llm_requests: list[LlmRequest]) -> list[LlmResponse]:
+        """Sends requests for one model in one call (needs `batch_route`); answers come back in order."""
+        if not self.batch_route:
+            raise ValueError("generate_batch needs a batch_route")
+        model = llm_requests[0].model or self.model
+        data = await self._post(f"/models/{model}{self.batch_route}",
+                                {"requests": [self.request_body(request) for request in llm_requests]})
+        return [LlmResponse.create(types.GenerateContentResponse.model_validate(response))
+                for response in data["responses"]]
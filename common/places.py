@@ -0,0 +1,185 @@
+"""Resolves free-text city and station names ("Gambir", "jogja", "Bandungg") to places.
+
+`PlaceResolver` is built once from the train stations plus the extra places
+in common/data/places.csv (hotel areas without a station, like Ubud). Each
+station is findable by code, name, city and aliases. A city or an alias
+covering several stations resolves to all of them.
+
+`resolve` tries three things, cheapest first, and says how sure it is:
+
+- exact: one dict lookup on the normalized text (confidence 1.0);
+- prefix: a walk down a trie of names, accepted when only one place has the
+  prefix ("gamb" -> Gambir);
+- fuzzy: the names sharing the most trigrams with the text, via an inverted
+  trigram index, scored by Dice similarity ("Jogyakarta" -> Yogyakarta).
+
+Tools act on matches with at least `MIN_CONFIDENCE`, and report the resolved
+name so the model can mention it instead of asking the user again.
+"""
+import csv
+import functools
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_PLACES_PATH = os.path.join(DATA_DIR, "places.csv")
+MIN_CONFIDENCE = 0.6
+MIN_PREFIX = 3
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalize_place(text: str) -> str:
+    return _NON_ALNUM.sub("", text.lower())
+
+
+def trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class Place:
+    """A named place and the train stations serving it (none for e.g. Ubud)."""
+    name: str
+    city: str
+    codes: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class PlaceMatch:
+    query: str
+    place: Place
+    confidence: float
+    method: str
+
+    def as_dict(self) -> dict:
+        return {"query": self.query, "resolved": self.place.name, "city": self.place.city,
+                "confidence": round(self.confidence, 2), "method": self.method}
+
+
+class PlaceResolver:
+    """Exact, prefix (trie) and fuzzy (trigram) lookup of place names."""
+
+    def __init__(self, entries: Iterable[tuple[str, Place]]):
+        self._exact: dict[str, Place] = {}
+        for name, place in entries:
+            key = normalize_place(name)
+            if key:
+                self._exact.setdefault(key, place)
+
+        # Each trie node keeps the places found below it, so a prefix that
+        # leads to a single place is answered in one walk of the prefix.
+        self._trie: dict = {}
+        for key, place in self._exact.items():
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {"": set()})
+                node[""].add(place)
+
+        self._trigrams: dict[str, list[str]] = {}
+        self._gram_counts: dict[str, int] = {}
+        for key in self._exact:
+            grams = trigrams(key)
+            self._gram_counts[key] = len(grams)
+            for gram in grams:
+                self._trigrams.setdefault(gram, []).append(key)
+        self.fuzzy = functools.lru_cache(maxsize=4096)(self._fuzzy)
+
+    @classmethod
+    def from_stations(cls, stations, aliases: Iterable[tuple[str, str]] = (),
+                      places: Iterable[tuple[str, str, Iterable[str]]] = ()) -> "PlaceResolver":
+        """Builds the index from stations, (alias, station code) pairs and (name, city, aliases) places."""
+        by_city: dict[str, list[str]] = {}
+        for station in stations:
+            by_city.setdefault(station.city, []).append(station.code)
+        cities = {city: Place(city, city, tuple(codes)) for city, codes in by_city.items()}
+        by_code = {station.code: station for station in stations}
+
+        # Cities go first: when a station is named after its city, the name
+        # means the whole city ("Yogyakarta" covers Lempuyangan too).
+        entries = [(city, place) for city, place in cities.items()]
+        for station in stations:
+            place = Place(station.name, station.city, (station.code,))
+            entries += [(station.code, place), (station.name, place)]
+
+        alias_codes: dict[str, list[str]] = {}
+        for alias, code in aliases:
+            alias_codes.setdefault(alias, []).append(code)
+        for alias, codes in alias_codes.items():
+            city = by_code[codes[0]].city
+            if len(codes) > 1 and all(by_code[code].city == city for code in codes):
+                entries.append((alias, cities[city]))
+            else:
+                entries.append((alias, Place(by_code[codes[0]].name, city, tuple(codes))))
+
+        for name, city, place_aliases in places:
+            place = cities.get(name) or Place(name, city, cities[city].codes if city in cities else ())
+            entries += [(name, place)] + [(alias, place) for alias in place_aliases]
+        return cls(entries)
+
+    def resolve(self, text: str) -> Optional[PlaceMatch]:
+        """The best match for `text`, or None when nothing comes close."""
+        key = normalize_place(text or "")
+        if not key:
+            return None
+        place = self._exact.get(key)
+        if place is not None:
+            return PlaceMatch(text, place, 1.0, "exact")
+        if len(key) >= MIN_PREFIX:
+            node = self._trie
+            for char in key:
+                node = node.get(char)
+                if node is None:
+                    break
+            if node is not None and len(node[""]) == 1:
+                place = next(iter(node[""]))
+                confidence = 0.5 + 0.5 * len(key) / len(normalize_place(place.name))
+                return PlaceMatch(text, place, min(confidence, 0.95), "prefix")
+        found = self.fuzzy(key)
+        if found is None:
+            return None
+        place, score = found
+        return PlaceMatch(text, place, score, "fuzzy")
+
+    def _fuzzy(self, key: str) -> Optional[tuple[Place, float]]:
+        grams = trigrams(key)
+        shared = Counter(name for gram in grams for name in self._trigrams.get(gram, ()))
+        best, best_score = None, 0.0
+        for name, count in shared.items():
+            score = 2 * count / (len(grams) + self._gram_counts[name])
+            if score > best_score:
+                best, best_score = name, score
+        return (self._exact[best], best_score) if best else None
+
+    def suggestions(self, text: str, n: int = 3) -> list[str]:
+        """Names of the closest places, for an error message."""
+        grams = trigrams(normalize_place(text or ""))
+        shared = Counter(name for gram in grams for name in self._trigrams.get(gram, ()))
+        names = []
+        for key, _ in shared.most_common():
+            name = self._exact[key].name
+            if name not in names:
+                names.append(name)
+            if len(names) == n:
+                break
+        return names
+
+
+def read_places(path: str) -> list[tuple[str, str, list[str]]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["name"], row["city"], list(filter(None, (row.get("aliases") or "").split("|"))))
+                for row in csv.DictReader(f)]
+
+
+def load() -> PlaceResolver:
+    """Returns the shared resolver, built with the train timetable (see `train_schedule.load`)."""
+    from common import train_schedule
+    return train_schedule.load().places
+
+
+def resolve(text: str) -> Optional[PlaceMatch]:
+    return load().resolve(text)
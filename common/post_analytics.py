@@ -0,0 +1,84 @@
+"""Engagement aggregates and a hashtag index over a set of posts.
+
+`PostAnalytics` is built once per load of the posts file (see
+`PostStore.analytics`). Likes and shares live in NumPy columns, influencers
+are integer codes into `influencers`, and `hashtag_index` maps each hashtag
+to the positions of the posts using it. `summary` answers in a few hundred
+tokens, however many posts there are:
+
+    analytics = store.analytics()
+    analytics.summary(top_n=10)
+"""
+from typing import Iterable
+
+import numpy as np
+
+
+class PostAnalytics:
+    """Columnar engagement data and hashtag → post index for one load of posts."""
+
+    def __init__(self, posts: list[dict], tags: Iterable[Iterable[str]]):
+        count = len(posts)
+        self.ids = [post.get("id") for post in posts]
+        self.likes = np.fromiter((post.get("likes", 0) for post in posts), dtype=np.int64, count=count)
+        self.shares = np.fromiter((post.get("shares", 0) for post in posts), dtype=np.int64, count=count)
+        self.engagement = self.likes + self.shares
+
+        codes: dict[str, int] = {}
+        self.influencer_codes = np.fromiter(
+            (codes.setdefault(post.get("influencer", ""), len(codes)) for post in posts),
+            dtype=np.int64, count=count)
+        self.influencers = list(codes)
+
+        positions: dict[str, list[int]] = {}
+        for position, post_tags in enumerate(tags):
+            for tag in post_tags:
+                positions.setdefault(tag, []).append(position)
+        self.hashtag_index = {tag: np.array(found, dtype=np.int64) for tag, found in positions.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def top_hashtags(self, n: int = 10) -> list[dict]:
+        """The most used hashtags, with the likes and shares of their posts."""
+        ranked = sorted(self.hashtag_index.items(), key=lambda item: len(item[1]), reverse=True)[:n]
+        return [{"hashtag": f"#{tag}", "posts": len(found),
+                 "likes": int(self.likes[found].sum()), "shares": int(self.shares[found].sum())}
+                for tag, found in ranked]
+
+    def influencer_totals(self, n: int = 10) -> list[dict]:
+        """Influencers with the highest total engagement (likes + shares)."""
+        size = len(self.influencers)
+        posts = np.bincount(self.influencer_codes, minlength=size)
+        likes = np.bincount(self.influencer_codes, weights=self.likes, minlength=size)
+        shares = np.bincount(self.influencer_codes, weights=self.shares, minlength=size)
+        order = np.argsort(likes + shares)[::-1][:n]
+        return [{"influencer": self.influencers[i], "posts": int(posts[i]), "likes": int(likes[i]),
+                 "shares": int(shares[i]), "avg_engagement": round(float((likes[i] + shares[i]) / posts[i]), 1)}
+                for i in order.tolist()]
+
+    def outliers(self, z: float = 2.0, n: int = 5) -> list[dict]:
+        """Posts whose engagement is at least `z` standard deviations above the mean."""
+        if len(self) < 2:
+            return []
+        std = self.engagement.std()
+        if not std:
+            return []
+        scores = (self.engagement - self.engagement.mean()) / std
+        found = np.flatnonzero(scores >= z)
+        found = found[np.argsort(self.engagement[found])[::-1][:n]]
+        return [{"id": self.ids[i], "influencer": self.influencers[self.influencer_codes[i]],
+                 "likes": int(self.likes[i]), "shares": int(self.shares[i]), "z": round(float(scores[i]), 1)}
+                for i in found.tolist()]
+
+    def summary(self, top_n: int = 10, z: float = 2.0) -> dict:
+        """Totals, top hashtags, top influencers and outliers in one compact dict."""
+        return {
+            "posts": len(self),
+            "total_likes": int(self.likes.sum()),
+            "total_shares": int(self.shares.sum()),
+            "avg_engagement": round(float(self.engagement.mean()), 1) if len(self) else 0.0,
+            "top_hashtags": self.top_hashtags(top_n),
+            "influencers": self.influencer_totals(top_n),
+            "outliers": self.outliers(z, top_n),
+        }
@@ -0,0 +1,107 @@
+"""Social media posts, parsed once and queried with filters.
+
+`PostStore` reads a posts file and caches the parsed posts until the file
+changes (the mtime or size differs). Two formats are supported:
+
+- ``.json``: one JSON array, read with `json.load`;
+- ``.jsonl``: JSON Lines, one post per line, parsed line by line, so memory
+  holds only the parsed posts and never a second copy of the raw text.
+
+`query` filters by influencer, hashtag and date range, and returns the top N
+by date, likes or shares. So the model only ever sees a compact slice of the
+data, never the whole file:
+
+    store = PostStore("socmed_agent/posts.jsonl")
+    store.query(hashtag="pasta", sort_by="likes", limit=5)
+
+Each load also builds a `PostAnalytics` (engagement columns and a hashtag
+index), used for hashtag queries and returned by `analytics`.
+"""
+import heapq
+import json
+import os
+import re
+import threading
+from typing import Iterator, Optional
+
+from common.post_analytics import PostAnalytics
+
+HASHTAG = re.compile(r"#(\w+)")
+SORT_KEYS = ("date", "likes", "shares")
+
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    """Yields the posts in a JSON Lines file one at a time, skipping blank lines."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_posts(path: str) -> Iterator[dict]:
+    if path.endswith(".jsonl"):
+        return iter_jsonl(path)
+    with open(path, encoding="utf-8") as f:
+        return iter(json.load(f))
+
+
+def hashtags(content: str) -> frozenset[str]:
+    return frozenset(tag.lower() for tag in HASHTAG.findall(content))
+
+
+class PostStore:
+    """Posts from one file, reloaded only when the file changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple[int, int]] = None
+        # The posts and their analytics, swapped together so a reader never mixes two loads.
+        self._loaded: tuple[list[dict], PostAnalytics] = ([], PostAnalytics([], []))
+        self.loads = 0
+
+    def posts(self) -> list[dict]:
+        """All posts, re-read if the file changed since the last call."""
+        return self._refresh()[0]
+
+    def analytics(self) -> PostAnalytics:
+        """Aggregates over all posts, rebuilt together with them."""
+        return self._refresh()[1]
+
+    def _refresh(self) -> tuple[list[dict], PostAnalytics]:
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if signature != self._signature:
+                posts = list(iter_posts(self.path))
+                # Hashtags are extracted once per load, not once per query.
+                tags = [hashtags(post.get("content", "")) for post in posts]
+                self._loaded = (posts, PostAnalytics(posts, tags))
+                self._signature = signature
+                self.loads += 1
+            return self._loaded
+
+    def query(self, influencer: str = "", hashtag: str = "", since: str = "", until: str = "",
+              sort_by: str = "date", limit: int = 20) -> tuple[int, list[dict]]:
+        """Returns (number of matches, top `limit` matches).
+
+        `since` and `until` are inclusive ISO dates (YYYY-MM-DD). Results are
+        sorted by `sort_by`, highest (or newest) first.
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}, not {sort_by!r}.")
+        posts, analytics = self._refresh()
+        influencer = influencer.lower()
+        hashtag = hashtag.lower().lstrip("#")
+        if hashtag:
+            found = analytics.hashtag_index.get(hashtag)
+            posts = [posts[i] for i in found.tolist()] if found is not None else []
+        matches = [
+            post for post in posts
+            if (not influencer or post.get("influencer", "").lower() == influencer)
+            and (not since or post.get("date", "") >= since)
+            and (not until or post.get("date", "") <= until)
+        ]
+        missing = "" if sort_by == "date" else 0
+        top = heapq.nlargest(max(limit, 0), matches, key=lambda post: post.get(sort_by, missing))
+        return len(matches), top
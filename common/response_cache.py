@@ -0,0 +1,259 @@
+"""Reuses the final answer of an earlier, near-identical turn.
+
+Many turns are the same question from different users ("What is the weather
+like in London?"). `ResponseCache` is a before_model_callback: on the first
+model call of a turn it looks the user's message up and, on a hit, returns
+the stored answer, so the whole turn (model calls and tool calls) is skipped.
+Its `store` method is the matching after_model_callback, which keeps the final
+text answer of each turn that missed:
+
+    cache = ResponseCache(ttl=300, state_keys=["user_preference_temperature_unit"])
+    agent = Agent(..., before_model_callback=cache, after_model_callback=cache.store)
+
+Lookup is exact first (lower-cased text without punctuation), then by
+similarity. The similarity index is an inverted index of character trigrams
+and word bigrams, scored by Dice coefficient against `threshold`. A similar
+entry must also have the same words in the same order once `FILLER_WORDS`
+are dropped. So "tolong cariin tiket kereta dong" reuses "cari tiket kereta",
+but "Paris" never reuses "Parma", "pagi" never reuses "sore" and "dari Gambir
+ke Bandung" never reuses "dari Bandung ke Gambir", however long the sentence.
+
+An answer is only reused in the same scope:
+
+- the same agent;
+- the same values of `state_keys` (e.g. the temperature unit);
+- the same numbers in the message ("3 malam" never matches "4 malam");
+- the same previous answer, so a follow-up like "yes, book it" is only
+  shared by sessions that got the same question before it.
+
+Turns that called a tool marked `@uncacheable` (bookings) are never stored.
+A served answer skips its tools, so the state changes the agent made during
+the stored turn (e.g. `last_city_checked_stateful`) are kept with the entry
+and applied again on every hit.
+
+Set RESPONSE_CACHE=off to disable every cache, e.g. when debugging prompts.
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from common.history import split_turns
+
+logger = logging.getLogger(__name__)
+
+_APOSTROPHE = re.compile(r"['’]")
+_NON_WORD = re.compile(r"[^\w]+")
+_NUMBER = re.compile(r"\d+")
+
+# Words that may differ between two messages sharing an answer.
+FILLER_WORDS = frozenset("""
+a an the is are what whats how hows please pls can could would you me i my tell show like
+hi hello hey halo hai dong ya yah deh sih nih kak tolong mau saya aku ingin minta cari cariin carikan coba
+""".split())
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", _APOSTROPHE.sub("", text.lower())).split())
+
+
+def features(text: str) -> set[str]:
+    """Character trigrams and word bigrams of normalized text."""
+    padded = f" {text} "
+    grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    words = text.split()
+    grams.update(f"{a}|{b}" for a, b in zip(words, words[1:]))
+    return grams
+
+
+def content_words(text: str) -> tuple[str, ...]:
+    return tuple(word for word in text.split() if word not in FILLER_WORDS)
+
+
+def _text(content: types.Content) -> str:
+    return " ".join(part.text for part in content.parts or () if part.text and not part.thought)
+
+
+@dataclass
+class _Entry:
+    response: LlmResponse
+    features: set[str]
+    words: tuple[str, ...]
+    expires_at: float
+    state_delta: dict
+    hits: int = 0
+
+
+@dataclass
+class _Pending:
+    scope: tuple
+    text: str
+    started: float
+    storable: bool
+
+
+class ResponseCache:
+    """before/after_model_callback pair caching final answers per normalized user message."""
+
+    def __init__(self, ttl: float = 300, threshold: float = 0.8, state_keys: Iterable[str] = (),
+                 maxsize: int = 4096, enabled: Optional[bool] = None):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.state_keys = tuple(state_keys)
+        self.maxsize = maxsize
+        self.enabled = os.environ.get("RESPONSE_CACHE", "on") != "off" if enabled is None else enabled
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._postings: dict[tuple, set[str]] = {}
+        self._pending: dict[tuple, _Pending] = {}
+        self.stats = {"lookups": 0, "exact_hits": 0, "similar_hits": 0, "stores": 0,
+                      "turns_timed": 0, "turn_seconds": 0.0, "lookup_seconds": 0.0}
+
+    @property
+    def hits(self) -> int:
+        return self.stats["exact_hits"] + self.stats["similar_hits"]
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.stats["lookups"] if self.stats["lookups"] else 0.0
+
+    @property
+    def seconds_saved(self) -> float:
+        """Hits times the mean model time of the turns that missed."""
+        if not self.stats["turns_timed"]:
+            return 0.0
+        return self.hits * self.stats["turn_seconds"] / self.stats["turns_timed"]
+
+    def lookup(self, scope: tuple, text: str) -> Optional[tuple[_Entry, str]]:
+        """The live entry for `text` in `scope` and how it matched, or None."""
+        now = time.monotonic()
+        entry = self._entries.get((scope, text))
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end((scope, text))
+                return entry, "exact"
+            self._remove((scope, text))
+
+        grams, words = features(text), content_words(text)
+        shared = Counter(other for gram in grams for other in self._postings.get((scope, gram), ()))
+        # Dice is at most 2c / (g + c) for c shared features, so candidates
+        # sharing fewer than `needed` cannot reach the threshold.
+        needed = self.threshold * len(grams) / (2 - self.threshold)
+        best, best_score = None, self.threshold
+        for other, count in shared.most_common():
+            if count < needed:
+                break
+            candidate = self._entries[(scope, other)]
+            score = 2 * count / (len(grams) + len(candidate.features))
+            if score >= best_score and candidate.words == words and candidate.expires_at > now:
+                best, best_score = candidate, score
+        return (best, "similar") if best else None
+
+    def put(self, scope: tuple, text: str, response: LlmResponse, state_delta: Optional[dict] = None):
+        key = (scope, text)
+        if key in self._entries:
+            self._remove(key)
+        grams = features(text)
+        self._entries[key] = _Entry(response, grams, content_words(text), time.monotonic() + self.ttl,
+                                    dict(state_delta or {}))
+        for gram in grams:
+            self._postings.setdefault((scope, gram), set()).add(text)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        self._entries.clear()
+        self._postings.clear()
+
+    def _remove(self, key: tuple):
+        scope, text = key
+        entry = self._entries.pop(key)
+        for gram in entry.features:
+            texts = self._postings.get((scope, gram))
+            if texts is not None:
+                texts.discard(text)
+                if not texts:
+                    del self._postings[(scope, gram)]
+
+    def _scope(self, callback_context: CallbackContext, text: str, previous: str) -> tuple:
+        state = tuple(str(callback_context.state.get(key)) for key in self.state_keys)
+        return (callback_context.agent_name, state, tuple(_NUMBER.findall(text)), normalize_text(previous))
+
+    def __call__(self, callback_context: CallbackContext,
+                 llm_request: LlmRequest) -> Optional[LlmResponse]:
+        if not self.enabled:
+            return None
+        turns = split_turns(llm_request.contents)
+        if not turns or not turns[-1] or turns[-1][0].role != "user":
+            return None
+        turn = turns[-1]
+        pending_key = (callback_context.invocation_id, callback_context.agent_name)
+        calls = [part.function_call.name for content in turn[1:] for part in content.parts or ()
+                 if part.function_call]
+
+        if calls or any(part.function_response for content in turn[1:] for part in content.parts or ()):
+            # A later call in a turn that missed: note any side-effecting tool.
+            pending = self._pending.get(pending_key)
+            if pending is not None and any(
+                    getattr(getattr(llm_request.tools_dict.get(name), "func", None), "__uncacheable__", False)
+                    for name in calls):
+                pending.storable = False
+            return None
+
+        start = time.perf_counter()
+        text = normalize_text(_text(turn[0]))
+        previous = ""
+        if len(turns) > 1:
+            answers = [_text(content) for content in turns[-2] if content.role == "model"]
+            previous = next((answer for answer in reversed(answers) if answer), "")
+        scope = self._scope(callback_context, text, previous)
+        found = self.lookup(scope, text) if text else None
+        self.stats["lookups"] += 1
+        self.stats["lookup_seconds"] += time.perf_counter() - start
+
+        if found is None:
+            self._pending[pending_key] = _Pending(scope, text, time.perf_counter(), bool(text))
+            if len(self._pending) > 1024:  # Turns that failed never reach `store`.
+                self._pending.pop(next(iter(self._pending)))
+            return None
+
+        entry, method = found
+        entry.hits += 1
+        # The skipped tools' state changes, recorded on the served answer's event.
+        for key, value in entry.state_delta.items():
+            callback_context.state[key] = value
+        self.stats[f"{method}_hits"] += 1
+        logger.info("Response cache %s hit for %s in %s (hit rate %.0f%%, ~%.2f s saved so far)",
+                    method, callback_context.invocation_id, callback_context.agent_name,
+                    100 * self.hit_rate, self.seconds_saved)
+        return entry.response.model_copy(update={"custom_metadata": {"response_cache": method}}, deep=True)
+
+    def store(self, callback_context: CallbackContext,
+              llm_response: LlmResponse) -> Optional[LlmResponse]:
+        """after_model_callback keeping the final text answer of a turn that missed."""
+        if llm_response.partial or not llm_response.content or not llm_response.content.parts:
+            return None
+        if any(part.function_call for part in llm_response.content.parts):
+            return None
+        pending = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        answer = _text(llm_response.content)
+        if pending is None or not pending.storable or not answer or llm_response.error_code:
+            return None
+        self.stats["turns_timed"] += 1
+        self.stats["turn_seconds"] += time.perf_counter() - pending.started
+        self.stats["stores"] += 1
+        state_delta = {}
+        for event in callback_context.session.events:
+            if (event.invocation_id == callback_context.invocation_id
+                    and event.author == callback_context.agent_name and event.actions.state_delta):
+                state_delta.update(event.actions.state_delta)
+        self.put(pending.scope, pending.text,
+                 LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer)])), state_delta)
+        return None
@@ -0,0 +1,115 @@
+"""Routes obvious requests to a sub-agent without asking the coordinator model.
+
+A coordinator like travel_agent_team spends one model call per turn just to
+pick a specialist, even for "Hello there!" or "hotel di Ubud dong".
+`FastPathRouter` is a before_model_callback that classifies the newest user
+message with a few precompiled regexes. When exactly one route matches, it
+answers in place of the model with a ``transfer_to_agent`` call, and ADK
+hands the turn to that sub-agent as if the coordinator had decided so. When
+no route or several routes match, the model is called as usual.
+
+    route = FastPathRouter({
+        "greeting_agent": [r"^(hi|hello|hey)( there)?\\W*$"],
+        "farewell_agent": [r"^(bye|goodbye|see you)\\W*$"],
+    })
+    coordinator = Agent(..., sub_agents=[greeting_agent, farewell_agent],
+                        before_model_callback=route, after_model_callback=route.record)
+
+Routing only happens on the first model call of a turn (the last content is
+the user's message). Calls after a tool result always go to the model.
+
+`record` (optional, as after_model_callback) times the model calls that did
+happen, so the saved latency is estimated from their running mean instead of
+`default_call_seconds`. `stats` counts routed turns per agent and the skipped
+calls, and every routed turn is logged at INFO.
+"""
+import logging
+import re
+import time
+from typing import Iterable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+TRANSFER_TOOL = "transfer_to_agent"
+
+
+def pending_user_text(llm_request: LlmRequest) -> Optional[str]:
+    """The user's message when the request ends with one, else None (e.g. after a tool result)."""
+    if not llm_request.contents:
+        return None
+    last = llm_request.contents[-1]
+    if last.role != "user" or not last.parts or any(part.function_response for part in last.parts):
+        return None
+    texts = [part.text for part in last.parts if part.text]
+    return " ".join(texts) if texts else None
+
+
+class FastPathRouter:
+    """before_model_callback that transfers to a sub-agent when one route clearly matches."""
+
+    def __init__(self, routes: dict[str, Iterable[str]], default_call_seconds: float = 1.0,
+                 max_chars: int = 500):
+        # One alternation per agent; patterns match the lower-cased message.
+        self._routes = {agent: re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+                        for agent, patterns in routes.items()}
+        self.default_call_seconds = default_call_seconds
+        self.max_chars = max_chars
+        self._started: dict[str, float] = {}
+        self.stats = {"calls": 0, "routed": 0, "by_agent": {agent: 0 for agent in routes},
+                      "model_calls": 0, "model_seconds": 0.0, "classify_seconds": 0.0}
+
+    def classify(self, text: str) -> Optional[str]:
+        """The only agent whose patterns match `text`, or None."""
+        if len(text) > self.max_chars:
+            return None
+        lowered = text.strip().lower()
+        found = [agent for agent, regex in self._routes.items() if regex.search(lowered)]
+        return found[0] if len(found) == 1 else None
+
+    @property
+    def call_seconds(self) -> float:
+        """Mean latency of the model calls that were not skipped."""
+        if not self.stats["model_calls"]:
+            return self.default_call_seconds
+        return self.stats["model_seconds"] / self.stats["model_calls"]
+
+    @property
+    def seconds_saved(self) -> float:
+        return self.stats["routed"] * self.call_seconds
+
+    def __call__(self, callback_context: CallbackContext,
+                 llm_request: LlmRequest) -> Optional[LlmResponse]:
+        self.stats["calls"] += 1
+        start = time.perf_counter()
+        text = pending_user_text(llm_request)
+        agent = self.classify(text) if text else None
+        self.stats["classify_seconds"] += time.perf_counter() - start
+        if agent is None:
+            self._started[callback_context.invocation_id] = time.perf_counter()
+            if len(self._started) > 1024:  # Calls that failed never reach `record`.
+                self._started.pop(next(iter(self._started)))
+            return None
+
+        self.stats["routed"] += 1
+        self.stats["by_agent"][agent] += 1
+        logger.info("Routed %s from %s to %s without a model call (%d skipped, ~%.2f s saved so far)",
+                    callback_context.invocation_id, callback_context.agent_name, agent,
+                    self.stats["routed"], self.seconds_saved)
+        return LlmResponse(content=types.Content(role="model", parts=[
+            types.Part(function_call=types.FunctionCall(name=TRANSFER_TOOL, args={"agent_name": agent}))]))
+
+    def record(self, callback_context: CallbackContext,
+               llm_response: LlmResponse) -> Optional[LlmResponse]:
+        """after_model_callback timing the coordinator calls that went to the model."""
+        if llm_response.partial:
+            return None
+        start = self._started.pop(callback_context.invocation_id, None)
+        if start is not None:
+            self.stats["model_calls"] += 1
+            self.stats["model_seconds"] += time.perf_counter() - start
+        return None
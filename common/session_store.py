@@ -0,0 +1,388 @@
+"""A persistent session service backed by a local SQLite file.
+
+`LocalSessionService` is a drop-in replacement for `InMemorySessionService`
+that survives process restarts:
+
+- SQLite runs in WAL mode, so readers never block the writer and several
+  processes can share one file.
+- Sessions are keyed by (app_name, user_id, session_id), and events by
+  (app_name, user_id, session_id, seq), so every lookup is a primary-key probe.
+- Event appends are buffered and written in one transaction when the turn's
+  final response arrives (or on `flush()`), not one commit per event.
+- Recently used sessions stay decoded in an LRU cache. A warm `get_session`
+  only checks the stored update_time (one indexed read) before copying the
+  cached session.
+
+The SQLite calls are synchronous. They take microseconds on a warm page cache,
+which is cheaper than handing every call to a thread.
+
+Use `update_state()` to change state outside of a turn instead of editing
+`session.state` in place. It works with any session service.
+"""
+import copy
+import json
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.errors.session_not_found_error import SessionNotFoundError
+from google.adk.errors import StaleSessionError
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    invocation_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+) WITHOUT ROWID;
+"""
+
+SessionKey = tuple[str, str, str]
+
+
+def split_state(state: dict[str, Any]) -> tuple[dict, dict, dict]:
+    """Splits a state dict into (app, user, session) parts; temp: keys are dropped."""
+    app, user, session = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+def merge_state(app: dict, user: dict, session: dict) -> dict[str, Any]:
+    """Builds the state a Session exposes: session keys plus prefixed app/user keys."""
+    merged = copy.deepcopy(session)
+    for key, value in app.items():
+        merged[State.APP_PREFIX + key] = value
+    for key, value in user.items():
+        merged[State.USER_PREFIX + key] = value
+    return merged
+
+
+@dataclass
+class _CachedSession:
+    state: dict
+    events: list[Event]
+    update_time: float
+    stored_update_time: float
+    """update_time as last read from or written to the database."""
+
+
+@dataclass
+class _PendingWrites:
+    events: list[tuple] = field(default_factory=list)
+    sessions: dict[SessionKey, float] = field(default_factory=dict)
+    app_states: dict[str, dict] = field(default_factory=dict)
+    user_states: dict[tuple[str, str], dict] = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.events or self.sessions or self.app_states or self.user_states)
+
+
+class LocalSessionService(BaseSessionService):
+    """Stores sessions, events and app/user state in a local SQLite file."""
+
+    def __init__(self, db_path: str, cache_size: int = 10_000):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._cache: OrderedDict[SessionKey, _CachedSession] = OrderedDict()
+        self._pending = _PendingWrites()
+
+    # --- BaseSessionService API ---
+
+    async def create_session(self, *, app_name: str, user_id: str,
+                             state: Optional[dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        key = (app_name, user_id, session_id)
+        self._commit()
+        if key in self._cache or self._stored_update_time(key) is not None:
+            raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+
+        app_delta, user_delta, session_state = split_state(state or {})
+        now = time.time()
+        self._pending.app_states[app_name] = app_delta
+        self._pending.user_states[(app_name, user_id)] = user_delta
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.execute(
+                "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, json.dumps(session_state, default=str), now, now))
+            self._write_pending()
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+        self._remember(key, _CachedSession(session_state, [], now, now))
+        return self._to_session(key, self._cache[key])
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        cached = self._cached(key)
+        if cached is None:
+            return None
+        return self._to_session(key, cached, config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        self._commit()
+        if user_id is None:
+            rows = self._db.execute(
+                "SELECT user_id, id, state, update_time FROM sessions WHERE app_name=? ORDER BY update_time",
+                (app_name,)).fetchall()
+        else:
+            rows = self._db.execute(
+                "SELECT user_id, id, state, update_time FROM sessions WHERE app_name=? AND user_id=? ORDER BY update_time",
+                (app_name, user_id)).fetchall()
+        app_state = self._read_state("app_states", (app_name,))
+        user_states = {}
+        sessions = []
+        for row_user_id, row_id, state, update_time in rows:
+            if row_user_id not in user_states:
+                user_states[row_user_id] = self._read_state("user_states", (app_name, row_user_id))
+            sessions.append(Session(
+                app_name=app_name, user_id=row_user_id, id=row_id,
+                state=merge_state(app_state, user_states[row_user_id], json.loads(state)),
+                last_update_time=update_time))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._commit()
+        self._db.execute("BEGIN IMMEDIATE")
+        self._db.execute("DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?",
+                         (app_name, user_id, session_id))
+        self._db.execute("DELETE FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+                         (app_name, user_id, session_id))
+        self._db.execute("COMMIT")
+        self._cache.pop((app_name, user_id, session_id), None)
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> dict[str, Any]:
+        self._commit()
+        return self._read_state("user_states", (app_name, user_id))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        self._apply_temp_state(session, event)
+        event = self._trim_temp_delta_state(event)
+
+        key = (session.app_name, session.user_id, session.id)
+        cached = self._cached(key)
+        if cached is None:
+            raise SessionNotFoundError(f"Session {session.id} not found.")
+        if cached.update_time > session.last_update_time:
+            raise StaleSessionError(
+                "The last_update_time provided in the session object is"
+                " earlier than the update_time in storage."
+                " Please check if it is a stale session.")
+
+        if event.actions and event.actions.state_delta:
+            app_delta, user_delta, session_delta = split_state(event.actions.state_delta)
+            cached.state.update(session_delta)
+            if app_delta:
+                self._pending.app_states.setdefault(session.app_name, {}).update(app_delta)
+            if user_delta:
+                self._pending.user_states.setdefault((session.app_name, session.user_id), {}).update(user_delta)
+
+        self._pending.events.append((key, event.invocation_id, event.model_dump_json(exclude_none=True)))
+        cached.events.append(event)
+        cached.update_time = max(event.timestamp, cached.update_time)
+        self._pending.sessions[key] = cached.update_time
+        session.last_update_time = cached.update_time
+        self._commit_event_to_session(session, event)
+
+        # One transaction per turn: everything buffered so far goes to disk
+        # together with the agent's final response.
+        if event.author != "user" and event.is_final_response():
+            self._commit()
+        return event
+
+    async def flush(self) -> None:
+        self._commit()
+
+    def close(self):
+        """Writes pending events and closes the database."""
+        self._commit()
+        self._db.close()
+
+    # --- Internals ---
+
+    def _cached(self, key: SessionKey) -> Optional[_CachedSession]:
+        """Returns the cached session, reloading it if another process changed it."""
+        cached = self._cache.get(key)
+        if cached is not None and key not in self._pending.sessions:
+            stored = self._stored_update_time(key)
+            if stored is None:
+                del self._cache[key]
+                return None
+            if stored > cached.stored_update_time:
+                cached = None
+        if cached is None:
+            cached = self._load(key)
+            if cached is None:
+                return None
+            self._remember(key, cached)
+        else:
+            self._cache.move_to_end(key)
+        return cached
+
+    def _load(self, key: SessionKey) -> Optional[_CachedSession]:
+        self._commit()
+        row = self._db.execute("SELECT state, update_time FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+                               key).fetchone()
+        if row is None:
+            return None
+        events = [Event.model_validate_json(data) for (data,) in self._db.execute(
+            "SELECT data FROM events WHERE app_name=? AND user_id=? AND session_id=? ORDER BY seq", key)]
+        return _CachedSession(json.loads(row[0]), events, row[1], row[1])
+
+    def _remember(self, key: SessionKey, cached: _CachedSession):
+        self._cache[key] = cached
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            if next(iter(self._cache)) in self._pending.sessions:
+                self._commit()
+            self._cache.popitem(last=False)
+
+    def _to_session(self, key: SessionKey, cached: _CachedSession,
+                    config: Optional[GetSessionConfig] = None) -> Session:
+        app_name, user_id, session_id = key
+        app_state = self._read_state("app_states", (app_name,))
+        user_state = self._read_state("user_states", (app_name, user_id))
+        app_state.update(self._pending.app_states.get(app_name, {}))
+        user_state.update(self._pending.user_states.get((app_name, user_id), {}))
+        merged = merge_state(app_state, user_state, cached.state)
+
+        events = cached.events
+        if config and config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+        if config and config.num_recent_events is not None:
+            events = events[-config.num_recent_events:] if config.num_recent_events else []
+        return Session(app_name=app_name, user_id=user_id, id=session_id, state=merged,
+                       events=list(events), last_update_time=cached.update_time)
+
+    def _stored_update_time(self, key: SessionKey) -> Optional[float]:
+        row = self._db.execute("SELECT update_time FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+                               key).fetchone()
+        return row[0] if row else None
+
+    def _read_state(self, table: str, key: tuple) -> dict:
+        where = "app_name=?" if table == "app_states" else "app_name=? AND user_id=?"
+        row = self._db.execute(f"SELECT state FROM {table} WHERE {where}", key).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def _write_pending(self):
+        """Writes buffered rows; the caller owns the transaction."""
+        pending = self._pending
+        self._pending = _PendingWrites()
+        # Numbered inside the write transaction: another process may have
+        # appended to the same session since this one cached it.
+        next_seq: dict[SessionKey, int] = {}
+        rows = []
+        for key, invocation_id, data in pending.events:
+            if key not in next_seq:
+                next_seq[key] = self._db.execute(
+                    "SELECT COALESCE(MAX(seq), -1) + 1 FROM events WHERE app_name=? AND user_id=? AND session_id=?",
+                    key).fetchone()[0]
+            rows.append((*key, next_seq[key], invocation_id, data))
+            next_seq[key] += 1
+        self._db.executemany(
+            "INSERT INTO events (app_name, user_id, session_id, seq, invocation_id, data) VALUES (?, ?, ?, ?, ?, ?)",
+            rows)
+        for key, update_time in pending.sessions.items():
+            cached = self._cache.get(key)
+            if cached is None:
+                continue
+            self._db.execute("UPDATE sessions SET state=?, update_time=? WHERE app_name=? AND user_id=? AND id=?",
+                             (json.dumps(cached.state, default=str), update_time, *key))
+            cached.stored_update_time = update_time
+        # App and user state are shared with other sessions (and processes), so
+        # merge the delta into the stored value inside this transaction.
+        for app_name, delta in pending.app_states.items():
+            if delta:
+                state = self._read_state("app_states", (app_name,))
+                state.update(delta)
+                self._db.execute("INSERT OR REPLACE INTO app_states (app_name, state) VALUES (?, ?)",
+                                 (app_name, json.dumps(state, default=str)))
+        for (app_name, user_id), delta in pending.user_states.items():
+            if delta:
+                state = self._read_state("user_states", (app_name, user_id))
+                state.update(delta)
+                self._db.execute("INSERT OR REPLACE INTO user_states (app_name, user_id, state) VALUES (?, ?, ?)",
+                                 (app_name, user_id, json.dumps(state, default=str)))
+
+    def _commit(self):
+        if not self._pending:
+            return
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._write_pending()
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+
+async def get_or_create_session(session_service: BaseSessionService, app_name: str, user_id: str,
+                                session_id: str, state: Optional[dict[str, Any]] = None) -> Session:
+    """Returns the stored session, creating it with `state` the first time."""
+    session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    if session is None:
+        session = await session_service.create_session(app_name=app_name, user_id=user_id,
+                                                       session_id=session_id, state=state)
+    return session
+
+
+async def update_state(session_service: BaseSessionService, app_name: str, user_id: str,
+                       session_id: str, delta: dict[str, Any]) -> Session:
+    """Applies a state delta outside of a turn by appending a system event.
+
+    This is the supported way to change state between turns: the change is
+    persisted, recorded in the history and visible to the next turn.
+    """
+    session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    if session is None:
+        raise SessionNotFoundError(f"Session {session_id} not found.")
+    event = Event(invocation_id=f"e-{uuid.uuid4()}", author="system",
+                  actions=EventActions(state_delta=dict(delta)), timestamp=time.time())
+    await session_service.append_event(session, event)
+    return session
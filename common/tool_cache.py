@@ -0,0 +1,209 @@
+"""TTL + LRU result cache for idempotent function tools.
+
+    @cached_tool(ttl=300, maxsize=1024)
+    def get_weather(city: str) -> dict:
+        ...
+
+The wrapped function keeps its name, docstring and signature, so ADK builds
+the same tool declaration from it. Calls are keyed on the normalized
+arguments. Strings are compared the way `get_weather` already normalizes
+cities (lower-cased, spaces removed), so "New York" and "newyork" share an
+entry. `tool_context` is never part of the key. Pass `key=` to key on
+something else, e.g. a value read from state. Pass `after=` for the part of
+a result that must always be current: it is applied to every result, cached
+or not, and its output is never stored (`train_schedule.seats_left` takes
+the booked seats off a cached timetable this way).
+
+Concurrent calls with the same key are coalesced (single flight): the first
+caller runs the tool and the others wait for its result. Error results
+({"status": "error", ...}, e.g. an `async_tool` timeout) are passed on to
+the waiting callers but not stored, so the next call tries again. This works both for
+async tools and for sync tools running in ADK's tool thread pool.
+
+Tools with side effects must not be cached. Mark them with `@uncacheable` and
+`cached_tool` refuses to wrap them:
+
+    @uncacheable
+    def book_train(code: str, name: str) -> dict:
+        ...
+"""
+import asyncio
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+IGNORED_PARAMS = ("tool_context",)
+
+
+def uncacheable(func: Callable) -> Callable:
+    """Marks a tool as side-effecting, so it can never be wrapped by `cached_tool`."""
+    func.__uncacheable__ = True
+    return func
+
+
+def normalize_value(value: Any) -> Hashable:
+    if isinstance(value, str):
+        return value.lower().replace(" ", "")
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize_value(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_value(v) for v in value)
+    return value
+
+
+def is_error(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("status") == "error"
+
+
+class _Flight:
+    """A call in progress that other callers with the same key can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.future: Optional[asyncio.Future] = None
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ToolCache:
+    """The storage and counters behind one cached tool."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = 0
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Returns (found, value); the caller must hold the lock."""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def put(self, key: Hashable, value: Any):
+        """Stores a value; the caller must hold the lock."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced,
+                    "size": len(self._data)}
+
+
+def cached_tool(ttl: float = 300, maxsize: int = 1024,
+                key: Optional[Callable[[dict], Hashable]] = None,
+                after: Optional[Callable[[Any], Any]] = None):
+    """Decorator that caches a pure lookup tool's results for `ttl` seconds.
+
+    `key` receives the bound arguments as a dict (including `tool_context`
+    when the tool takes one) and returns a hashable cache key. `after`
+    receives each result on its way out of the cache and returns what the
+    caller gets.
+    """
+    def decorator(func: Callable) -> Callable:
+        if getattr(func, "__uncacheable__", False):
+            raise TypeError(f"{func.__name__} has side effects and must not be cached.")
+        signature = inspect.signature(func)
+        cache = ToolCache(ttl, maxsize)
+        fresh = after or (lambda value: value)
+
+        def make_key(args, kwargs) -> Hashable:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if key is not None:
+                return key(bound.arguments)
+            return tuple((name, normalize_value(value)) for name, value in bound.arguments.items()
+                         if name not in IGNORED_PARAMS)
+
+        def claim(cache_key) -> tuple[bool, Any, Optional[_Flight], bool]:
+            """Returns (hit, value, flight, leader) for this key."""
+            with cache._lock:
+                found, value = cache.get(cache_key)
+                if found:
+                    cache.hits += 1
+                    return True, value, None, False
+                flight = cache._flights.get(cache_key)
+                if flight is not None:
+                    cache.coalesced += 1
+                    return False, None, flight, False
+                cache.misses += 1
+                flight = cache._flights[cache_key] = _Flight()
+                return False, None, flight, True
+
+        def finish(cache_key, flight: _Flight):
+            with cache._lock:
+                if flight.error is None and not is_error(flight.value):
+                    cache.put(cache_key, flight.value)
+                del cache._flights[cache_key]
+            flight.done.set()
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = make_key(args, kwargs)
+                hit, value, flight, leader = claim(cache_key)
+                if hit:
+                    return fresh(value)
+                if not leader:
+                    await asyncio.shield(flight.future)
+                    return fresh(flight.value)
+                flight.future = asyncio.get_running_loop().create_future()
+                try:
+                    flight.value = await func(*args, **kwargs)
+                    return fresh(flight.value)
+                except BaseException as e:
+                    flight.error = e
+                    raise
+                finally:
+                    finish(cache_key, flight)
+                    if flight.error is None:
+                        flight.future.set_result(None)
+                    else:
+                        flight.future.set_exception(flight.error)
+                        flight.future.exception()  # Mark retrieved; followers re-raise it.
+
+            async_wrapper.cache = cache
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = make_key(args, kwargs)
+            hit, value, flight, leader = claim(cache_key)
+            if hit:
+                return fresh(value)
+            if not leader:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                return fresh(flight.value)
+            try:
+                flight.value = func(*args, **kwargs)
+                return fresh(flight.value)
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                finish(cache_key, flight)
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
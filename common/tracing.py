@@ -0,0 +1,393 @@
+"""Per-turn spans for model calls, tool calls, callbacks and session reads/writes.
+
+`Tracer` hooks into a Runner and records one span per step, grouped into one
+trace per invocation:
+
+    invocation
+      agent travel_agent_team
+        callback before_model_callback route_request
+        call_llm gemini-2.5-flash
+      agent train_agent
+        call_llm gemini-2.5-flash
+        execute_tool search_train
+      session append_event        (one per event written)
+
+Model, tool and agent spans come from an ADK plugin. The agents' own
+callbacks (routers, caches, guardrails) are wrapped to time them, and so are
+the session service's get/create/append methods.
+
+Spans go into a `SpanBuffer`: a bounded in-process ring buffer keeping the
+newest spans. Recording a span is a couple of clock reads and a deque append,
+with no I/O and no lock. `OtlpJsonExporter` writes them out on `flush`, as
+OTLP/JSON lines (one ExportTraceServiceRequest per line, the format of the
+OpenTelemetry collector's file exporter). Any OTLP tool can read them.
+
+    tracer = Tracer(exporter=OtlpJsonExporter("traces"))
+    runner = Runner(agent=root_agent, app_name="app", session_service=session_service)
+    tracer.instrument(runner)
+    ...
+    print(tracer.buffer.summary())   # count / p50 / p95 per span name
+    tracer.flush()                   # appends to traces/traces-<pid>.jsonl
+
+`instrument_from_env(runner)` does the same when TRACE_DIR is set (and
+nothing otherwise), flushing at exit. The workshop agents' main() call it.
+"""
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_FIELDS = ("before_agent_callback", "after_agent_callback", "before_model_callback",
+                   "after_model_callback", "before_tool_callback", "after_tool_callback")
+SESSION_METHODS = ("get_session", "create_session", "append_event")
+MAX_OPEN_SPANS = 4096
+
+# OTLP span kinds and status codes.
+KIND_INTERNAL, KIND_CLIENT = 1, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    kind: int = KIND_INTERNAL
+    invocation_id: Optional[str] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    seq: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_otlp(self) -> dict:
+        span = {"traceId": self.trace_id, "spanId": self.span_id, "name": self.name, "kind": self.kind,
+                "startTimeUnixNano": str(self.start_ns), "endTimeUnixNano": str(self.end_ns),
+                "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+                "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK}}
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class SpanBuffer:
+    """The newest `capacity` finished spans; older ones are dropped (and counted)."""
+
+    def __init__(self, capacity: int = 10_000):
+        self._spans: deque[Span] = deque(maxlen=capacity)
+        self._seq = 0
+        self.dropped = 0
+
+    def add(self, span: Span):
+        self._seq += 1
+        span.seq = self._seq
+        if len(self._spans) == self._spans.maxlen:
+            self.dropped += 1
+        self._spans.append(span)
+
+    def spans(self, invocation_id: Optional[str] = None, after_seq: int = 0) -> list[Span]:
+        return [span for span in list(self._spans) if span.seq > after_seq
+                and (invocation_id is None or span.invocation_id == invocation_id)]
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def summary(self) -> dict[str, dict]:
+        """Count, total, p50 and p95 seconds per span name (without its detail, e.g. the tool name)."""
+        by_name: dict[str, list[float]] = {}
+        for span in list(self._spans):
+            by_name.setdefault(span.name.split(" ")[0], []).append(span.seconds)
+        summary = {}
+        for name, seconds in sorted(by_name.items()):
+            seconds.sort()
+            summary[name] = {"count": len(seconds), "total": sum(seconds),
+                             "p50": seconds[len(seconds) // 2], "p95": seconds[min(len(seconds) - 1,
+                                                                                 int(0.95 * len(seconds)))]}
+        return summary
+
+
+class OtlpJsonExporter:
+    """Appends spans to `directory`/traces-<pid>.jsonl as OTLP/JSON export requests."""
+
+    def __init__(self, directory: str, service_name: str = "adk-workshop"):
+        self.directory = directory
+        self.service_name = service_name
+        self.path = os.path.join(directory, f"traces-{os.getpid()}.jsonl")
+
+    def export(self, spans: list[Span]) -> int:
+        if not spans:
+            return 0
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in spans]}],
+        }]}
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request, ensure_ascii=False, separators=(",", ":")) + "\n")
+        return len(spans)
+
+
+class Tracer(BasePlugin):
+    """ADK plugin recording spans per invocation into a `SpanBuffer`."""
+
+    def __init__(self, buffer: Optional[SpanBuffer] = None, exporter: Optional[OtlpJsonExporter] = None):
+        super().__init__(name="tracer")
+        self.buffer = buffer or SpanBuffer()
+        self.exporter = exporter
+        self._open: dict[tuple, Span] = {}
+        self._traces: dict[str, str] = {}  # invocation_id -> trace_id
+        self._exported_seq = 0
+        self._flush_lock = threading.Lock()
+
+    # --- spans ---
+
+    def start(self, name: str, invocation_id: Optional[str] = None, parent: Optional[Span] = None,
+              kind: int = KIND_INTERNAL, **attributes) -> Span:
+        trace_id = parent.trace_id if parent else self._traces.get(invocation_id) or _new_id(128)
+        return Span(name, trace_id, _new_id(64), parent.span_id if parent else None, time.time_ns(),
+                    kind=kind, invocation_id=invocation_id, attributes=attributes)
+
+    def end(self, span: Optional[Span], error: Optional[BaseException] = None):
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = repr(error)
+        self.buffer.add(span)
+
+    def _open_span(self, key: tuple, span: Span):
+        self._open[key] = span
+        if len(self._open) > MAX_OPEN_SPANS:  # Spans whose end never came (e.g. cancelled turns).
+            self._open.pop(next(iter(self._open)))
+
+    def _parent(self, invocation_id: str, agent_name: Optional[str] = None) -> Optional[Span]:
+        return (agent_name and self._open.get(("agent", invocation_id, agent_name))) \
+            or self._open.get(("invocation", invocation_id))
+
+    # --- plugin callbacks ---
+
+    async def before_run_callback(self, *, invocation_context):
+        invocation_id = invocation_context.invocation_id
+        span = self.start("invocation", invocation_id, app=invocation_context.app_name,
+                          user_id=invocation_context.user_id, session_id=invocation_context.session.id)
+        self._traces[invocation_id] = span.trace_id
+        self._open_span(("invocation", invocation_id), span)
+
+    async def after_run_callback(self, *, invocation_context):
+        invocation_id = invocation_context.invocation_id
+        self.end(self._open.pop(("invocation", invocation_id), None))
+        self._traces.pop(invocation_id, None)
+        self._close_all(invocation_id)
+
+    async def on_run_error_callback(self, *, invocation_context, error):
+        invocation_id = invocation_context.invocation_id
+        self.end(self._open.pop(("invocation", invocation_id), None), error=error)
+        self._traces.pop(invocation_id, None)
+        self._close_all(invocation_id)
+
+    def _close_all(self, invocation_id: str):
+        for key in [key for key in self._open if key[1] == invocation_id]:
+            span = self._open.pop(key)
+            if key[0] != "model":
+                span.attributes["completed"] = False
+                self.end(span)
+
+    async def before_agent_callback(self, *, agent, callback_context):
+        invocation_id = callback_context.invocation_id
+        parent = self._parent(invocation_id, agent.parent_agent.name if agent.parent_agent else None)
+        self._open_span(("agent", invocation_id, agent.name),
+                        self.start(f"agent {agent.name}", invocation_id, parent, agent=agent.name))
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        invocation_id = callback_context.invocation_id
+        # A model span still open here never reached the model: a before_model callback answered instead.
+        self._open.pop(("model", invocation_id, agent.name), None)
+        self.end(self._open.pop(("agent", invocation_id, agent.name), None))
+
+    async def on_agent_error_callback(self, *, agent, callback_context, error):
+        self.end(self._open.pop(("agent", callback_context.invocation_id, agent.name), None), error=error)
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        invocation_id = callback_context.invocation_id
+        span = self.start(f"call_llm {llm_request.model or ''}".rstrip(), invocation_id,
+                          self._parent(invocation_id, callback_context.agent_name), KIND_CLIENT,
+                          agent=callback_context.agent_name, contents=len(llm_request.contents or ()))
+        self._open_span(("model", invocation_id, callback_context.agent_name), span)
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        span = self._open.pop(("model", callback_context.invocation_id, callback_context.agent_name), None)
+        if span is not None and llm_response.usage_metadata:
+            span.attributes["input_tokens"] = llm_response.usage_metadata.prompt_token_count or 0
+            span.attributes["output_tokens"] = llm_response.usage_metadata.candidates_token_count or 0
+        self.end(span)
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        self.end(self._open.pop(("model", callback_context.invocation_id, callback_context.agent_name), None),
+                 error=error)
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        invocation_id = tool_context.invocation_id
+        span = self.start(f"execute_tool {tool.name}", invocation_id,
+                          self._parent(invocation_id, tool_context.agent_name), tool=tool.name)
+        self._open_span(("tool", invocation_id, tool_context.function_call_id), span)
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        span = self._open.pop(("tool", tool_context.invocation_id, tool_context.function_call_id), None)
+        if span is not None and isinstance(result, dict) and "status" in result:
+            span.attributes["status"] = str(result["status"])
+        self.end(span)
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        self.end(self._open.pop(("tool", tool_context.invocation_id, tool_context.function_call_id), None),
+                 error=error)
+        return None
+
+    # --- instrumentation ---
+
+    def instrument(self, runner) -> "Tracer":
+        """Adds this tracer to `runner`: as a plugin, around the session service and the agents' callbacks."""
+        runner.plugin_manager.register_plugin(self)
+        self.instrument_session_service(runner.session_service)
+        self.instrument_agent(runner.agent)
+        return self
+
+    def instrument_agent(self, agent):
+        """Wraps every callback in the agent tree so each call is recorded as a span."""
+        for name in CALLBACK_FIELDS:
+            callbacks = getattr(agent, name, None)
+            if isinstance(callbacks, list):
+                setattr(agent, name, [self._traced_callback(name, callback) for callback in callbacks])
+            elif callbacks is not None:
+                setattr(agent, name, self._traced_callback(name, callbacks))
+        for sub_agent in agent.sub_agents:
+            self.instrument_agent(sub_agent)
+
+    def _traced_callback(self, kind: str, callback):
+        if getattr(callback, "__traced__", False):
+            return callback
+        label = getattr(callback, "__name__", None) or type(callback).__name__
+        name = f"callback {kind} {label}"
+
+        @functools.wraps(callback, updated=())  # Keeps the signature ADK binds the arguments to.
+        def traced(*args, **kwargs):
+            context = next((value for value in (*args, *kwargs.values()) if hasattr(value, "invocation_id")), None)
+            invocation_id = getattr(context, "invocation_id", None)
+            span = self.start(name, invocation_id, self._parent(invocation_id, getattr(context, "agent_name", None)))
+            try:
+                result = callback(*args, **kwargs)
+            except BaseException as e:
+                self.end(span, error=e)
+                raise
+            if not inspect.isawaitable(result):
+                self.end(span)
+                return result
+            return self._finish_async(span, result)
+
+        traced.__traced__ = True
+        return traced
+
+    async def _finish_async(self, span: Span, awaitable):
+        try:
+            result = await awaitable
+        except BaseException as e:
+            self.end(span, error=e)
+            raise
+        self.end(span)
+        return result
+
+    def instrument_session_service(self, service):
+        """Wraps the session service's reads and writes (on this instance only)."""
+        for method in SESSION_METHODS:
+            original = getattr(service, method)
+            if getattr(original, "__traced__", False):
+                continue
+            setattr(service, method, self._traced_session_method(method, original))
+
+    def _traced_session_method(self, method: str, original):
+        @functools.wraps(original)
+        async def traced(*args, **kwargs):
+            event = kwargs.get("event") or (args[1] if method == "append_event" and len(args) > 1 else None)
+            invocation_id = getattr(event, "invocation_id", None)
+            span = self.start(f"session {method}", invocation_id, self._parent(invocation_id),
+                              backend=type(getattr(original, "__self__", None)).__name__)
+            try:
+                result = await original(*args, **kwargs)
+            except BaseException as e:
+                self.end(span, error=e)
+                raise
+            self.end(span)
+            return result
+
+        traced.__traced__ = True
+        return traced
+
+    # --- export ---
+
+    def flush(self) -> int:
+        """Exports the spans recorded since the last flush; returns how many."""
+        if self.exporter is None:
+            return 0
+        with self._flush_lock:
+            spans = self.buffer.spans(after_seq=self._exported_seq)
+            self._exported_seq = self.buffer.last_seq
+            return self.exporter.export(spans)
+
+
+def instrument_from_env(runner, service_name: Optional[str] = None) -> Optional[Tracer]:
+    """Traces `runner` into $TRACE_DIR when that is set; returns the tracer, or None."""
+    directory = os.environ.get("TRACE_DIR")
+    if not directory:
+        return None
+    tracer = Tracer(exporter=OtlpJsonExporter(directory, service_name or runner.app_name)).instrument(runner)
+    atexit.register(tracer.flush)
+    logger.info("Tracing %s into %s", runner.app_name, tracer.exporter.path)
+    return tracer
+
+
+def format_summary(summary: dict[str, dict], names: Iterable[str] = ()) -> str:
+    """The `SpanBuffer.summary` as aligned text lines."""
+    lines = [f"{'span':<12} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'total s':>8}"]
+    for name, row in summary.items():
+        if names and name not in names:
+            continue
+        lines.append(f"{name:<12} {row['count']:>7} {row['p50'] * 1000:>8.2f} {row['p95'] * 1000:>8.2f} "
+                     f"{row['total']:>8.2f}")
+    return "\n".join(lines)
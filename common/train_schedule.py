@@ -0,0 +1,249 @@
+"""Train timetable loaded once and indexed for search_train.
+
+The data is GTFS-like, in two CSV files (defaults in common/data, overridable
+with TRAIN_STATIONS_PATH and TRAIN_TRIPS_PATH):
+
+- stations: code, name, city, aliases (separated by "|");
+- trips: train, origin, dest (station codes), departure, arrival (HH:MM),
+  price, seats, service_days (seven 0/1 flags, Monday first),
+  start_date, end_date (ISO dates).
+
+Trips are indexed by (origin station, destination station, weekday,
+day_part), each bucket sorted by departure. A search resolves the places to
+station codes with `places.PlaceResolver` (code, station name, city, alias,
+prefix or typo: "Jakarta" covers Gambir and Pasar Senen), reads the few
+matching buckets, and then checks the service dates and free seats. It
+never scans the whole timetable.
+
+    schedule = train_schedule.load()
+    schedule.search("Jakarta", "Jogja", "2025-12-10", day_part="pagi", pax=2)
+
+The `seats` column is a trip's capacity. The module-level `search` and
+`book` take the seats already booked in the `booking_ledger` into account.
+`search` is `timetable` (every match at full capacity, which only changes
+with the files) followed by `seats_left` (the ledger, read on every call),
+so a tool can cache the first half and still show current seats:
+
+    @cached_tool(ttl=60, after=train_schedule.seats_left)
+    def search_train(origin: str, dest: str, date: str, day_part: str, pax: int) -> dict:
+        return train_schedule.timetable(origin, dest, date, day_part, pax)
+"""
+import csv
+import datetime
+import functools
+import os
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable, Optional, Union
+
+from common import booking_ledger
+from common.places import (DEFAULT_PLACES_PATH, MIN_CONFIDENCE, PlaceMatch, PlaceResolver,
+                           read_places)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_STATIONS_PATH = os.path.join(DATA_DIR, "train_stations.csv")
+DEFAULT_TRIPS_PATH = os.path.join(DATA_DIR, "train_trips.csv")
+
+# Departure hour ranges, end exclusive. "malam" wraps past midnight.
+DAY_PARTS = {"pagi": (4, 11), "siang": (11, 15), "sore": (15, 18), "malam": (18, 28)}
+DAY_PART_ALIASES = {"morning": "pagi", "afternoon": "siang", "evening": "sore", "night": "malam"}
+
+
+def day_part_of(minutes: int) -> str:
+    hour = minutes // 60
+    if hour < 4:
+        hour += 24
+    for part, (start, end) in DAY_PARTS.items():
+        if start <= hour < end:
+            return part
+    raise ValueError(f"No day part for {minutes} minutes.")
+
+
+def parse_time(text: str) -> int:
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def format_time(minutes: int) -> str:
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+@dataclass(frozen=True)
+class Station:
+    code: str
+    name: str
+    city: str
+
+
+@dataclass(frozen=True)
+class Trip:
+    train: str
+    origin: str
+    dest: str
+    departure: int
+    """Minutes after midnight."""
+    arrival: int
+    price: int
+    seats: int
+    start: int
+    """First and last service dates, as date ordinals."""
+    end: int
+
+    def as_dict(self, stations: dict[str, Station]) -> dict:
+        return {"code": self.train,
+                "origin": stations[self.origin].name, "destination": stations[self.dest].name,
+                "departure": format_time(self.departure), "arrival": format_time(self.arrival),
+                "price": self.price, "seats_left": self.seats}
+
+
+class TrainSchedule:
+    """Trips indexed by (origin, destination, weekday, day part)."""
+
+    def __init__(self, stations: list[Station], aliases: list[tuple[str, str]], trips: list[tuple[Trip, str]],
+                 places: Iterable[tuple[str, str, Iterable[str]]] = ()):
+        self.stations = {station.code: station for station in stations}
+        self.places = PlaceResolver.from_stations(stations, aliases, places)
+        self.trips = {trip.train: (trip, service_days) for trip, service_days in trips}
+
+        self._index: dict[tuple[str, str, int, str], list[Trip]] = {}
+        for trip, service_days in trips:
+            part = day_part_of(trip.departure)
+            for weekday, runs in enumerate(service_days):
+                if runs == "1":
+                    self._index.setdefault((trip.origin, trip.dest, weekday, part), []).append(trip)
+        for bucket in self._index.values():
+            bucket.sort(key=lambda trip: (trip.departure - 240) % 1440)  # Day starts at 04:00.
+        self.trip_count = len(trips)
+
+    @classmethod
+    def from_csv(cls, stations_path: str, trips_path: str, places_path: str = "") -> "TrainSchedule":
+        stations, aliases = [], []
+        with open(stations_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                stations.append(Station(row["code"], row["name"], row["city"]))
+                for alias in filter(None, (row.get("aliases") or "").split("|")):
+                    aliases.append((alias, row["code"]))
+        trips = []
+        with open(trips_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                trip = Trip(row["train"], row["origin"], row["dest"],
+                            parse_time(row["departure"]), parse_time(row["arrival"]),
+                            int(row["price"]), int(row["seats"]),
+                            datetime.date.fromisoformat(row["start_date"]).toordinal(),
+                            datetime.date.fromisoformat(row["end_date"]).toordinal())
+                trips.append((trip, row["service_days"]))
+        return cls(stations, aliases, trips, read_places(places_path) if places_path else ())
+
+    def resolve(self, place: str) -> list[str]:
+        """Station codes for a confidently resolved place, else an empty list."""
+        match = self.places.resolve(place)
+        return list(match.place.codes) if match and match.confidence >= MIN_CONFIDENCE else []
+
+    def _stations_for(self, text: str) -> Union[PlaceMatch, str]:
+        """The match for `text` if it has stations, else an error message."""
+        match = self.places.resolve(text)
+        if match is None or match.confidence < MIN_CONFIDENCE:
+            suggestions = self.places.suggestions(text)
+            hint = f" Did you mean {' or '.join(suggestions)}?" if suggestions else ""
+            return f"Unknown station or city '{text}'.{hint}"
+        if not match.place.codes:
+            return f"There is no train station in {match.place.name}."
+        return match
+
+    def search(self, origin: str, dest: str, date: str, day_part: str = "", pax: int = 1,
+               limit: Optional[int] = 5, seats_taken: Optional[Callable[[str, str], int]] = None) -> dict:
+        """Trains from `origin` to `dest` on `date` with at least `pax` free seats.
+
+        `seats_taken(train, date)` gives the seats already booked, if known.
+        Returns a tool result: {"status": "success", "trains": [...]} sorted
+        by departure, or {"status": "error", "error_message": ...}.
+        """
+        matches = [self._stations_for(origin), self._stations_for(dest)]
+        for match in matches:
+            if isinstance(match, str):
+                return {"status": "error", "error_message": match}
+        origins, dests = (match.place.codes for match in matches)
+        try:
+            day = datetime.date.fromisoformat(date)
+        except (TypeError, ValueError):
+            return {"status": "error", "error_message": f"Invalid date '{date}', expected YYYY-MM-DD."}
+        part = DAY_PART_ALIASES.get((day_part or "").lower(), (day_part or "").lower())
+        if part and part not in DAY_PARTS:
+            return {"status": "error",
+                    "error_message": f"Unknown day_part '{day_part}', expected one of {', '.join(DAY_PARTS)}."}
+
+        ordinal, weekday = day.toordinal(), day.weekday()
+        parts = [part] if part else list(DAY_PARTS)
+        found = [trip
+                 for origin_code in origins for dest_code in dests for name in parts
+                 for trip in self._index.get((origin_code, dest_code, weekday, name), ())
+                 if trip.start <= ordinal <= trip.end and trip.seats >= pax]
+        if seats_taken is not None:
+            found = [replace(trip, seats=trip.seats - seats_taken(trip.train, date)) for trip in found]
+            found = [trip for trip in found if trip.seats >= pax]
+        if len(origins) > 1 or len(dests) > 1 or len(parts) > 1:
+            found.sort(key=lambda trip: (trip.departure - 240) % 1440)
+        result = {"status": "success", "date": date, "pax": pax, "total_matches": len(found),
+                  "trains": [trip.as_dict(self.stations) for trip in found[:limit]]}
+        # Tell the model what a non-literal name was taken to mean.
+        guessed = [match.as_dict() for match in matches if match.method != "exact"]
+        if guessed:
+            result["resolved_places"] = guessed
+        return result
+
+
+@functools.lru_cache(maxsize=1)
+def load() -> TrainSchedule:
+    """Returns the shared timetable, reading the files on first use only."""
+    return TrainSchedule.from_csv(os.environ.get("TRAIN_STATIONS_PATH", DEFAULT_STATIONS_PATH),
+                                  os.environ.get("TRAIN_TRIPS_PATH", DEFAULT_TRIPS_PATH),
+                                  os.environ.get("PLACES_PATH", DEFAULT_PLACES_PATH))
+
+
+def seats_booked(train: str, date: str) -> int:
+    return booking_ledger.default().reserved(f"train:{train}", date)
+
+
+def search(origin: str, dest: str, date: str, day_part: str = "", pax: int = 1, limit: int = 5) -> dict:
+    return seats_left(timetable(origin, dest, date, day_part, pax), limit)
+
+
+def timetable(origin: str, dest: str, date: str, day_part: str = "", pax: int = 1) -> dict:
+    """Every train of a search at full capacity, ignoring bookings, so the result can be cached."""
+    return load().search(origin, dest, date, day_part, pax, limit=None)
+
+
+def seats_left(result: dict, limit: int = 5) -> dict:
+    """A `timetable` result with the booked seats taken off and the first `limit` trains kept."""
+    if result.get("status") != "success":
+        return result
+    trains = []
+    for train in result["trains"]:
+        left = train["seats_left"] - seats_booked(train["code"], result["date"])
+        if left >= result["pax"]:
+            trains.append({**train, "seats_left": left})
+    return {**result, "total_matches": len(trains), "trains": trains[:limit]}
+
+
+def book(code: str, name: str, date: str, pax: int, key: str) -> dict:
+    """Books `pax` seats on train `code` for `date` in the booking ledger; returns a tool result.
+
+    `key` makes the call idempotent: a retry with the same key returns the
+    same booking.
+    """
+    entry = load().trips.get(code)
+    if entry is None:
+        return {"status": "error", "error_message": f"Unknown train '{code}'."}
+    trip, service_days = entry
+    try:
+        day = datetime.date.fromisoformat(date)
+    except (TypeError, ValueError):
+        return {"status": "error", "error_message": f"Invalid date '{date}', expected YYYY-MM-DD."}
+    if service_days[day.weekday()] != "1" or not trip.start <= day.toordinal() <= trip.end:
+        return {"status": "error", "error_message": f"{code} does not run on {date}."}
+    try:
+        booking = booking_ledger.default().reserve(f"train:{code}", [date], pax, name, key, trip.seats,
+                                                   confirmed=True)
+    except booking_ledger.BookingError as e:
+        return {"status": "error", "error_message": str(e)}
+    return {**booking.as_dict(), "code": code, "departure": format_time(trip.departure),
+            "payment_link": f"http://sample.bayar.id/{booking.code}"}
@@ -0,0 +1,134 @@
+"""City weather dataset, loaded once and indexed for O(1) lookups.
+
+The data comes from a CSV file with the columns name, aliases (separated by
+"|"), temp_c and condition. The default file is common/data/cities.csv;
+set WEATHER_DATA_PATH to use a bigger one. Names and aliases are indexed by
+their normalized form (lower-cased, spaces and punctuation removed, the same
+idea as `get_weather`'s `city.lower().replace(" ", "")`), so "New York",
+"new-york" and "NYC" all hit the same entry.
+
+A miss falls back to a fuzzy match: first without a trailing "city"/"kota",
+then a close-match search. The search only looks at names with the same
+first letter and a similar length (anything else cannot reach the cutoff
+anyway), so it stays cheap with tens of thousands of cities. Fuzzy results
+are memoized.
+
+`lookup_many` resolves a whole batch at once and converts the temperatures
+with one NumPy operation, for multi-city questions.
+"""
+import csv
+import difflib
+import functools
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "data", "cities.csv")
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+_SUFFIXES = ("city", "kota")
+FUZZY_CUTOFF = 0.85
+
+
+@dataclass(frozen=True)
+class CityWeather:
+    name: str
+    temp_c: float
+    condition: str
+
+
+def normalize_city(text: str) -> str:
+    return _NON_ALNUM.sub("", text.lower())
+
+
+class WeatherData:
+    """An in-memory index of city weather by normalized name and alias."""
+
+    def __init__(self, cities: list[CityWeather], aliases: dict[str, str]):
+        self._index: dict[str, CityWeather] = {}
+        for city in cities:
+            self._index[normalize_city(city.name)] = city
+        for alias, name in aliases.items():
+            city = self._index.get(normalize_city(name))
+            if city is not None:
+                self._index.setdefault(normalize_city(alias), city)
+        self._buckets: dict[tuple[str, int], list[str]] = {}
+        for key in self._index:
+            self._buckets.setdefault((key[:1], len(key)), []).append(key)
+        self.lookup_fuzzy = functools.lru_cache(maxsize=4096)(self._lookup_fuzzy)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "WeatherData":
+        cities, aliases = [], {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                cities.append(CityWeather(row["name"], float(row["temp_c"]), row["condition"]))
+                for alias in filter(None, (row.get("aliases") or "").split("|")):
+                    aliases[alias] = row["name"]
+        return cls(cities, aliases)
+
+    def __len__(self):
+        return len(self._index)
+
+    def lookup(self, city: str) -> Optional[CityWeather]:
+        """Exact (normalized) match first, fuzzy match second."""
+        key = normalize_city(city)
+        found = self._index.get(key)
+        if found is None and key:
+            found = self.lookup_fuzzy(key)
+        return found
+
+    def _lookup_fuzzy(self, key: str) -> Optional[CityWeather]:
+        for suffix in _SUFFIXES:
+            if key.endswith(suffix) and key[:-len(suffix)] in self._index:
+                return self._index[key[:-len(suffix)]]
+        # A ratio of FUZZY_CUTOFF or more needs the lengths to be within this factor.
+        spread = int(len(key) * (1 - FUZZY_CUTOFF) / FUZZY_CUTOFF) + 1
+        candidates = [name for length in range(len(key) - spread, len(key) + spread + 1)
+                      for name in self._buckets.get((key[:1], length), ())]
+        close = difflib.get_close_matches(key, candidates, n=1, cutoff=FUZZY_CUTOFF)
+        return self._index[close[0]] if close else None
+
+
+@functools.lru_cache(maxsize=1)
+def load(path: Optional[str] = None) -> WeatherData:
+    """Returns the shared dataset, reading the file on first use only."""
+    return WeatherData.from_csv(path or os.environ.get("WEATHER_DATA_PATH", DEFAULT_PATH))
+
+
+def lookup(city: str) -> Optional[CityWeather]:
+    return load().lookup(city)
+
+
+def convert_temps(temps_c: np.ndarray, unit: str) -> np.ndarray:
+    """Converts a batch of Celsius temperatures to `unit` ("Celsius" or "Fahrenheit")."""
+    if unit == "Fahrenheit":
+        return temps_c * 9 / 5 + 32
+    return temps_c
+
+
+def lookup_many(cities: list[str], unit: str = "Celsius") -> dict:
+    """Resolves a batch of cities as one compact table in the requested unit.
+
+    Returns {"unit", "columns", "rows", "not_found"}. Each row is
+    [city, temperature, condition]. Cities resolving to the same entry are
+    listed once.
+    """
+    data = load()
+    found: dict[str, CityWeather] = {}
+    not_found = []
+    for city in cities:
+        city_weather = data.lookup(city)
+        if city_weather is None:
+            not_found.append(city)
+        else:
+            found.setdefault(city_weather.name, city_weather)
+    temps = np.rint(convert_temps(np.fromiter((c.temp_c for c in found.values()), dtype=float,
+                                              count=len(found)), unit)).astype(int)
+    rows = [[c.name, temp, c.condition] for c, temp in zip(found.values(), temps.tolist())]
+    return {"unit": "°F" if unit == "Fahrenheit" else "°C",
+            "columns": ["city", "temperature", "condition"],
+            "rows": rows, "not_found": not_found}
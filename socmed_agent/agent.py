@@ -1,37 +1,72 @@
-import json
 import os
 import asyncio
 import logging
 from google.adk.agents.llm_agent import Agent
+from typing import AsyncGenerator
 try:
-    from google.adk.agents import SequentialAgent
+    from google.adk.agents import BaseAgent, ParallelAgent, SequentialAgent
 except ImportError:
     try:
+        from google.adk.agents.base_agent import BaseAgent
+        from google.adk.agents.parallel_agent import ParallelAgent
         from google.adk.agents.sequential_agent import SequentialAgent
     except ImportError:
-        print("Could not import SequentialAgent. Please check the library version.")
+        print("Could not import SequentialAgent/ParallelAgent. Please check the library version.")
         raise
-from google.adk.sessions import InMemorySessionService
-from google.adk.runners import Runner
-from google.genai import types
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from common.posts import PostStore
 
-logging.basicConfig(level=logging.ERROR)
+# LOG_LEVEL=DEBUG shows each tool call
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "ERROR").upper())
+logger = logging.getLogger(__name__)
 
 # Ensure environment variables are set (assuming they are already set in the environment or .env)
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "1"
 os.environ["GOOGLE_CLOUD_PROJECT"] = "workshop-adk-bali"
 os.environ["GOOGLE_CLOUD_LOCATION"] = "us-central1"
 
-def read_posts() -> str:
-    """Reads social media posts from the JSON file."""
-    print("--- Tool: read_posts called ---")
-    file_path = os.path.join(os.path.dirname(__file__), 'posts.json')
+SESSION_DB = os.path.join(os.path.dirname(__file__), "sessions.db")
+
+POSTS_PATH = os.environ.get("SOCMED_POSTS_PATH", os.path.join(os.path.dirname(__file__), "posts.json"))
+post_store = PostStore(POSTS_PATH)
+
+
+def read_posts(influencer: str = "", hashtag: str = "", since: str = "", until: str = "",
+               sort_by: str = "likes", limit: int = 20) -> dict:
+    """Reads social media posts, optionally filtered.
+
+    Args:
+        influencer: Only posts by this influencer.
+        hashtag: Only posts with this hashtag (with or without '#').
+        since: Only posts on or after this date (YYYY-MM-DD).
+        until: Only posts on or before this date (YYYY-MM-DD).
+        sort_by: 'likes', 'shares' or 'date' (newest first).
+        limit: Maximum number of posts to return.
+    """
+    logger.debug("read_posts called (influencer=%r, hashtag=%r, since=%r, until=%r, sort_by=%r, limit=%d)",
+                 influencer, hashtag, since, until, sort_by, limit)
+    try:
+        total, posts = post_store.query(influencer, hashtag, since, until, sort_by, min(limit, 100))
+    except FileNotFoundError:
+        return {"status": "error", "error_message": f"{os.path.basename(POSTS_PATH)} file not found."}
+    except ValueError as e:
+        return {"status": "error", "error_message": str(e)}
+    return {"status": "success", "total_matches": total, "returned": len(posts), "posts": posts}
+
+
+def post_stats(top_n: int = 10) -> dict:
+    """Returns engagement statistics for all posts: totals, top hashtags, top influencers and outlier posts.
+
+    Args:
+        top_n: How many hashtags, influencers and outliers to list.
+    """
+    logger.debug("post_stats called (top_n=%d)", top_n)
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return json.dumps(data, indent=2)
+        stats = post_store.analytics().summary(top_n=min(top_n, 50))
     except FileNotFoundError:
-        return "Error: posts.json file not found."
+        return {"status": "error", "error_message": f"{os.path.basename(POSTS_PATH)} file not found."}
+    return {"status": "success", **stats}
 
 # --- Agents ---
 
@@ -40,8 +75,8 @@ summarization_agent = Agent(
     name="summarization_agent",
     model="gemini-2.5-flash",
     description="Summarizes social media posts.",
-    instruction="You are a social media analyst. Your goal is to read the posts using 'read_posts' tool and provide a comprehensive summary of the content, identifying key themes and trends.",
-    tools=[read_posts],
+    instruction="You are a social media analyst. Your goal is to call the 'post_stats' tool first (precomputed totals, top hashtags, influencer engagement and outlier posts), then use the 'read_posts' tool only for a few posts worth quoting (it can filter by influencer, hashtag or date range and sort by likes, shares or date), and provide a comprehensive summary of the content, identifying key themes and trends.",
+    tools=[post_stats, read_posts],
     output_key="summary"
 )
 
@@ -65,38 +100,98 @@ publisher_agent = Agent(
 )
 
 # --- Sequential Agent ---
-root_agent = SequentialAgent(
+sequential_agent = SequentialAgent(
     name="socmed_root_agent",
     description="Sequential agent for social media workflow.",
-    # TODO sub_agents=[...]
+    sub_agents=[summarization_agent, creation_agent, publisher_agent]
 )
 
-# --- Execution Helper ---
-async def call_agent_async(query: str, runner, user_id, session_id):
-    """Sends a query to the agent and prints the final response."""
-    content = types.Content(role='user', parts=[types.Part(text=query)])
-
-    final_response_text = ""
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        print(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {event.content}")
+# --- Fan-out / fan-in variant ---
+# The three drafts are written by three agents running in parallel, each with
+# its own output key, then joined into {drafts} for the publisher.
+DRAFT_ANGLES = [
+    "playful and full of emojis",
+    "a quick, useful food tip",
+    "a trend or challenge people can join",
+]
+
+
+def make_draft_agent(index: int, angle: str) -> Agent:
+    return Agent(
+        name=f"draft_agent_{index}",
+        model="gemini-2.5-flash",
+        description=f"Drafts social media post #{index}.",
+        instruction=f"You are a creative content creator. Based on the summary in {{summary}}, draft ONE engaging social media post about food. Its angle: {angle}. Make it catchy and use emojis. Reply with the post only.",
+        output_key=f"draft_{index}",
+    )
+
+
+class JoinDrafts(BaseAgent):
+    """Joins the parallel drafts into one numbered list under `output_key` (no model call)."""
+
+    draft_keys: list[str]
+    output_key: str = "drafts"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        drafts = [ctx.session.state.get(key, "") for key in self.draft_keys]
+        joined = "\n\n".join(f"Draft {i}:\n{draft}" for i, draft in enumerate(drafts, 1))
+        yield Event(invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch,
+                    actions=EventActions(state_delta={self.output_key: joined}))
+
+
+draft_agents = [make_draft_agent(i, angle) for i, angle in enumerate(DRAFT_ANGLES, 1)]
+
+fanout_agent = SequentialAgent(
+    name="socmed_fanout_agent",
+    description="Social media workflow that drafts posts in parallel.",
+    sub_agents=[
+        summarization_agent.clone(),
+        ParallelAgent(name="drafting_agent", description="Drafts posts in parallel.",
+                      sub_agents=draft_agents),
+        JoinDrafts(name="join_drafts", description="Joins the drafts for the publisher.",
+                   draft_keys=[agent.output_key for agent in draft_agents]),
+        publisher_agent.clone(),
+    ],
+)
 
-        if event.is_final_response() and event.author == 'publisher_agent':
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            else:
-                final_response_text = f"No response. {event.error_message if event.error_message else ''}"
-            break
-    return final_response_text
+# SOCMED_PIPELINE=fanout selects the parallel pipeline (e.g. for `adk web`).
+PIPELINES = {"sequential": sequential_agent, "fanout": fanout_agent}
+root_agent = PIPELINES[os.environ.get("SOCMED_PIPELINE", "sequential")]
+
+def print_stream_event(event, last_author: str) -> str:
+    """Prints streamed text as it arrives, under the name of the agent writing it. Returns its author.
+
+    Tool calls and errors go to the log instead (tool calls at DEBUG level).
+    """
+    if event.kind == "text":
+        if event.author and event.author != last_author:
+            print(f"\n\n[{event.author}]")
+        print(event.text, end="", flush=True)
+        return event.author or last_author
+    if event.kind == "tool_start":
+        logger.debug("%s calling %s(%s)", event.author, event.tool, event.data or "")
+    elif event.kind == "tool_end":
+        logger.debug("%s: %s returned after %.2fs", event.author, event.tool, event.elapsed)
+    elif event.kind == "error":
+        logger.error("%s failed: %s", event.author, event.text)
+    return last_author
 
 async def main():
+    # Only needed to run the pipeline from the command line, not to load the agent.
+    from google.adk.runners import Runner
+    from common.driver import TurnResult, stream_turn
+    from common.session_store import LocalSessionService, get_or_create_session
+    from common.tracing import instrument_from_env
+
     try:
         # Session Setup
-        session_service = InMemorySessionService()
+        session_service = LocalSessionService(SESSION_DB)
         APP_NAME = "socmed_app"
         USER_ID = "user_socmed"
         SESSION_ID = "session_socmed_01"
         
-        await session_service.create_session(
+        await get_or_create_session(
+            session_service,
             app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
         )
         print(f"Session created: {SESSION_ID}")
@@ -107,6 +202,7 @@ async def main():
             app_name=APP_NAME,
             session_service=session_service
         )
+        instrument_from_env(runner)  # Spans into $TRACE_DIR, if set
         print(f"Runner created for agent '{root_agent.name}'.")
 
         # Trigger the workflow
@@ -118,8 +214,15 @@ async def main():
         # However, ADK's SequentialAgent implementation details might vary. 
         # Usually, the 'root_agent' handles the orchestration internally when `run` is called.
         
-        result = await call_agent_async(query, runner, USER_ID, SESSION_ID)
-        print(f"\nFinal Result:\n{result}")
+        # Stream the pipeline, so each agent's text shows up while it is being written
+        result = TurnResult(user_id=USER_ID, session_id=SESSION_ID, query=query)
+        last_author = ""
+        async for event in stream_turn(runner, USER_ID, SESSION_ID, query,
+                                       author="publisher_agent", result=result):
+            last_author = print_stream_event(event, last_author)
+        print(f"\n\nFinal Result:\n{result.response}")
+        if result.first_token is not None:
+            print(f"First text after {result.first_token:.2f}s, whole pipeline took {result.latency:.2f}s")
 
     except Exception as e:
         print(f"An error occurred: {e}")
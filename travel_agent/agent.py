@@ -1,17 +1,21 @@
 from google.adk.agents.llm_agent import Agent
+from google.adk.tools.tool_context import ToolContext
+from common import train_schedule
 
 def search_train(origin: str, dest: str, date: str, day_part: str, pax: int) -> dict:
     """Search train schedule berdasarkan parameter pencarian."""
-    return {"code": "Argo Semeru 6", "departure": "6:20", "price": 585000}
+    return train_schedule.search(origin, dest, date, day_part, pax)
 
-def book_train(code: str, name: str) -> dict:
+def book_train(code: str, name: str, date: str, pax: int, tool_context: ToolContext) -> dict:
     """Booking tiket kereta lalu mengembalikan pranala pembayaran."""
-    return {"status": "booked", "name": name, "payment_link":"http://sample.bayar.id"}
+    # Retries of the same call within one invocation return the same booking
+    key = f"{tool_context.invocation_id}:book_train:{code}:{date}:{pax}:{name}"
+    return train_schedule.book(code, name, date, pax, key)
 
 root_agent = Agent(
     model='gemini-2.5-flash',
     name='root_agent',
     description="Travel agent",
     instruction="You are a helpful travel agent for search and booking train.",
-    # TODO tools=[...],
+    tools=[search_train, book_train],
 )
@@ -1,20 +1,28 @@
+import logging
+
 from google.adk.agents.llm_agent import Agent
+try:
+    from . import prewarm
+except ImportError:  # Imported as a top-level module from inside this directory.
+    import prewarm
+
+logger = logging.getLogger(__name__)
 
 # --- Train Tools ---
 def search_train(origin: str, dest: str, date: str, day_part: str, pax: int) -> dict:
     """Search train schedule based on search parameters."""
-    print(f"--- Tool: search_train called with origin={origin}, dest={dest}, date={date} ---")
+    logger.debug("search_train called with origin=%s, dest=%s, date=%s", origin, dest, date)
     return {"code": "Argo Semeru 6", "departure": "6:20", "price": 585000}
 
 def book_train(code: str, name: str) -> dict:
     """Book train ticket and return payment link."""
-    print(f"--- Tool: book_train called with code={code}, name={name} ---")
+    logger.debug("book_train called with code=%s, name=%s", code, name)
     return {"status": "booked", "name": name, "payment_link": "http://sample.bayar.id"}
 
 # --- Hotel Tools ---
 def search_hotel(location: str, date: str, nights: int, guests: int) -> dict:
     """Search hotel availability based on location and dates."""
-    print(f"--- Tool: search_hotel called with location={location}, date={date} ---")
+    logger.debug("search_hotel called with location=%s, date=%s", location, date)
     return {
         "hotels": [
             {"name": "Bali Resort & Spa", "price_per_night": 1500000, "rating": 4.5},
@@ -24,7 +32,7 @@ def search_hotel(location: str, date: str, nights: int, guests: int) -> dict:
 
 def book_hotel(hotel_name: str, room_type: str) -> dict:
     """Book a hotel room and return confirmation."""
-    print(f"--- Tool: book_hotel called with hotel_name={hotel_name}, room_type={room_type} ---")
+    logger.debug("book_hotel called with hotel_name=%s, room_type=%s", hotel_name, room_type)
     return {"status": "booked", "hotel_name": hotel_name, "confirmation_code": "HTL-12345"}
 
 # Create sub-agents
@@ -57,3 +65,9 @@ root_agent = Agent(
                 "If the user asks for both, you can coordinate between them.",
     sub_agents=[train_agent, hotel_agent]
 )
+
+# Agent Engine imports this module while an instance starts, so warming up
+# here keeps ADK's first-turn setup off the first user query. Elsewhere it
+# is off unless PREWARM=1.
+if prewarm.enabled():
+    prewarm.warm_up(root_agent)
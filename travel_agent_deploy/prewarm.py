@@ -0,0 +1,101 @@
+"""Pays ADK's one-off first-turn costs while the agent is imported, not on the first query.
+
+On the first turn ADK imports a lot more of itself (model integrations,
+content processors) and builds the tool declarations, so the first query of
+a fresh Agent Engine instance waits 2-3 s longer than the next one. Agent
+Engine imports agent.py while the instance starts, before it takes traffic,
+so `warm_up(root_agent)` at the end of agent.py moves that cost there. It runs
+one offline turn with a stub model standing in for every LLM: no network,
+no credentials, no quota.
+
+Only an Agent Engine instance warms up by default (it sets
+GOOGLE_CLOUD_AGENT_ENGINE_ID), so importing the agent anywhere else (adk
+web, tests, scripts) stays cheap. PREWARM=1 or PREWARM=0 forces it on or off.
+
+This directory is deployed on its own, so this is a copy of `warm_up` from
+travel_agent_docker/prewarm.py.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    default = "1" if os.environ.get("GOOGLE_CLOUD_AGENT_ENGINE_ID") else "0"
+    return os.environ.get("PREWARM", default) != "0"
+
+
+class _StubLlm(BaseLlm):
+    """Answers every request with a fixed text, instantly."""
+
+    model: str = "prewarm-stub"
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="OK.")]),
+                          turn_complete=True, usage_metadata=types.GenerateContentResponseUsageMetadata(
+                              prompt_token_count=0, candidates_token_count=0, total_token_count=0))
+
+
+def _with_stub_models(agent):
+    update = {"sub_agents": [_with_stub_models(sub_agent) for sub_agent in agent.sub_agents]}
+    if hasattr(agent, "model"):
+        update["model"] = _StubLlm()
+    return agent.clone(update=update)
+
+
+def _resolve_models(agent):
+    """Resolves every configured model (e.g. 'gemini-2.5-flash') to its client class."""
+    if getattr(agent, "model", None):
+        agent.canonical_model
+    for sub_agent in agent.sub_agents:
+        _resolve_models(sub_agent)
+
+
+async def _one_turn(agent):
+    from google.adk.runners import InMemoryRunner
+
+    # Loaded through ADK's AgentLoader, the agent knows its app name; matching it avoids a warning.
+    app_name = getattr(agent, "_adk_origin_app_name", None) or "prewarm"
+    runner = InMemoryRunner(agent=agent, app_name=app_name)
+    session = await runner.session_service.create_session(app_name=app_name, user_id="prewarm")
+    message = types.Content(role="user", parts=[types.Part(text="Hello")])
+    async for _ in runner.run_async(user_id="prewarm", session_id=session.id, new_message=message):
+        pass
+
+
+def warm_up(agent) -> float:
+    """Runs one offline turn of `agent` with stub models; returns the seconds it took.
+
+    The turn runs on its own thread and event loop, so this also works while
+    the caller's loop is running (e.g. when a server imports the agent).
+    """
+    start = time.perf_counter()
+    _resolve_models(agent)
+    errors = []
+
+    def run():
+        try:
+            asyncio.run(_one_turn(_with_stub_models(agent)))
+        except Exception as e:  # A failed warm-up only means a slower first query.
+            errors.append(e)
+
+    thread = threading.Thread(target=run, name="prewarm")
+    thread.start()
+    thread.join()
+    seconds = time.perf_counter() - start
+    if errors:
+        logger.warning("Warm-up of %s failed after %.2f s: %r", agent.name, seconds, errors[0])
+    else:
+        logger.info("Warmed up %s in %.2f s", agent.name, seconds)
+    return seconds
@@ -0,0 +1,159 @@
+"""Pays ADK's one-off startup costs before the first request instead of during it.
+
+Importing the agent is only part of a cold start. On the first turn ADK
+imports a lot more (model integrations, content processors) and builds the
+agent's tool declarations, which makes the first user of a fresh container
+wait 2-3 s longer than the next one. Two ways to get that done early:
+
+- `warm_up(agent)` runs one offline turn of the agent, with a stub model
+  standing in for every LLM, so no network or credentials are needed.
+- `write_snapshot()` records the framework modules such a warmed-up process
+  has loaded, and `load_snapshot()` imports them again. The image build
+  writes the snapshot, and the server supervisor loads it once before
+  forking, so every worker starts with those modules already imported:
+
+    python -m travel_agent_docker.prewarm          # at image build time
+
+Modules of the agent packages themselves are left out of the snapshot, so
+a reload still imports fresh agent code. Set PREWARM=0 to skip all of this.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+from typing import AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prewarm_modules.txt")
+LIBRARY_DIRS = tuple({sysconfig.get_paths()[key] for key in ("stdlib", "platstdlib", "purelib", "platlib")})
+
+
+def enabled() -> bool:
+    return os.environ.get("PREWARM", "1") != "0"
+
+
+class _StubLlm(BaseLlm):
+    """Answers every request with a fixed text, instantly."""
+
+    model: str = "prewarm-stub"
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="OK.")]),
+                          turn_complete=True, usage_metadata=types.GenerateContentResponseUsageMetadata(
+                              prompt_token_count=0, candidates_token_count=0, total_token_count=0))
+
+
+def _with_stub_models(agent):
+    update = {"sub_agents": [_with_stub_models(sub_agent) for sub_agent in agent.sub_agents]}
+    if hasattr(agent, "model"):
+        update["model"] = _StubLlm()
+    return agent.clone(update=update)
+
+
+def _resolve_models(agent):
+    """Resolves every configured model (e.g. 'gemini-2.5-flash') to its client class."""
+    if getattr(agent, "model", None):
+        agent.canonical_model
+    for sub_agent in agent.sub_agents:
+        _resolve_models(sub_agent)
+
+
+async def _one_turn(agent):
+    from google.adk.runners import InMemoryRunner
+
+    # Loaded through ADK's AgentLoader, the agent knows its app name; matching it avoids a warning.
+    app_name = getattr(agent, "_adk_origin_app_name", None) or "prewarm"
+    runner = InMemoryRunner(agent=agent, app_name=app_name)
+    session = await runner.session_service.create_session(app_name=app_name, user_id="prewarm")
+    message = types.Content(role="user", parts=[types.Part(text="Hello")])
+    async for _ in runner.run_async(user_id="prewarm", session_id=session.id, new_message=message):
+        pass
+
+
+def warm_up(agent) -> float:
+    """Runs one offline turn of `agent` with stub models; returns the seconds it took.
+
+    The turn runs on its own thread and event loop, so this also works while
+    the caller's loop is running (e.g. when a server imports the agent).
+    """
+    start = time.perf_counter()
+    _resolve_models(agent)
+    errors = []
+
+    def run():
+        try:
+            asyncio.run(_one_turn(_with_stub_models(agent)))
+        except Exception as e:  # A failed warm-up only means a slower first request.
+            errors.append(e)
+
+    thread = threading.Thread(target=run, name="prewarm")
+    thread.start()
+    thread.join()
+    seconds = time.perf_counter() - start
+    if errors:
+        logger.warning("Warm-up of %s failed after %.2f s: %r", agent.name, seconds, errors[0])
+    else:
+        logger.info("Warmed up %s in %.2f s", agent.name, seconds)
+    return seconds
+
+
+def _library_modules() -> list[str]:
+    names = []
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and path.startswith(LIBRARY_DIRS) and not name.startswith("__"):
+            names.append(name)
+    return sorted(names)
+
+
+def write_snapshot(path: str = SNAPSHOT_PATH) -> int:
+    """Writes the library modules loaded so far, one per line; returns how many."""
+    names = _library_modules()
+    with open(path + ".tmp", "w") as f:
+        f.write("\n".join(names) + "\n")
+    os.replace(path + ".tmp", path)
+    return len(names)
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> int:
+    """Imports the modules listed by `write_snapshot`; returns how many were new.
+
+    A missing snapshot is fine (nothing to do); a module that fails to import
+    is skipped, as the snapshot may come from a slightly different build.
+    """
+    if not os.path.exists(path):
+        return 0
+    loaded = 0
+    with open(path) as f:
+        for name in f.read().split():
+            if name in sys.modules:
+                continue
+            try:
+                importlib.import_module(name)
+                loaded += 1
+            except Exception:
+                logger.debug("Snapshot module %s did not import", name)
+    return loaded
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from travel_agent_docker.agent import root_agent
+
+    warm_up(root_agent)
+    print(f"{write_snapshot()} modules written to {SNAPSHOT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
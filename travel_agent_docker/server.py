@@ -0,0 +1,378 @@
+"""Production entry point for the travel agent image: pre-forked API server workers.
+
+`adk api_server` runs a single process, so one event loop (and one core)
+serves every user. This module runs the same ADK API app in several worker
+processes that share one listening socket:
+
+    python -m travel_agent_docker.server --workers 4 --port 8000
+
+- The supervisor binds the socket, imports the ADK server code (plus the
+  modules in the `prewarm` snapshot) once and then forks the workers, so
+  they start fast and share that memory. Each worker imports the agent
+  packages afresh and runs an offline warm-up turn (`prewarm.warm_up`)
+  before it takes requests, so the first user does not pay for ADK's
+  first-turn setup.
+- Sessions live in one SQLite file (--session-db) in WAL mode, so a user's
+  next turn can land on any worker. Writes take the database lock up front
+  (BEGIN IMMEDIATE) and wait for it, so concurrent workers queue instead of
+  failing with "database is locked".
+- Each worker accepts at most --max-in-flight concurrent requests and answers
+  503 beyond that instead of queueing without bound. The server as a whole
+  takes workers x max-in-flight.
+- SIGHUP is a graceful reload: a new set of workers (with freshly imported
+  agent code) starts first, and once they are serving, the old ones stop
+  accepting and drain: requests already in flight, and any that still
+  arrive on open keep-alive connections, are answered with "Connection:
+  close", and connections that stay idle are closed after the keep-alive
+  timeout, the same as any time. Then they exit; --graceful-timeout bounds
+  the whole drain. If the new workers fail to start, the old ones keep
+  serving.
+- SIGTERM / SIGINT stop the server the same way. A worker that dies is
+  replaced, with a growing delay if it keeps crashing at startup.
+
+Every option can also be set from the environment (WEB_CONCURRENCY,
+MAX_IN_FLIGHT, SESSION_DB, GRACEFUL_TIMEOUT, WARM_APPS, PREWARM=0 to skip
+warming up), which is how the Dockerfile configures it.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+import uvicorn
+from google.adk.sessions import sqlite_session_service
+
+from travel_agent_docker import prewarm
+
+logger = logging.getLogger("travel_agent_docker.server")
+
+DEFAULT_AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSION_SCHEME = "shared-sqlite"
+BUSY_TIMEOUT = 30.0
+KEEP_ALIVE = 5  # Seconds an idle connection stays open (uvicorn's default).
+
+
+def prepare_session_db(path: str):
+    """Switches the session database to WAL, so workers can read while one writes.
+
+    The journal mode is stored in the file, so doing it once here covers
+    every connection the workers open later.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with sqlite3.connect(path) as db:
+        db.execute("PRAGMA journal_mode=WAL")
+
+
+class SharedSqliteSessionService(sqlite_session_service.SqliteSessionService):
+    """SqliteSessionService for a database file written by several processes.
+
+    The base class reads the session, then writes in the same deferred
+    transaction; if another worker commits in between, SQLite cannot upgrade
+    the read lock and fails at once, busy timeout or not. Here reads run
+    outside a transaction and every write starts with BEGIN IMMEDIATE, which
+    waits up to `BUSY_TIMEOUT` for the lock.
+    """
+
+    @asynccontextmanager
+    async def _get_db_connection(self):
+        async with aiosqlite.connect(self._db_connect_path, uri=self._db_connect_uri,
+                                     timeout=BUSY_TIMEOUT, isolation_level="IMMEDIATE") as db:
+            db.row_factory = aiosqlite.Row
+            await db.execute(sqlite_session_service.PRAGMA_FOREIGN_KEYS)
+            if not self._schema_ready:
+                await db.executescript(sqlite_session_service.CREATE_SCHEMA_SQL)
+                self._schema_ready = True
+            yield db
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Binds without listening: the port only accepts once a worker serves (and listens) on it.
+
+    So a TCP startup probe (Cloud Run, Kubernetes) keeps traffic away until
+    at least one worker is warmed up, instead of queueing the first users
+    behind the warm-up.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Forks, replaces and gracefully reloads the API server workers."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.sock = bind_socket(args.host, args.port)
+        self.workers: dict[int, float] = {}  # pid -> start time
+        self.retiring: dict[int, float] = {}  # pid -> kill deadline
+        self.crashes = 0
+        # Each worker writes its pid here once it accepts requests.
+        self._ready_read, self._ready_write = os.pipe()
+        os.set_blocking(self._ready_read, False)
+        self.ready: set[int] = set()
+        self._reload = False
+        self._stop = False
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, signal.SIG_DFL)
+            try:
+                os.close(self._ready_read)
+                run_worker(self.sock, self.args, self._ready_write)
+            except BaseException:
+                logger.exception("Worker %d failed", os.getpid())
+                os._exit(1)
+            os._exit(0)
+        self.workers[pid] = time.monotonic()
+        return pid
+
+    def collect_ready(self):
+        try:
+            data = os.read(self._ready_read, 4096)
+        except BlockingIOError:
+            return
+        self.ready.update(int(pid) for pid in data.split())
+
+    def wait_ready(self, pids, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not self._stop:
+            self.collect_ready()
+            self.reap(replace=False)
+            if not all(pid in self.workers for pid in pids):
+                return False
+            if self.ready.issuperset(pids):
+                return True
+            time.sleep(0.1)
+        return False
+
+    def reload(self):
+        old = list(self.workers)
+        new = [self.spawn() for _ in range(self.args.workers)]
+        if self.wait_ready(new, timeout=self.args.startup_timeout):
+            self.retire(old)
+            logger.info("Reloaded: workers %s replaced %s", new, old)
+        else:
+            self.retire(new)
+            logger.error("Reload failed: new workers did not start, %s keep serving", old)
+
+    def retire(self, pids):
+        """Asks workers to finish their in-flight requests and exit."""
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        for pid in pids:
+            if self.workers.pop(pid, None) is None:
+                continue  # Already exited and reaped.
+            self.retiring[pid] = deadline
+            self._signal(pid, signal.SIGTERM)
+
+    def _signal(self, pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reap(self, replace: bool = True):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.ready.discard(pid)
+            if self.retiring.pop(pid, None) is not None:
+                continue
+            started = self.workers.pop(pid, None)
+            if started is None or self._stop or not replace:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            # Quick repeated deaths mean a broken agent, not a one-off crash.
+            self.crashes = self.crashes + 1 if time.monotonic() - started < 10 else 0
+            delay = min(2 ** self.crashes / 4, 30) if self.crashes else 0
+            logger.warning("Worker %d exited with %s; starting a replacement in %.1f s", pid, code, delay)
+            time.sleep(delay)
+            self.spawn()
+
+    def run(self):
+        def on_signal(signum, frame):
+            if signum == signal.SIGHUP:
+                self._reload = True
+            elif signum in (signal.SIGTERM, signal.SIGINT):
+                self._stop = True
+
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, on_signal)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        logger.info("Serving %s on http://%s:%d with %d workers (max %d in flight each), sessions in %s",
+                    self.args.agents_dir, self.args.host, self.args.port, self.args.workers,
+                    self.args.max_in_flight, self.args.session_db)
+
+        while not self._stop:
+            if self._reload:
+                self._reload = False
+                self.reload()
+            self.collect_ready()
+            self.reap()
+            now = time.monotonic()
+            for pid, deadline in list(self.retiring.items()):
+                if now > deadline:
+                    logger.warning("Worker %d did not stop in time; killing it", pid)
+                    self._signal(pid, signal.SIGKILL)
+            time.sleep(0.5)
+
+        logger.info("Stopping %d workers", len(self.workers))
+        self.retire(list(self.workers))
+        while self.retiring:
+            self.reap()
+            if self.retiring and time.monotonic() > min(self.retiring.values()):
+                for pid in self.retiring:
+                    self._signal(pid, signal.SIGKILL)
+            time.sleep(0.1)
+        self.sock.close()
+
+
+class _Server(uvicorn.Server):
+    """uvicorn server telling the supervisor when it starts accepting, and draining before it stops."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        config.app = self._close_when_draining(config.app)
+        super().__init__(config)
+        self.ready_fd = ready_fd
+        self.draining = False
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets)
+        if self.started:
+            os.write(self.ready_fd, f"{os.getpid()}\n".encode())
+
+    def _close_when_draining(self, app):
+        async def wrapped(scope, receive, send):
+            async def send_closing(message):
+                if message["type"] == "http.response.start" and self.draining:
+                    message = {**message, "headers": [*message.get("headers", []), (b"connection", b"close")]}
+                await send(message)
+
+            await app(scope, receive, send_closing if scope["type"] == "http" else send)
+
+        return wrapped
+
+    async def shutdown(self, sockets=None):
+        # uvicorn closes idle keep-alive connections at once, so a client that
+        # is just sending its next request on one gets no answer. Stop
+        # accepting first, then let every connection end after a response
+        # carrying "Connection: close", or by its keep-alive timeout.
+        start = time.monotonic()
+        for server in self.servers:
+            server.close()
+        self.draining = True
+        for connection in list(self.server_state.connections):
+            if connection.cycle is not None and not connection.cycle.response_complete:
+                connection.shutdown()  # In flight: no keep-alive after this response.
+        drain = min(KEEP_ALIVE + 1, self.config.timeout_graceful_shutdown)
+        while self.server_state.connections and time.monotonic() - start < drain and not self.force_exit:
+            await asyncio.sleep(0.1)
+        self.config.timeout_graceful_shutdown = max(
+            self.config.timeout_graceful_shutdown - (time.monotonic() - start), 1)
+        await super().shutdown(sockets)
+
+
+def forget_agent_modules(agents_dir: str):
+    """Drops the agent modules inherited from the supervisor, so a reload imports current code."""
+    root = os.path.join(os.path.abspath(agents_dir), "")
+    for name, module in list(sys.modules.items()):
+        if name != "__main__" and (getattr(module, "__file__", None) or "").startswith(root):
+            del sys.modules[name]
+
+
+def load_agents(agents_dir: str, names: list[str]):
+    """An AgentLoader with `names` loaded and, unless PREWARM=0, warmed up."""
+    from google.adk.cli.utils.agent_loader import AgentLoader
+
+    loader = AgentLoader(agents_dir)
+    for name in names:
+        try:
+            agent = loader.load_agent(name)
+        except Exception as e:
+            logger.warning("Could not preload %s: %r", name, e)
+            continue
+        if prewarm.enabled():
+            prewarm.warm_up(getattr(agent, "root_agent", agent))
+    return loader
+
+
+def run_worker(sock: socket.socket, args: argparse.Namespace, ready_fd: int):
+    from google.adk.cli.fast_api import get_fast_api_app
+    from google.adk.cli.service_registry import get_service_registry
+
+    forget_agent_modules(args.agents_dir)
+    loader = load_agents(args.agents_dir, args.warm_apps)
+
+    get_service_registry().register_session_service(
+        SESSION_SCHEME, lambda uri, **kwargs: SharedSqliteSessionService(db_path=args.session_db))
+    app = get_fast_api_app(
+        agents_dir=args.agents_dir,
+        agent_loader=loader,
+        session_service_uri=f"{SESSION_SCHEME}://{os.path.abspath(args.session_db)}",
+        web=False,
+        host=args.host,
+        port=args.port,
+    )
+    config = uvicorn.Config(
+        app,
+        limit_concurrency=args.max_in_flight,
+        timeout_keep_alive=KEEP_ALIVE,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level.lower(),
+        access_log=args.access_log,
+    )
+    _Server(config, ready_fd).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents-dir", default=DEFAULT_AGENTS_DIR,
+                        help="Directory containing the agent packages (default: the parent of this package).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--max-in-flight", type=int, default=int(os.environ.get("MAX_IN_FLIGHT", 64)),
+                        help="Concurrent requests per worker before it answers 503.")
+    parser.add_argument("--session-db", default=os.environ.get("SESSION_DB", "sessions.db"))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.environ.get("GRACEFUL_TIMEOUT", 30)),
+                        help="Seconds a stopping worker gets to finish its in-flight requests.")
+    parser.add_argument("--startup-timeout", type=int, default=60,
+                        help="Seconds new workers get to start serving during a reload.")
+    parser.add_argument("--warm-apps", type=lambda value: [name for name in value.split(",") if name],
+                        default=os.environ.get("WARM_APPS", "travel_agent_docker"),
+                        help="Comma-separated agents each worker loads and warms up before serving.")
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(levelname)s %(message)s")
+
+    prepare_session_db(args.session_db)
+    # Preload the server code (most of the import time) before forking.
+    import google.adk.cli.fast_api  # noqa: F401
+    if prewarm.enabled():
+        start = time.perf_counter()
+        loaded = prewarm.load_snapshot()
+        logger.info("Imported %d snapshot modules in %.2f s", loaded, time.perf_counter() - start)
+    Supervisor(args).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,41 @@
 from google.adk.agents.llm_agent import Agent
-from google.genai import types
-from google.adk.sessions import InMemorySessionService
+from common.session_store import LocalSessionService, get_or_create_session
 from google.adk.runners import Runner
+from common.driver import call_agent_async
+from common.tracing import instrument_from_env
+from common.tool_cache import cached_tool, uncacheable
+from google.adk.tools.tool_context import ToolContext
+from common import train_schedule
 
 import asyncio
 import logging
 import os
 
-logging.basicConfig(level=logging.ERROR)
+# LOG_LEVEL=DEBUG shows each tool call
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "ERROR").upper())
+logger = logging.getLogger(__name__)
 
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "1"
 os.environ["GOOGLE_CLOUD_PROJECT"] = "workshop-adk-bali"
 os.environ["GOOGLE_CLOUD_LOCATION"] = "us-central1"
 
+SESSION_DB = os.path.join(os.path.dirname(__file__), "sessions.db")
 
+
+# Only the timetable is cached; the seats booked since are taken off on every call
+@cached_tool(ttl=60, after=train_schedule.seats_left)
 def search_train(origin: str, dest: str, date: str, day_part: str, pax: int) -> dict:
     """Search train schedule berdasarkan parameter pencarian."""
-    print(f"--- Tool: search_train called for {origin} to {dest} on {date} ---")
-    return {"code": "Argo Semeru 6", "departure": "6:20", "price": 585000}
+    logger.debug("search_train called for %s to %s on %s", origin, dest, date)
+    return train_schedule.timetable(origin, dest, date, day_part, pax)
 
-def book_train(code: str, name: str) -> dict:
+@uncacheable
+def book_train(code: str, name: str, date: str, pax: int, tool_context: ToolContext) -> dict:
     """Booking tiket kereta lalu mengembalikan pranala pembayaran."""
-    print(f"--- Tool: book_train called for {code} by {name} ---")
-    return {"status": "booked", "name": name, "payment_link":"http://sample.bayar.id"}
-
-
-async def call_agent_async(query: str, runner, user_id, session_id):
-    """Sends a query to the agent and prints the final response."""
-    content = types.Content(role='user', parts=[types.Part(text=query)])
-
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            else:
-                final_response_text = f"No response. {event.error_message if event.error_message else ''}"
-            break
-
-    return final_response_text
+    logger.debug("book_train called for %s by %s", code, name)
+    # Retries of the same call within one invocation return the same booking
+    key = f"{tool_context.invocation_id}:book_train:{code}:{date}:{pax}:{name}"
+    return train_schedule.book(code, name, date, pax, key)
 
 
 async def main():
@@ -55,8 +53,9 @@ async def main():
         APP_NAME = "travel_agent_app"
         USER_ID = "user_1"
         SESSION_ID = "session_001"
-        session_service = InMemorySessionService()
-        session = await session_service.create_session(
+        session_service = LocalSessionService(SESSION_DB)
+        session = await get_or_create_session(
+            session_service,
             app_name=APP_NAME,
             user_id=USER_ID,
             session_id=SESSION_ID
@@ -68,6 +67,7 @@ async def main():
             app_name=APP_NAME,
             session_service=None # TODO
         )
+        instrument_from_env(runner)  # Spans into $TRACE_DIR, if set
 
         # Ask to the agent
         q = "Saya mau cari kereta dari Gambir ke Bandung untuk 1 jan 2026 pagi buat 2 orang"
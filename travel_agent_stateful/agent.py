@@ -1,19 +1,26 @@
 from google.adk.agents.llm_agent import Agent
-from google.genai import types
-from google.adk.sessions import InMemorySessionService
+from common.session_store import LocalSessionService, get_or_create_session
 from google.adk.runners import Runner
+from common.driver import call_agent_async
+from common.tracing import instrument_from_env
+from common.tool_cache import uncacheable
+from common import places, train_schedule
 from google.adk.tools.tool_context import ToolContext
 
 import asyncio
 import logging
 import os
 
-logging.basicConfig(level=logging.ERROR)
+# LOG_LEVEL=DEBUG shows each tool call
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "ERROR").upper())
+logger = logging.getLogger(__name__)
 
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "1"
 os.environ["GOOGLE_CLOUD_PROJECT"] = "workshop-adk-bali"
 os.environ["GOOGLE_CLOUD_LOCATION"] = "us-central1"
 
+SESSION_DB = os.path.join(os.path.dirname(__file__), "sessions.db")
+
 
 def search_train(dest: str, date: str, day_part: str, pax: int, tool_context: ToolContext, origin: str = None) -> dict:
     """Search train schedule berdasarkan parameter pencarian.
@@ -29,35 +36,26 @@ def search_train(dest: str, date: str, day_part: str, pax: int, tool_context: To
     
     # Logic: If origin is missing, retrieve last_traveled_city from tool_context.state
     if not origin:
-        origin = tool_context.state.get("last_traveled_city")
-        print(f"--- Tool: Using default origin from state: {origin} ---")
+        # The stored city may be free text ("jkt", "Jogja"); resolve it to a known place
+        match = places.resolve(tool_context.state.get("last_traveled_city", ""))
+        if match and match.confidence >= places.MIN_CONFIDENCE:
+            origin = match.place.name
+        logger.debug("Using default origin from state: %s", origin)
     
-    print(f"--- Tool: search_train called for {origin} to {dest} on {date} ---")
+    logger.debug("search_train called for %s to %s on %s", origin, dest, date)
     
     if not origin:
          return {"error": "Origin city is missing and no history found."}
 
-    return {"code": "Argo Semeru 6", "departure": "6:20", "price": 585000, "origin": origin, "destination": dest}
+    return train_schedule.search(origin, dest, date, day_part, pax)
 
-def book_train(code: str, name: str) -> dict:
+@uncacheable
+def book_train(code: str, name: str, date: str, pax: int, tool_context: ToolContext) -> dict:
     """Booking tiket kereta lalu mengembalikan pranala pembayaran."""
-    print(f"--- Tool: book_train called for {code} by {name} ---")
-    return {"status": "booked", "name": name, "payment_link":"http://sample.bayar.id"}
-
-
-async def call_agent_async(query: str, runner, user_id, session_id):
-    """Sends a query to the agent and prints the final response."""
-    content = types.Content(role='user', parts=[types.Part(text=query)])
-
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            else:
-                final_response_text = f"No response. {event.error_message if event.error_message else ''}"
-            break
-
-    return final_response_text
+    logger.debug("book_train called for %s by %s", code, name)
+    # Retries of the same call within one invocation return the same booking
+    key = f"{tool_context.invocation_id}:book_train:{code}:{date}:{pax}:{name}"
+    return train_schedule.book(code, name, date, pax, key)
 
 
 async def main():
@@ -76,12 +74,13 @@ async def main():
         APP_NAME = "travel_agent_stateful_app"
         USER_ID = "user_1"
         SESSION_ID = "session_001"
-        session_service = InMemorySessionService()
+        session_service = LocalSessionService(SESSION_DB)
         
         # Initialize state with Jakarta as the last_traveled_city
         # initial_state = {"...": "..."}
         
-        session = await session_service.create_session(
+        session = await get_or_create_session(
+            session_service,
             app_name=APP_NAME,
             user_id=USER_ID,
             session_id=SESSION_ID,
@@ -94,6 +93,7 @@ async def main():
             app_name=APP_NAME,
             session_service=session_service
         )
+        instrument_from_env(runner)  # Spans into $TRACE_DIR, if set
 
         # Ask to the agent - omitting origin to test state usage
         q = "Saya mau cari kereta ke Bandung untuk 1 jan 2026 pagi buat 2 orang"
@@ -1,31 +1,93 @@
 from google.adk.agents.llm_agent import Agent
+from common.async_tools import async_tool
+from common.tool_cache import cached_tool, uncacheable
+from common.history import HistoryWindow
+from common.router import FastPathRouter
+from common.response_cache import ResponseCache
+from google.adk.tools.tool_context import ToolContext
+from common import booking_ledger, hotel_inventory, train_schedule
+
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 # --- Train Tools ---
+# Tools run in a thread pool with a timeout, so the lookups of one response run side by side
+# Only the timetable is cached; the seats booked since are taken off on every call
+@cached_tool(ttl=60, after=train_schedule.seats_left)
+@async_tool(timeout=10)
 def search_train(origin: str, dest: str, date: str, day_part: str, pax: int) -> dict:
     """Search train schedule based on search parameters."""
-    print(f"--- Tool: search_train called with origin={origin}, dest={dest}, date={date} ---")
-    return {"code": "Argo Semeru 6", "departure": "6:20", "price": 585000}
+    logger.debug("search_train called with origin=%s, dest=%s, date=%s", origin, dest, date)
+    return train_schedule.timetable(origin, dest, date, day_part, pax)
 
-def book_train(code: str, name: str) -> dict:
+@uncacheable
+@async_tool(timeout=15)
+def book_train(code: str, name: str, date: str, pax: int, tool_context: ToolContext) -> dict:
     """Book train ticket and return payment link."""
-    print(f"--- Tool: book_train called with code={code}, name={name} ---")
-    return {"status": "booked", "name": name, "payment_link": "http://sample.bayar.id"}
+    logger.debug("book_train called with code=%s, name=%s", code, name)
+    # Retries of the same call within one invocation return the same booking
+    key = f"{tool_context.invocation_id}:book_train:{code}:{date}:{pax}:{name}"
+    return train_schedule.book(code, name, date, pax, key)
 
 # --- Hotel Tools ---
-def search_hotel(location: str, date: str, nights: int, guests: int) -> dict:
-    """Search hotel availability based on location and dates."""
-    print(f"--- Tool: search_hotel called with location={location}, date={date} ---")
-    return {
-        "hotels": [
-            {"name": "Bali Resort & Spa", "price_per_night": 1500000, "rating": 4.5},
-            {"name": "City Center Hotel", "price_per_night": 800000, "rating": 4.0}
-        ]
-    }
-
-def book_hotel(hotel_name: str, room_type: str) -> dict:
-    """Book a hotel room and return confirmation."""
-    print(f"--- Tool: book_hotel called with hotel_name={hotel_name}, room_type={room_type} ---")
-    return {"status": "booked", "hotel_name": hotel_name, "confirmation_code": "HTL-12345"}
+@cached_tool(ttl=60, after=hotel_inventory.rooms_left)
+@async_tool(timeout=10)
+def search_hotel(location: str, date: str, nights: int, guests: int, max_price: int = 0,
+                 min_rating: float = 0.0, sort_by: str = "rating") -> dict:
+    """Search hotel availability based on location and dates.
+
+    Args:
+        location: City or area, e.g. Bali, Ubud or Jakarta.
+        date: Check-in date (YYYY-MM-DD).
+        nights: Number of nights.
+        guests: Guests per room.
+        max_price: Highest price per night in IDR (0 for no limit).
+        min_rating: Lowest acceptable rating (0-5).
+        sort_by: 'rating' (best first) or 'price' (cheapest first).
+    """
+    logger.debug("search_hotel called with location=%s, date=%s", location, date)
+    return hotel_inventory.stays(location, date, nights, guests, max_price=max_price,
+                                 min_rating=min_rating, sort_by=sort_by)
+
+@uncacheable
+@async_tool(timeout=15)
+def book_hotel(hotel_name: str, room_type: str, date: str, nights: int, name: str,
+               tool_context: ToolContext) -> dict:
+    """Book a hotel room from the check-in date for a number of nights and return confirmation."""
+    logger.debug("book_hotel called with hotel_name=%s, room_type=%s", hotel_name, room_type)
+    try:
+        check_in = datetime.date.fromisoformat(date)
+    except ValueError:
+        return {"status": "error", "error_message": f"Invalid date '{date}', expected YYYY-MM-DD."}
+    hotel = hotel_inventory.load().hotels.get(hotel_name)
+    if hotel is None:
+        return {"status": "error", "error_message": f"Unknown hotel '{hotel_name}'."}
+    rooms = hotel.rooms.get(room_type.lower())
+    if rooms is None:
+        return {"status": "error",
+                "error_message": f"{hotel_name} has no '{room_type}' rooms, only {', '.join(hotel.rooms)}."}
+    mask = hotel_inventory.stay_mask(check_in, max(nights, 1))
+    if mask is None or hotel.available & mask != mask:
+        return {"status": "error", "error_message": f"{hotel_name} is not available for those nights."}
+    nights_booked = [(check_in + datetime.timedelta(days=i)).isoformat() for i in range(max(nights, 1))]
+    # Retries of the same call within one invocation return the same booking
+    key = f"{tool_context.invocation_id}:book_hotel:{hotel_name}:{room_type}:{date}:{nights}:{name}"
+    try:
+        booking = booking_ledger.default().reserve(f"hotel:{hotel_name}:{room_type.lower()}", nights_booked,
+                                                   1, name, key, capacity=rooms, confirmed=True)
+    except booking_ledger.BookingError as e:
+        return {"status": "error", "error_message": str(e)}
+    return {**booking.as_dict(), "hotel_name": hotel_name, "room_type": room_type,
+            "confirmation_code": f"HTL-{booking.code}"}
+
+# Long booking chats: send the last 4 turns verbatim, summarise the rest
+compact_history = HistoryWindow(keep_turns=4)
+
+# Repeated searches get the same answer for a minute, like the search tools.
+# Turns that call book_train or book_hotel are never cached.
+response_cache = ResponseCache(ttl=60)
 
 # Create sub-agents
 train_agent = Agent(
@@ -33,7 +95,9 @@ train_agent = Agent(
     model="gemini-2.5-flash",
     description="Specialist for searching and booking trains.",
     instruction="You are a train travel specialist. Use 'search_train' to find schedules and 'book_train' to make bookings.",
-    # TODO tools=[...],
+    tools=[search_train, book_train],
+    before_model_callback=[response_cache, compact_history],
+    after_model_callback=response_cache.store,
 )
 
 hotel_agent = Agent(
@@ -41,9 +105,17 @@ hotel_agent = Agent(
     model="gemini-2.5-flash",
     description="Specialist for searching and booking hotels.",
     instruction="You are a hotel booking specialist. Use 'search_hotel' to find accommodation and 'book_hotel' to make reservations.",
-    # TODO tools=[...],
+    tools=[search_hotel, book_hotel],
+    before_model_callback=[response_cache, compact_history],
+    after_model_callback=response_cache.store,
 )
 
+# Requests naming only trains or only hotels skip the coordinator's model call
+route_request = FastPathRouter({
+    "train_agent": [r"\b(kereta|train|trains|stasiun|station)\b"],
+    "hotel_agent": [r"\b(hotel|hotels|penginapan|menginap|nginap|villa|resort|homestay)\b"],
+})
+
 # Create root agent
 root_agent = Agent(
     name="travel_agent_team",
@@ -54,6 +126,10 @@ root_agent = Agent(
                 "1. 'train_agent': Handles train searches and bookings. "
                 "2. 'hotel_agent': Handles hotel searches and bookings. "
                 "Delegate user requests to the appropriate specialist. "
-                "If the user asks for both, you can coordinate between them.",
-    # TODO sub_agents=[...]
+                "If the user asks for both a train and a hotel, call 'search_train' and 'search_hotel' "
+                "together in one response, summarise both results, and delegate the bookings.",
+    tools=[search_train, search_hotel],
+    sub_agents=[train_agent, hotel_agent],
+    before_model_callback=[route_request, compact_history],
+    after_model_callback=route_request.record,
 )
@@ -1,76 +1,69 @@
 from google.adk.agents.llm_agent import Agent
-from google.genai import types # For creating message Content/Parts
-from google.adk.sessions import InMemorySessionService
+from common.session_store import LocalSessionService, get_or_create_session
 from google.adk.runners import Runner
+from common.driver import call_agent_async
+from common.tracing import instrument_from_env
+from common.tool_cache import cached_tool
+from common.response_cache import ResponseCache
+from common import weather_data
 
 import asyncio
 import logging
 import os
 
-logging.basicConfig(level=logging.ERROR)
+# LOG_LEVEL=DEBUG shows each tool call
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "ERROR").upper())
+logger = logging.getLogger(__name__)
 
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "1"
 os.environ["GOOGLE_CLOUD_PROJECT"] = "workshop-adk-bali"
 os.environ["GOOGLE_CLOUD_LOCATION"] = "us-central1"
 
+SESSION_DB = os.path.join(os.path.dirname(__file__), "sessions.db")
 
+
+@cached_tool(ttl=600)
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city."""
-    print(f"--- Tool: get_weather called for city: {city} ---")
-    city_normalized = city.lower().replace(" ", "")
-
-    # Mock weather data
-    mock_weather_db = {
-        "newyork": {"status": "success", "report": "The weather in New York is sunny with a temperature of 25°C."},
-        "london": {"status": "success", "report": "It's cloudy in London with a temperature of 15°C."},
-        "tokyo": {"status": "success", "report": "Tokyo is experiencing light rain and a temperature of 18°C."},
-    }
-
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
+    logger.debug("get_weather called for city: %s", city)
+    city_weather = weather_data.lookup(city)
+
+    if city_weather:
+        report = (f"The weather in {city_weather.name} is {city_weather.condition} "
+                  f"with a temperature of {city_weather.temp_c:.0f}°C.")
+        return {"status": "success", "report": report}
     else:
         return {"status": "error", "error_message": f"Sorry, I don't have weather information for '{city}'."}
 
 
-# Create function that execute events in runner
-async def call_agent_async(query: str, runner, user_id, session_id):
-    """Sends a query to the agent and prints the final response."""
-    content = types.Content(role='user', parts=[types.Part(text=query)])
-
-    # RUNNER MAIN LOGIC: loop through events
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        # Key Concept: is_final_response() marks the concluding message for the turn.
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            else:
-                final_response_text = f"No response. {event.error_message if event.error_message else ''}"
-            break # Stop processing events once the final response is found
+# The same question from another user gets the same answer for 5 minutes
+response_cache = ResponseCache(ttl=300)
 
-    return final_response_text
+# Create agent
+weather_agent = Agent(
+    name="weather_agent_v1",
+    model="gemini-2.5-flash",
+    description="Provides weather information for specific cities.",
+    instruction="You are a helpful weather assistant. "
+                "When the user asks for the weather in a specific city, "
+                "use the 'get_weather' tool to find the information. "
+                "If the tool returns an error, inform the user politely. "
+                "If the tool is successful, present the weather report clearly.",
+    tools=[get_weather],
+    before_model_callback=response_cache,
+    after_model_callback=response_cache.store,
+)
 
 
 async def main():
     try:
-        # Create agent
-        weather_agent = Agent(
-            name="weather_agent_v1",
-            model="gemini-2.5-flash",
-            description="Provides weather information for specific cities.",
-            instruction="You are a helpful weather assistant. "
-                        "When the user asks for the weather in a specific city, "
-                        "use the 'get_weather' tool to find the information. "
-                        "If the tool returns an error, inform the user politely. "
-                        "If the tool is successful, present the weather report clearly.",
-            tools=[get_weather],
-        )
-
         # Create chat session
         APP_NAME = "weather_tutorial_app"
         USER_ID = "user_1"
         SESSION_ID = "session_001"
-        session_service = InMemorySessionService() # store session memory
-        session = await session_service.create_session(
+        session_service = LocalSessionService(SESSION_DB) # store session memory
+        session = await get_or_create_session(
+            session_service,
             app_name=APP_NAME,
             user_id=USER_ID, # dummy fix user
             session_id=SESSION_ID # dummy fix session
@@ -82,6 +75,7 @@ async def main():
             app_name=APP_NAME,
             session_service=session_service
         )
+        instrument_from_env(runner)  # Spans into $TRACE_DIR, if set
 
         # Ask to the agent
         q = "What is the weather like in London?"
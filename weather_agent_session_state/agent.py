@@ -1,57 +1,68 @@
 from google.adk.agents.llm_agent import Agent
-from google.genai import types # For creating message Content/Parts
-from google.adk.sessions import InMemorySessionService
+from common.session_store import LocalSessionService, get_or_create_session, update_state
 from google.adk.runners import Runner
+from common.driver import call_agent_async
+from common.tracing import instrument_from_env
 from google.adk.tools.tool_context import ToolContext
+from common.tool_cache import cached_tool
+from common.response_cache import ResponseCache
+from common import weather_data
+from typing import Optional
 
 import asyncio
 import logging
 import os
 
-logging.basicConfig(level=logging.ERROR)
+# LOG_LEVEL=DEBUG shows each tool call
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "ERROR").upper())
+logger = logging.getLogger(__name__)
 
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "1"
 os.environ["GOOGLE_CLOUD_PROJECT"] = "workshop-adk-bali"
 os.environ["GOOGLE_CLOUD_LOCATION"] = "us-central1"
 
+SESSION_DB = os.path.join(os.path.dirname(__file__), "sessions.db")
 
+# Answers depend on the preferred unit, and "what about now?" on the last city
+response_cache = ResponseCache(ttl=300, state_keys=["user_preference_temperature_unit",
+                                                    "last_city_checked_stateful"])
+
+
+@cached_tool(ttl=600)
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city."""
-    print(f"--- Tool: get_weather called for city: {city} ---")
-    city_normalized = city.lower().replace(" ", "")
-
-    # Mock weather data
-    mock_weather_db = {
-        "newyork": {"status": "success", "report": "The weather in New York is sunny with a temperature of 25°C."},
-        "london": {"status": "success", "report": "It's cloudy in London with a temperature of 15°C."},
-        "tokyo": {"status": "success", "report": "Tokyo is experiencing light rain and a temperature of 18°C."},
-    }
-
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
+    logger.debug("get_weather called for city: %s", city)
+    city_weather = weather_data.lookup(city)
+
+    if city_weather:
+        report = (f"The weather in {city_weather.name} is {city_weather.condition} "
+                  f"with a temperature of {city_weather.temp_c:.0f}°C.")
+        return {"status": "success", "report": report}
     else:
         return {"status": "error", "error_message": f"Sorry, I don't have weather information for '{city}'."}
 
 
+@cached_tool(ttl=600)
+def lookup_weather(city: str) -> Optional[dict]:
+    """Looks up the raw weather data (always in Celsius) for a city."""
+    city_weather = weather_data.lookup(city)
+    if city_weather is None:
+        return None
+    return {"name": city_weather.name, "temp_c": city_weather.temp_c, "condition": city_weather.condition}
+
+
 def get_weather_stateful(city: str, tool_context: ToolContext) -> dict:
     """Retrieves weather, converts temp unit based on session state."""
-    print(f"--- Tool: get_weather_stateful called for {city} ---")
+    logger.debug("get_weather_stateful called for %s", city)
 
     # --- Read preference from state ---
     preferred_unit = tool_context.state.get("user_preference_temperature_unit", "Celsius") # Default to Celsius
-    print(f"--- Tool: Reading state 'user_preference_temperature_unit': {preferred_unit} ---")
-
-    city_normalized = city.lower().replace(" ", "")
+    logger.debug("Reading state 'user_preference_temperature_unit': %s", preferred_unit)
 
-    # Mock weather data (always stored in Celsius internally)
-    mock_weather_db = {
-        "newyork": {"temp_c": 25, "condition": "sunny"},
-        "london": {"temp_c": 15, "condition": "cloudy"},
-        "tokyo": {"temp_c": 18, "condition": "light rain"},
-    }
+    # The lookup is cached; the unit conversion and state update below run on every call
+    data = lookup_weather(city)
 
-    if city_normalized in mock_weather_db:
-        data = mock_weather_db[city_normalized]
+    if data:
         temp_c = data["temp_c"]
         condition = data["condition"]
 
@@ -63,38 +74,35 @@ def get_weather_stateful(city: str, tool_context: ToolContext) -> dict:
             temp_value = temp_c
             temp_unit = "°C"
 
-        report = f"The weather in {city.capitalize()} is {condition} with a temperature of {temp_value:.0f}{temp_unit}."
+        report = f"The weather in {data['name']} is {condition} with a temperature of {temp_value:.0f}{temp_unit}."
         result = {"status": "success", "report": report}
-        print(f"--- Tool: Generated report in {preferred_unit}. Result: {result} ---")
+        logger.debug("Generated report in %s. Result: %s", preferred_unit, result)
 
         # Example of writing back to state (optional for this tool)
         tool_context.state["last_city_checked_stateful"] = city
-        print(f"--- Tool: Updated state 'last_city_checked_stateful': {city} ---")
+        logger.debug("Updated state 'last_city_checked_stateful': %s", city)
 
         return result
     else:
         # Handle city not found
         error_msg = f"Sorry, I don't have weather information for '{city}'."
-        print(f"--- Tool: City '{city}' not found. ---")
+        logger.debug("City '%s' not found.", city)
         return {"status": "error", "error_message": error_msg}
 
 
-# Create function that execute events in runner
-async def call_agent_async(query: str, runner, user_id, session_id):
-    """Sends a query to the agent and prints the final response."""
-    content = types.Content(role='user', parts=[types.Part(text=query)])
+def get_weather_many(cities: list[str], tool_context: ToolContext) -> dict:
+    """Retrieves the weather for several cities at once, in the user's preferred unit."""
+    logger.debug("get_weather_many called for %d cities", len(cities))
+    preferred_unit = tool_context.state.get("user_preference_temperature_unit", "Celsius")
 
-    # RUNNER MAIN LOGIC: loop through events
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        # Key Concept: is_final_response() marks the concluding message for the turn.
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            else:
-                final_response_text = f"No response. {event.error_message if event.error_message else ''}"
-            break # Stop processing events once the final response is found
+    # One lookup and one unit conversion for the whole batch
+    table = weather_data.lookup_many(cities, preferred_unit)
+    if not table["rows"]:
+        return {"status": "error",
+                "error_message": f"Sorry, I don't have weather information for {', '.join(cities)}."}
 
-    return final_response_text
+    tool_context.state["last_city_checked_stateful"] = table["rows"][-1][0]
+    return {"status": "success", **table}
 
 
 async def main():
@@ -107,21 +115,25 @@ async def main():
             instruction="You are a helpful weather assistant. "
                         "When the user asks for the weather in a specific city, "
                         "use the 'get_weather' tool to find the information. "
+                        "When the user asks about several cities, use the 'get_weather_many' tool once with all of them. "
                         "If the user asks for the weather without specifying a city, you assume they mean the last checked city"
                         "If the tool returns an error, inform the user politely. "
                         "If the tool is successful, present the weather report clearly.",
-            tools=[get_weather_stateful],
+            tools=[get_weather_stateful, get_weather_many],
+            before_model_callback=response_cache,
+            after_model_callback=response_cache.store,
         )
 
         # Create chat session
         APP_NAME = "weather_tutorial_app"
         USER_ID = "user_1"
         SESSION_ID = "session_001"
-        session_service = InMemorySessionService() # store session memory
+        session_service = LocalSessionService(SESSION_DB) # store session memory
         initial_state = {
             "user_preference_temperature_unit": "Celsius"
         }
-        session = await session_service.create_session(
+        session = await get_or_create_session(
+            session_service,
             app_name=APP_NAME,
             user_id=USER_ID, # dummy fix user
             session_id=SESSION_ID, # dummy fix session
@@ -138,6 +150,7 @@ async def main():
             app_name=APP_NAME,
             session_service=session_service
         )
+        instrument_from_env(runner)  # Spans into $TRACE_DIR, if set
 
         # Ask to the agent
         q = "What is the weather like in London?"
@@ -146,9 +159,9 @@ async def main():
                                             runner=runner, user_id=USER_ID, session_id=SESSION_ID)
         print(f"Assistant: {result}")
 
-        # Manually update state
-        stored_session = session_service.sessions[APP_NAME][USER_ID][SESSION_ID]
-        stored_session.state["user_preference_temperature_unit"] = "Fahrenheit"
+        # Manually update state (recorded as an event, so it is persisted)
+        await update_state(session_service, APP_NAME, USER_ID, SESSION_ID,
+                           {"user_preference_temperature_unit": "Fahrenheit"})
 
         q = "How about New York?"
         print(f"User: {q}")
@@ -1,67 +1,64 @@
 from google.adk.agents.llm_agent import Agent
-from google.genai import types # For creating message Content/Parts
-from google.adk.sessions import InMemorySessionService
+from common.session_store import LocalSessionService, get_or_create_session
 from google.adk.runners import Runner
+from common.driver import call_agent_async
+from common.tracing import instrument_from_env
+from common.tool_cache import cached_tool
+from common.router import FastPathRouter
+from common import weather_data
 from typing import Optional
 
 import asyncio
 import logging
 import os
 
-logging.basicConfig(level=logging.ERROR)
+# LOG_LEVEL=DEBUG shows each tool call
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "ERROR").upper())
+logger = logging.getLogger(__name__)
 
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "1"
 os.environ["GOOGLE_CLOUD_PROJECT"] = "workshop-adk-bali"
 os.environ["GOOGLE_CLOUD_LOCATION"] = "us-central1"
 
+SESSION_DB = os.path.join(os.path.dirname(__file__), "sessions.db")
 
+# Bare greetings and farewells go straight to the specialists, without a
+# coordinator model call. Anything longer ("Hi, weather in Tokyo?") still
+# goes through the model.
+route_small_talk = FastPathRouter({
+    "greeting_agent": [r"^(hi|hello|hey|halo|hai|good (morning|afternoon|evening)|selamat (pagi|siang|sore|malam))"
+                       r"( there| all)?\W*$"],
+    "farewell_agent": [r"^((thanks|thank you|thx|terima kasih|makasih)\W*)?"
+                       r"(good ?bye|bye( bye)?|see (you|ya)( later| soon)?|sampai jumpa( lagi)?|dadah)\W*$"],
+})
+
+
+@cached_tool(ttl=600)
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city."""
-    print(f"--- Tool: get_weather called for city: {city} ---")
-    city_normalized = city.lower().replace(" ", "")
-
-    # Mock weather data
-    mock_weather_db = {
-        "newyork": {"status": "success", "report": "The weather in New York is sunny with a temperature of 25°C."},
-        "london": {"status": "success", "report": "It's cloudy in London with a temperature of 15°C."},
-        "tokyo": {"status": "success", "report": "Tokyo is experiencing light rain and a temperature of 18°C."},
-    }
-
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
+    logger.debug("get_weather called for city: %s", city)
+    city_weather = weather_data.lookup(city)
+
+    if city_weather:
+        report = (f"The weather in {city_weather.name} is {city_weather.condition} "
+                  f"with a temperature of {city_weather.temp_c:.0f}°C.")
+        return {"status": "success", "report": report}
     else:
         return {"status": "error", "error_message": f"Sorry, I don't have weather information for '{city}'."}
 
 
-# Create function that execute events in runner
-async def call_agent_async(query: str, runner, user_id, session_id):
-    """Sends a query to the agent and prints the final response."""
-    content = types.Content(role='user', parts=[types.Part(text=query)])
-
-    # RUNNER MAIN LOGIC: loop through events
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        # Key Concept: is_final_response() marks the concluding message for the turn.
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            else:
-                final_response_text = f"No response. {event.error_message if event.error_message else ''}"
-            break # Stop processing events once the final response is found
-
-    return final_response_text
-
 def say_hello(name: Optional[str] = None) -> str: # MODIFIED SIGNATURE
     """Provides a simple greeting. If a name is provided, it will be used."""
     if name:
-        print(f"--- Tool: say_hello called with name: {name} ---")
+        logger.debug("say_hello called with name: %s", name)
         return f"Hello, {name}!"
     else:
-        print(f"--- Tool: say_hello called without a specific name (name_arg_value: {name}) ---")
+        logger.debug("say_hello called without a specific name (name_arg_value: %s)", name)
         return "Hello there!"
 
 def say_goodbye() -> str:
     """Provides a simple farewell message to conclude the conversation."""
-    print(f"--- Tool: say_goodbye called ---")
+    logger.debug("say_goodbye called")
     return "Goodbye! Have a great day."
 
 
@@ -96,15 +93,18 @@ async def main():
                         "For anything else, respond appropriately or state you cannot handle it.",
             tools=[get_weather], # Root agent still needs the weather tool for its core task
             # Key change: Link the sub-agents here!
-            sub_agents=[greeting_agent, farewell_agent]
+            sub_agents=[greeting_agent, farewell_agent],
+            before_model_callback=route_small_talk,
+            after_model_callback=route_small_talk.record,
         )
 
         # Create chat session
-        session_service = InMemorySessionService()
+        session_service = LocalSessionService(SESSION_DB)
         APP_NAME = "weather_tutorial_agent_team"
         USER_ID = "user_1_agent_team"
         SESSION_ID = "session_001_agent_team"
-        session = await session_service.create_session(
+        session = await get_or_create_session(
+            session_service,
             app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
         )
         print(f"Session created: App='{APP_NAME}', User='{USER_ID}', Session='{SESSION_ID}'")
@@ -114,6 +114,7 @@ async def main():
             app_name=APP_NAME,
             session_service=session_service
         )
+        instrument_from_env(runner_agent_team)  # Spans into $TRACE_DIR, if set
         print(f"Runner created for agent '{weather_agent_team.name}'.")
 
         # --- Interactions using await (correct within async def) ---
@@ -134,6 +135,10 @@ async def main():
         result = await call_agent_async(q,
                                runner=runner_agent_team, user_id=USER_ID, session_id=SESSION_ID)
         print(f"Assistant: {result}")
+
+        stats = route_small_talk.stats
+        print(f"Router: {stats['routed']} of {stats['calls']} coordinator calls skipped "
+              f"(~{route_small_talk.seconds_saved:.2f} s saved)")
     except Exception as e:
         print(f"An error occurred: {e}")
 